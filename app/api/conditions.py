@@ -0,0 +1,22 @@
+from fastapi import Header, Response
+
+from app.database.cache_repository import CacheEntry, cached_response
+
+
+class Conditions:
+    """Условия запроса на получение: ETag и время изменения ответа,
+    который уже есть у клиента."""
+
+    def __init__(
+        self,
+        if_none_match: str | None = Header(None),
+        if_modified_since: str | None = Header(None),
+    ) -> None:
+        self.if_none_match = if_none_match
+        self.if_modified_since = if_modified_since
+
+    def response(self, entry: CacheEntry) -> Response:
+        """Ответ из записи кеша или 304, если тело у клиента не устарело."""
+        return cached_response(
+            entry, self.if_none_match, self.if_modified_since,
+        )
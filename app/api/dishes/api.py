@@ -1,10 +1,14 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from uuid import UUID
+
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm.exc import FlushError, NoResultFound
 
+from app.api.conditions import Conditions
 from app.api.dishes.service_repository import DishService
-from app.config import DISH_LINK, DISHES_LINK
-from app.database.schemas import DishPost, DishRead
+from app.api.pagination import Page
+from app.config import BATCH_MAX_ITEMS, BATCH_SUFFIX, DISH_LINK, DISHES_LINK
+from app.database.schemas import BatchResult, DishPost, DishRead
 
 dish_router = APIRouter(prefix='/api/v1')
 
@@ -20,13 +24,17 @@ async def get_dishes(
     background_tasks: BackgroundTasks,
     menu_id: str,
     submenu_id: str,
+    page: Page = Depends(),
+    conditions: Conditions = Depends(),
     repo: DishService = Depends(),
 ) -> list[DishRead]:
-    """Получение всех блюд конкретного подменю."""
+    """Получение всех блюд конкретного подменю или их страницы."""
     return await repo.get_all_dishes(
         submenu_id=submenu_id,
         menu_id=menu_id,
         background_tasks=background_tasks,
+        conditions=conditions,
+        page=page,
     )
 
 
@@ -64,6 +72,43 @@ async def post_new_dish(
         )
 
 
+@dish_router.post(
+    DISHES_LINK + BATCH_SUFFIX,
+    response_model=list[BatchResult],
+    status_code=200,
+    tags=['Блюда'],
+    summary='Добавить или изменить пакет блюд',
+)
+async def post_dishes_batch(
+    background_tasks: BackgroundTasks,
+    menu_id: str,
+    submenu_id: str,
+    dishes: list[DishPost] = Body(
+        ..., min_items=1, max_items=BATCH_MAX_ITEMS,
+    ),
+    repo: DishService = Depends(),
+) -> list[dict[str, str]]:
+    """Добавление и изменение пакета блюд подменю одним запросом.
+    Для каждого объекта возвращается результат записи."""
+    try:
+        return await repo.create_dishes(
+            dishes=dishes,
+            menu_id=menu_id,
+            submenu_id=submenu_id,
+            background_tasks=background_tasks,
+        )
+    except FlushError as error:
+        raise HTTPException(
+            status_code=400,
+            detail=error.args[0],
+        )
+    except NoResultFound as error:
+        raise HTTPException(
+            status_code=404,
+            detail=error.args[0],
+        )
+
+
 @dish_router.get(
     DISH_LINK,
     response_model=DishRead,
@@ -76,6 +121,7 @@ async def get_dish(
     menu_id: str,
     submenu_id: str,
     dish_id: str,
+    conditions: Conditions = Depends(),
     repo: DishService = Depends(),
 ) -> DishRead:
     """Получение блюда по id."""
@@ -85,6 +131,7 @@ async def get_dish(
             menu_id=menu_id,
             submenu_id=submenu_id,
             background_tasks=background_tasks,
+            conditions=conditions,
         )
     except NoResultFound as error:
         raise HTTPException(
@@ -129,6 +176,38 @@ async def patch_dish(
         )
 
 
+@dish_router.delete(
+    DISHES_LINK + BATCH_SUFFIX,
+    response_model=list[BatchResult],
+    status_code=200,
+    tags=['Блюда'],
+    summary='Удалить пакет блюд',
+)
+async def destroy_dishes_batch(
+    background_tasks: BackgroundTasks,
+    menu_id: str,
+    submenu_id: str,
+    dish_ids: list[UUID] = Body(
+        ..., min_items=1, max_items=BATCH_MAX_ITEMS,
+    ),
+    repo: DishService = Depends(),
+) -> list[dict[str, str]]:
+    """Удаление пакета блюд подменю одним запросом.
+    Для каждого id возвращается результат удаления."""
+    try:
+        return await repo.delete_dishes(
+            menu_id=menu_id,
+            submenu_id=submenu_id,
+            dish_ids=dish_ids,
+            background_tasks=background_tasks,
+        )
+    except NoResultFound as error:
+        raise HTTPException(
+            status_code=404,
+            detail=error.args[0],
+        )
+
+
 @dish_router.delete(
     DISH_LINK,
     status_code=200,
@@ -147,6 +226,7 @@ async def destroy_dish(
         await repo.delete_dish(
             dish_id=dish_id,
             menu_id=menu_id,
+            submenu_id=submenu_id,
             background_tasks=background_tasks,
         )
         return JSONResponse(
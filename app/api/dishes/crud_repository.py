@@ -1,5 +1,8 @@
+from typing import Any
+from uuid import UUID, uuid4
+
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.exc import FlushError, NoResultFound
 
@@ -7,7 +10,15 @@ from app.api.submenus.crud_repository import SubmenuRepository
 from app.database.db_loader import get_db
 from app.database.models import Dish
 from app.database.schemas import DishPost
-from app.database.services import check_objects, check_unique_dish
+from app.database.services import (
+    check_objects,
+    delete_batch,
+    dish_conflict,
+    insert_returning,
+    paginate,
+    upsert_batch,
+    write_returning,
+)
 
 
 class DishRepository:
@@ -29,32 +40,59 @@ class DishRepository:
         submenu_id: str,
     ) -> Dish:
         """Добавление нового блюда."""
-        try:
-            await check_unique_dish(db=self.db, dish=dish)
-        except FlushError:
-            raise FlushError('Блюдо с такими параметрами уже есть')
         try:
             await check_objects(
                 db=self.db,
                 menu_id=menu_id,
                 submenu_id=submenu_id,
+                conflict=dish_conflict(dish),
             )
-        except NoResultFound as error:
-            raise NoResultFound(error.args[0])
-        new_dish = Dish(
-            title=dish.title,
-            description=dish.description,
-            price=dish.price,
-            submenu_id=submenu_id,
-        )
+        except FlushError:
+            raise FlushError('Блюдо с такими параметрами уже есть')
+        values: dict[str, Any] = {
+            'title': dish.title,
+            'description': dish.description,
+            'price': dish.price,
+            'submenu_id': submenu_id,
+        }
         if dish.id:
-            new_dish.id = dish.id
+            values['id'] = dish.id
         if dish.discount is not None:
-            new_dish.discount = dish.discount
-        self.db.add(new_dish)
-        await self.db.commit()
-        await self.db.refresh(new_dish)
-        return new_dish
+            values['discount'] = dish.discount
+        return await insert_returning(self.db, self.model, values)
+
+    async def create_dishes(
+        self,
+        dishes: list[DishPost],
+        menu_id: str,
+        submenu_id: str,
+    ) -> list[dict[str, str]]:
+        """Добавление и изменение пакета блюд подменю.
+        Блюдо без скидки получает нулевую скидку."""
+        await check_objects(db=self.db, menu_id=menu_id, submenu_id=submenu_id)
+        rows = [
+            {
+                'id': dish.id or uuid4(),
+                'title': dish.title,
+                'description': dish.description,
+                'price': dish.price,
+                'discount': dish.discount or 0,
+                'submenu_id': UUID(submenu_id),
+                'content_hash': None,
+            }
+            for dish in dishes
+        ]
+        try:
+            statuses = await upsert_batch(
+                self.db, self.model, rows,
+                unique=['title', 'description'], parent='submenu_id',
+            )
+        except FlushError:
+            raise FlushError('Блюдо с такими параметрами уже есть')
+        return [
+            {'id': str(row['id']), 'status': status}
+            for row, status in zip(rows, statuses)
+        ]
 
     async def update_dish(
         self,
@@ -62,25 +100,31 @@ class DishRepository:
         updated_dish: DishPost,
     ) -> Dish:
         """Изменение блюда по id."""
-        current_dish = await self.get_dish_by_id(id=dish_id)
-        if not current_dish:
-            raise NoResultFound('dish not found')
         try:
-            await check_unique_dish(
+            await check_objects(
                 db=self.db,
-                dish=updated_dish,
                 dish_id=dish_id,
+                conflict=dish_conflict(updated_dish, dish_id),
             )
         except FlushError:
             raise FlushError('Блюдо с таким названием и описанием уже есть')
-        current_dish.title = updated_dish.title
-        current_dish.description = updated_dish.description
-        current_dish.price = updated_dish.price
+        values: dict[str, Any] = {
+            'title': updated_dish.title,
+            'description': updated_dish.description,
+            'price': updated_dish.price,
+            'content_hash': None,
+        }
         if updated_dish.discount is not None:
-            current_dish.discount = updated_dish.discount
-        await self.db.merge(current_dish)
-        await self.db.commit()
-        await self.db.refresh(current_dish)
+            values['discount'] = updated_dish.discount
+        current_dish = await write_returning(
+            self.db,
+            update(self.model).where(self.model.id == dish_id).values(
+                **values
+            ),
+            self.model,
+        )
+        if not current_dish:
+            raise NoResultFound('dish not found')
         return current_dish
 
     async def get_dish_by_id(
@@ -89,32 +133,64 @@ class DishRepository:
     ) -> Dish:
         """Получение блюда по id."""
         dish = (await self.db.execute(
-            select(self.model).where(self.model.id == id)
+            select(self.model).where(
+                self.model.id == id
+            ).execution_options(populate_existing=True)
         )).scalar()
         if not dish:
             raise NoResultFound('dish not found')
         return dish
 
+    async def get_dishes_by_ids(self, ids: list[str]) -> list[Dish]:
+        """Получение блюд по списку id."""
+        return (await self.db.execute(
+            select(self.model).where(
+                self.model.id.in_(ids)
+            ).execution_options(populate_existing=True)
+        )).scalars().all()
+
     async def get_all_dishes(
         self,
         submenu_id: str,
+        limit: int | None = None,
+        after: UUID | None = None,
+        order: str | None = None,
     ) -> list[Dish]:
-        """Получение всех блюд."""
+        """Получение всех блюд или страницы списка блюд."""
         try:
             await check_objects(db=self.db, submenu_id=submenu_id)
         except NoResultFound:
             return []
-        return ((await self.db.execute(
-            select(self.model).where(self.model.submenu_id == submenu_id)
-        )).scalars().all())
+        return ((await self.db.execute(paginate(
+            select(self.model).where(self.model.submenu_id == submenu_id),
+            self.model, limit, after, order,
+        ))).scalars().all())
 
     async def delete_dish(
         self,
         dish_id: str,
     ) -> None:
         """Удаление блюда по id."""
-        current_dish = await self.get_dish_by_id(id=dish_id)
-        if not current_dish:
+        if not await write_returning(
+            self.db,
+            delete(self.model).where(self.model.id == dish_id),
+            self.model,
+        ):
             raise NoResultFound('dish not found')
-        await self.db.delete(current_dish)
-        await self.db.commit()
+
+    async def delete_dishes(
+        self,
+        dish_ids: list[UUID],
+        menu_id: str,
+        submenu_id: str,
+    ) -> list[dict[str, str]]:
+        """Удаление пакета блюд конкретного подменю по id."""
+        await check_objects(db=self.db, menu_id=menu_id, submenu_id=submenu_id)
+        statuses = await delete_batch(
+            self.db, self.model, dish_ids,
+            parent='submenu_id', parent_id=submenu_id,
+        )
+        return [
+            {'id': str(id), 'status': status}
+            for id, status in zip(dish_ids, statuses)
+        ]
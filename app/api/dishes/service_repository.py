@@ -1,9 +1,14 @@
-from fastapi import BackgroundTasks, Depends
+from functools import partial
+from uuid import UUID
 
+from fastapi import BackgroundTasks, Depends, Response
+
+from app.api.conditions import Conditions
 from app.api.dishes.crud_repository import DishRepository
-from app.database.cache_repository import СacheRepository
+from app.api.pagination import Page
+from app.database.cache_repository import Loader, СacheRepository
 from app.database.models import Dish
-from app.database.schemas import DishPost
+from app.database.schemas import DishPost, DishRead
 
 
 class DishService:
@@ -17,48 +22,69 @@ class DishService:
         self.crud_repo = crud_repo
         self.cache_repo = cache_repo
 
+    def loaders(
+        self,
+        menu_id: str,
+        submenu_id: str,
+        dish_id: str | None = None,
+    ) -> dict[str, Loader]:
+        """Загрузка изменённых блюда, подменю и меню для записи в кеш."""
+        submenu_repo = self.crud_repo.submenu_repo
+        loaders: dict[str, Loader] = {}
+        if dish_id:
+            loaders['dish'] = partial(
+                self.crud_repo.get_dish_by_id, id=dish_id,
+            )
+        loaders['submenu'] = partial(
+            submenu_repo.get_submenu_by_id, id=submenu_id,
+        )
+        loaders['menu'] = partial(
+            submenu_repo.menu_repo.get_menu_by_id, id=menu_id,
+        )
+        return loaders
+
     async def get_all_dishes(
         self,
         background_tasks: BackgroundTasks,
+        conditions: Conditions,
         submenu_id: str,
         menu_id: str,
-    ) -> list[Dish]:
-        """Получение всех блюд."""
-        cache = await self.cache_repo.get_all_dishes_cache(menu_id, submenu_id)
-        if cache:
-            return cache
-        items = await self.crud_repo.get_all_dishes(submenu_id=submenu_id)
-        background_tasks.add_task(
-            self.cache_repo.set_all_dishes_cache,
-            menu_id=menu_id,
-            submenu_id=submenu_id,
-            items=items,
+        page: Page,
+    ) -> Response:
+        """Получение всех блюд или их страницы."""
+        entry = await self.cache_repo.get_all_dishes_cache(
+            menu_id,
+            submenu_id,
+            partial(
+                self.crud_repo.get_all_dishes,
+                submenu_id=submenu_id,
+                limit=page.limit,
+                after=page.after,
+                order=page.order,
+            ),
+            background_tasks,
+            page.query,
+            page.projection(DishRead),
         )
-        return items
+        return conditions.response(entry)
 
     async def get_dish_by_id(
         self,
         background_tasks: BackgroundTasks,
+        conditions: Conditions,
         id: str,
         menu_id: str,
         submenu_id: str,
-    ) -> Dish:
+    ) -> Response:
         """Получение блюда по id."""
-        cache = await self.cache_repo.get_dish_cache(
+        entry = await self.cache_repo.get_dish_cache(
             id,
             menu_id,
             submenu_id,
+            partial(self.crud_repo.get_dish_by_id, id=id),
+            background_tasks,
         )
-        if cache:
-            return cache
-        item = await self.crud_repo.get_dish_by_id(id=id)
-        background_tasks.add_task(
-            self.cache_repo.set_dish_cache,
-            item=item,
-            submenu_id=submenu_id,
-            menu_id=menu_id,
-        )
-        return item
+        return conditions.response(entry)
 
     async def create_dish(
         self,
@@ -75,12 +101,44 @@ class DishService:
         )
         background_tasks.add_task(
             self.cache_repo.create_dish_cache,
-            item=item,
-            submenu_id=submenu_id,
             menu_id=menu_id,
+            submenu_id=submenu_id,
+            dish_id=str(item.id),
+            loaders=self.loaders(menu_id, submenu_id, str(item.id)),
         )
         return item
 
+    async def create_dishes(
+        self,
+        background_tasks: BackgroundTasks,
+        dishes: list[DishPost],
+        menu_id: str,
+        submenu_id: str,
+    ) -> list[dict[str, str]]:
+        """Добавление и изменение пакета блюд."""
+        results = await self.crud_repo.create_dishes(
+            dishes=dishes,
+            menu_id=menu_id,
+            submenu_id=submenu_id,
+        )
+        dish_ids = [
+            result['id'] for result in results
+            if result['status'] != 'conflict'
+        ]
+        if dish_ids:
+            loaders = self.loaders(menu_id, submenu_id)
+            loaders['dishes'] = partial(
+                self.crud_repo.get_dishes_by_ids, ids=dish_ids,
+            )
+            background_tasks.add_task(
+                self.cache_repo.create_dishes_cache,
+                menu_id=menu_id,
+                submenu_id=submenu_id,
+                dish_ids=dish_ids,
+                loaders=loaders,
+            )
+        return results
+
     async def update_dish(
         self,
         background_tasks: BackgroundTasks,
@@ -96,9 +154,10 @@ class DishService:
         )
         background_tasks.add_task(
             self.cache_repo.update_dish_cache,
-            item=item,
-            submenu_id=submenu_id,
             menu_id=menu_id,
+            submenu_id=submenu_id,
+            dish_id=dish_id,
+            loaders=self.loaders(menu_id, submenu_id, dish_id),
         )
         return item
 
@@ -107,10 +166,41 @@ class DishService:
         background_tasks: BackgroundTasks,
         dish_id: str,
         menu_id: str,
+        submenu_id: str,
     ) -> None:
         """Удаление блюда по id."""
         background_tasks.add_task(
             self.cache_repo.delete_dish_cache,
             menu_id=menu_id,
+            submenu_id=submenu_id,
+            dish_id=dish_id,
+            loaders=self.loaders(menu_id, submenu_id),
         )
         await self.crud_repo.delete_dish(dish_id=dish_id)
+
+    async def delete_dishes(
+        self,
+        background_tasks: BackgroundTasks,
+        dish_ids: list[UUID],
+        menu_id: str,
+        submenu_id: str,
+    ) -> list[dict[str, str]]:
+        """Удаление пакета блюд конкретного подменю."""
+        results = await self.crud_repo.delete_dishes(
+            dish_ids=dish_ids,
+            menu_id=menu_id,
+            submenu_id=submenu_id,
+        )
+        deleted = [
+            result['id'] for result in results
+            if result['status'] == 'deleted'
+        ]
+        if deleted:
+            background_tasks.add_task(
+                self.cache_repo.delete_dishes_cache,
+                menu_id=menu_id,
+                submenu_id=submenu_id,
+                dish_ids=deleted,
+                loaders=self.loaders(menu_id, submenu_id),
+            )
+        return results
@@ -1,10 +1,28 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm.exc import FlushError, NoResultFound
 
+from app.api.conditions import Conditions
 from app.api.menus.service_repository import MenuService
-from app.config import MENU_LINK, MENUS_LINK
-from app.database.schemas import MenuPost, MenuRead, MenuReadFullGet
+from app.api.pagination import Page
+from app.config import (
+    BATCH_MAX_ITEMS,
+    BATCH_SUFFIX,
+    FULL_BASE_LINK,
+    MENU_LINK,
+    MENUS_LINK,
+)
+from app.database.schemas import (
+    BatchResult,
+    MenuPost,
+    MenuRead,
+    MenuReadFullGet,
+    MenuTreePost,
+    SyncResult,
+)
 
 menu_router = APIRouter(prefix='/api/v1')
 
@@ -18,10 +36,16 @@ menu_router = APIRouter(prefix='/api/v1')
 )
 async def get_menus(
     background_tasks: BackgroundTasks,
+    page: Page = Depends(),
+    conditions: Conditions = Depends(),
     repo: MenuService = Depends()
 ) -> list[MenuRead]:
-    """Получение всех меню."""
-    return await repo.get_all_menus(background_tasks=background_tasks)
+    """Получение всех меню или их страницы."""
+    return await repo.get_all_menus(
+        background_tasks=background_tasks,
+        conditions=conditions,
+        page=page,
+    )
 
 
 @menu_router.post(
@@ -49,6 +73,34 @@ async def post_new_menu(
         )
 
 
+@menu_router.post(
+    MENUS_LINK + BATCH_SUFFIX,
+    response_model=list[BatchResult],
+    status_code=200,
+    tags=['Меню'],
+    summary='Добавить или изменить пакет меню',
+)
+async def post_menus_batch(
+    background_tasks: BackgroundTasks,
+    menus: list[MenuPost] = Body(
+        ..., min_items=1, max_items=BATCH_MAX_ITEMS,
+    ),
+    repo: MenuService = Depends(),
+) -> list[dict[str, str]]:
+    """Добавление и изменение пакета меню одним запросом.
+    Для каждого объекта возвращается результат записи."""
+    try:
+        return await repo.create_menus(
+            menus=menus,
+            background_tasks=background_tasks,
+        )
+    except FlushError as error:
+        raise HTTPException(
+            status_code=400,
+            detail=error.args[0],
+        )
+
+
 @menu_router.get(
     MENU_LINK,
     response_model=MenuRead,
@@ -59,6 +111,7 @@ async def post_new_menu(
 async def get_menu(
     background_tasks: BackgroundTasks,
     menu_id: str,
+    conditions: Conditions = Depends(),
     repo: MenuService = Depends(),
 ) -> MenuRead:
     """Получение меню по id."""
@@ -66,6 +119,7 @@ async def get_menu(
         return await repo.get_menu_by_id(
             id=menu_id,
             background_tasks=background_tasks,
+            conditions=conditions,
         )
     except NoResultFound as error:
         raise HTTPException(
@@ -106,6 +160,28 @@ async def patch_menu(
         )
 
 
+@menu_router.delete(
+    MENUS_LINK + BATCH_SUFFIX,
+    response_model=list[BatchResult],
+    status_code=200,
+    tags=['Меню'],
+    summary='Удалить пакет меню',
+)
+async def destroy_menus_batch(
+    background_tasks: BackgroundTasks,
+    menu_ids: list[UUID] = Body(
+        ..., min_items=1, max_items=BATCH_MAX_ITEMS,
+    ),
+    repo: MenuService = Depends(),
+) -> list[dict[str, str]]:
+    """Удаление пакета меню одним запросом вместе с их подменю и блюдами.
+    Для каждого id возвращается результат удаления."""
+    return await repo.delete_menus(
+        menu_ids=menu_ids,
+        background_tasks=background_tasks,
+    )
+
+
 @menu_router.delete(
     MENU_LINK,
     status_code=200,
@@ -135,7 +211,7 @@ async def destroy_menu(
 
 
 @menu_router.get(
-    '/fullbase',
+    FULL_BASE_LINK,
     status_code=200,
     response_model=list[MenuReadFullGet],
     tags=['Меню'],
@@ -143,7 +219,41 @@ async def destroy_menu(
 )
 async def get_full_base_menu(
     background_tasks: BackgroundTasks,
+    stream: bool = False,
+    conditions: Conditions = Depends(),
     repo: MenuService = Depends()
 ) -> list[MenuReadFullGet]:
-    """Получение всех меню c развернутым списком блюд и подменю."""
-    return await repo.get_full_base_menu(background_tasks=background_tasks)
+    """Получение всех меню c развернутым списком блюд и подменю.
+    При stream=true ответ собирается из базы и отдаётся по частям."""
+    if stream:
+        return repo.stream_full_base_menu()
+    return await repo.get_full_base_menu(
+        background_tasks=background_tasks,
+        conditions=conditions,
+    )
+
+
+@menu_router.put(
+    FULL_BASE_LINK,
+    status_code=200,
+    response_model=dict[str, SyncResult],
+    tags=['Меню'],
+    summary='Заменить всю базу меню древовидной структурой',
+)
+async def put_full_base_menu(
+    background_tasks: BackgroundTasks,
+    menus: list[MenuTreePost],
+    repo: MenuService = Depends()
+) -> dict[str, dict[str, Any]]:
+    """Замена всех меню, подменю и блюд одной транзакцией.
+    Объекты сопоставляются по id, отсутствующие в запросе удаляются."""
+    try:
+        return await repo.replace_full_base_menu(
+            menus=menus,
+            background_tasks=background_tasks,
+        )
+    except FlushError as error:
+        raise HTTPException(
+            status_code=400,
+            detail=error.args[0],
+        )
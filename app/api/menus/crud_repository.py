@@ -1,13 +1,26 @@
+from typing import Any, AsyncIterator
+from uuid import UUID, uuid4
+
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import delete, distinct, func, select, update
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import FlushError, NoResultFound
 
+from app.config import COUNTS_AGGREGATE, FULL_BASE_STREAM_ROWS
 from app.database.db_loader import get_db
-from app.database.models import Menu, Submenu
+from app.database.models import Dish, Menu, Submenu
 from app.database.schemas import MenuPost
-from app.database.services import check_unique_menu
+from app.database.services import (
+    check_objects,
+    delete_batch,
+    insert_returning,
+    menu_conflict,
+    paginate,
+    upsert_batch,
+    write_returning,
+)
 
 
 class MenuRepository:
@@ -20,68 +33,130 @@ class MenuRepository:
     async def get_menu_by_id(self, id: str) -> Menu:
         """Получение меню по id."""
         current_menu = (await self.db.execute(
-            select(self.model).where(self.model.id == id)
+            select(self.model).where(
+                self.model.id == id
+            ).execution_options(populate_existing=True)
         )).scalar()
         if not current_menu:
             raise NoResultFound('menu not found')
         return current_menu
 
-    async def get_all_menus(self) -> list[Menu]:
-        """Получение всех меню."""
+    async def get_menus_by_ids(self, ids: list[str]) -> list[Menu]:
+        """Получение меню по списку id."""
         return (await self.db.execute(
-            select(self.model)
-        )).scalars().fetchall()
+            select(self.model).where(
+                self.model.id.in_(ids)
+            ).execution_options(populate_existing=True)
+        )).scalars().all()
+
+    async def get_all_menus(
+        self,
+        aggregate: bool = COUNTS_AGGREGATE,
+        limit: int | None = None,
+        after: UUID | None = None,
+        order: str | None = None,
+    ) -> list[Menu]:
+        """Получение всех меню или страницы списка меню.
+        При aggregate=True количество подменю и блюд считается
+        одним запросом с группировкой, а не берётся из счётчиков."""
+        if not aggregate:
+            return (await self.db.execute(paginate(
+                select(self.model), self.model, limit, after, order,
+            ))).scalars().fetchall()
+        rows = (await self.db.execute(paginate(
+            select(
+                self.model.id,
+                self.model.title,
+                self.model.description,
+                func.count(distinct(Submenu.id)).label('submenus_count'),
+                func.count(Dish.id).label('dishes_count'),
+            ).outerjoin(
+                Submenu, Submenu.menu_id == self.model.id
+            ).outerjoin(
+                Dish, Dish.submenu_id == Submenu.id
+            ).group_by(self.model.id),
+            self.model, limit, after, order,
+        ))).all()
+        return [self.model(**row._mapping) for row in rows]
 
     async def create_menu(self, menu: MenuPost) -> Menu:
         """Добавление нового меню."""
         try:
-            await check_unique_menu(db=self.db, menu=menu)
+            await check_objects(db=self.db, conflict=menu_conflict(menu))
         except FlushError:
             raise FlushError('Меню с такими параметрами уже есть')
-        custom_id = menu.id
-        if custom_id:
-            db_menu = self.model(
-                id=custom_id,
-                title=menu.title,
-                description=menu.description,
-            )
-        else:
-            db_menu = self.model(
-                title=menu.title,
-                description=menu.description,
+        values: dict[str, Any] = {
+            'title': menu.title,
+            'description': menu.description,
+        }
+        if menu.id:
+            values['id'] = menu.id
+        return await insert_returning(self.db, self.model, values)
+
+    async def create_menus(
+        self,
+        menus: list[MenuPost],
+    ) -> list[dict[str, str]]:
+        """Добавление и изменение пакета меню."""
+        rows = [
+            {
+                'id': menu.id or uuid4(),
+                'title': menu.title,
+                'description': menu.description,
+                'content_hash': None,
+            }
+            for menu in menus
+        ]
+        try:
+            statuses = await upsert_batch(
+                self.db, self.model, rows, unique=['title'],
             )
-        self.db.add(db_menu)
-        await self.db.commit()
-        await self.db.refresh(db_menu)
-        return db_menu
+        except FlushError:
+            raise FlushError('Меню с такими параметрами уже есть')
+        return [
+            {'id': str(row['id']), 'status': status}
+            for row, status in zip(rows, statuses)
+        ]
 
     async def update_menu(self, menu_id: str, updated_menu: MenuPost) -> Menu:
         """Изменение меню по id."""
-        current_menu = await self.get_menu_by_id(id=menu_id)
-        if not current_menu:
-            raise NoResultFound('menu not found')
         try:
-            await check_unique_menu(
+            await check_objects(
                 db=self.db,
-                menu=updated_menu,
                 menu_id=menu_id,
+                conflict=menu_conflict(updated_menu, menu_id),
             )
         except FlushError:
             raise FlushError('Меню с таким названием уже есть')
-        current_menu.title = updated_menu.title
-        current_menu.description = updated_menu.description
-        await self.db.merge(current_menu)
-        await self.db.commit()
-        await self.db.refresh(current_menu)
+        current_menu = await write_returning(
+            self.db,
+            update(self.model).where(self.model.id == menu_id).values(
+                title=updated_menu.title,
+                description=updated_menu.description,
+                content_hash=None,
+            ),
+            self.model,
+        )
+        if not current_menu:
+            raise NoResultFound('menu not found')
         return current_menu
 
     async def delete_menu(self, menu_id: str) -> None:
         """Удаление меню по id."""
-        current_menu = await self.get_menu_by_id(id=menu_id)
-        if not current_menu:
+        if not await write_returning(
+            self.db,
+            delete(self.model).where(self.model.id == menu_id),
+            self.model,
+        ):
             raise NoResultFound('menu not found')
-        await self.db.delete(current_menu)
-        await self.db.commit()
+
+    async def delete_menus(self, menu_ids: list[UUID]) -> list[dict[str, str]]:
+        """Удаление пакета меню по id."""
+        statuses = await delete_batch(self.db, self.model, menu_ids)
+        return [
+            {'id': str(id), 'status': status}
+            for id, status in zip(menu_ids, statuses)
+        ]
 
     async def get_full_base_menu(self) -> list[Menu]:
         """Получение всех меню c развернутым списком блюд и подменю."""
@@ -90,3 +165,31 @@ class MenuRepository:
                 Menu.submenus
             ).options(selectinload(Submenu.dishes)))
         )).scalars().fetchall()
+
+    async def stream_full_base_menu(self) -> AsyncIterator[Row]:
+        """Получение строк меню, подменю и блюд одним запросом
+        через серверный курсор, упорядоченных для сборки дерева."""
+        result = await self.db.stream(
+            select(
+                self.model.id.label('menu_id'),
+                self.model.title.label('menu_title'),
+                self.model.description.label('menu_description'),
+                Submenu.id.label('submenu_id'),
+                Submenu.title.label('submenu_title'),
+                Submenu.description.label('submenu_description'),
+                Dish.id.label('dish_id'),
+                Dish.title.label('dish_title'),
+                Dish.description.label('dish_description'),
+                Dish.discount.label('dish_discount'),
+                Dish.price.label('dish_price'),
+            ).outerjoin(
+                Submenu, Submenu.menu_id == self.model.id
+            ).outerjoin(
+                Dish, Dish.submenu_id == Submenu.id
+            ).order_by(
+                self.model.id, Submenu.id, Dish.id
+            ).execution_options(yield_per=FULL_BASE_STREAM_ROWS)
+        )
+        async for rows in result.partitions():
+            for row in rows:
+                yield row
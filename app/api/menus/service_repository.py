@@ -1,9 +1,40 @@
-from fastapi import BackgroundTasks, Depends
+from functools import partial
+from typing import Any, AsyncIterator, Iterable
+from uuid import UUID
 
+from fastapi import BackgroundTasks, Depends, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import FlushError
+
+from app.api.conditions import Conditions
 from app.api.menus.crud_repository import MenuRepository
-from app.database.cache_repository import СacheRepository
+from app.api.pagination import Page
+from app.config import FULL_BASE_STREAM_CHUNK
+from app.database.cache_repository import Loader, СacheRepository, dump_json
 from app.database.models import Menu
-from app.database.schemas import MenuPost
+from app.database.schemas import MenuPost, MenuRead, MenuTreePost, discount_price
+from app.tasks.updater import BaseUpdaterRepo, Diff
+from app.tasks.warmer import CacheWarmerRepo
+
+
+def sync_result(ids: Iterable[UUID], diff: Diff) -> dict[str, Any]:
+    """Число добавленных, изменённых и удалённых объектов одного типа
+    и результат для каждого объекта из запроса и каждого удалённого."""
+    to_insert, to_update, to_delete = diff
+    statuses = {
+        **{row['id']: 'created' for row in to_insert},
+        **{row['id']: 'updated' for row in to_update},
+    }
+    return {
+        'created': len(to_insert),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'items': [
+            {'id': str(id), 'status': statuses.get(id, 'unchanged')}
+            for id in ids
+        ] + [{'id': str(id), 'status': 'deleted'} for id in to_delete],
+    }
 
 
 class MenuService:
@@ -17,47 +48,115 @@ class MenuService:
         self.crud_repo = crud_repo
         self.cache_repo = cache_repo
 
+    def loaders(self, menu_id: str) -> dict[str, Loader]:
+        """Загрузка изменённого меню для записи в кеш."""
+        return {'menu': partial(self.crud_repo.get_menu_by_id, id=menu_id)}
+
     async def get_full_base_menu(
         self,
         background_tasks: BackgroundTasks,
-    ) -> list[Menu]:
+        conditions: Conditions,
+    ) -> Response:
         """Получение всех меню c развернутым списком блюд и подменю."""
-        cache = await self.cache_repo.get_full_base_menu_cache()
-        if cache:
-            return cache
-        items = await self.crud_repo.get_full_base_menu()
-        background_tasks.add_task(
-            self.cache_repo.set_full_base_menu_cache, items
+        entry = await self.cache_repo.get_full_base_menu_cache(
+            self.crud_repo.get_full_base_menu,
+            background_tasks,
         )
-        return items
+        return conditions.response(entry)
+
+    def stream_full_base_menu(self) -> StreamingResponse:
+        """Потоковая выдача всех меню c развернутым списком блюд и подменю
+        без кеша и без сборки всего ответа в памяти."""
+        return StreamingResponse(
+            self.full_base_chunks(),
+            media_type='application/json',
+        )
+
+    async def full_base_chunks(self) -> AsyncIterator[bytes]:
+        """Части JSON древовидной структуры базы.
+        Строки приходят упорядоченными по меню и подменю, поэтому
+        дерево собирается за один проход без хранения объектов."""
+        buffer = bytearray(b'[')
+        current_menu = current_submenu = current_dish = None
+        async for (
+            menu_id, menu_title, menu_description,
+            submenu_id, submenu_title, submenu_description,
+            dish_id, dish_title, dish_description, discount, price,
+        ) in self.crud_repo.stream_full_base_menu():
+            if menu_id != current_menu:
+                if current_submenu is not None:
+                    buffer += b']}'
+                if current_menu is not None:
+                    buffer += b']},'
+                buffer += dump_json({
+                    'title': menu_title,
+                    'description': menu_description,
+                    'id': str(menu_id),
+                })[:-1] + b',"submenus":['
+                current_menu, current_submenu = menu_id, None
+            if submenu_id is not None and submenu_id != current_submenu:
+                if current_submenu is not None:
+                    buffer += b']},'
+                buffer += dump_json({
+                    'title': submenu_title,
+                    'description': submenu_description,
+                    'id': str(submenu_id),
+                })[:-1] + b',"dishes":['
+                current_submenu, current_dish = submenu_id, None
+            if dish_id is not None:
+                if current_dish is not None:
+                    buffer += b','
+                buffer += dump_json({
+                    'title': dish_title,
+                    'description': dish_description,
+                    'id': str(dish_id),
+                    'discount': discount,
+                    'price': discount_price(price, discount),
+                })
+                current_dish = dish_id
+            if len(buffer) >= FULL_BASE_STREAM_CHUNK:
+                yield bytes(buffer)
+                buffer.clear()
+        if current_submenu is not None:
+            buffer += b']}'
+        if current_menu is not None:
+            buffer += b']}'
+        buffer += b']'
+        yield bytes(buffer)
 
     async def get_all_menus(
         self,
         background_tasks: BackgroundTasks,
-    ) -> list[Menu]:
-        """Получение всех меню."""
-        cache = await self.cache_repo.get_all_menus_cache()
-        if cache:
-            return cache
-        items = await self.crud_repo.get_all_menus()
-        background_tasks.add_task(self.cache_repo.set_all_menus_cache, items)
-        return items
+        conditions: Conditions,
+        page: Page,
+    ) -> Response:
+        """Получение всех меню или их страницы."""
+        entry = await self.cache_repo.get_all_menus_cache(
+            partial(
+                self.crud_repo.get_all_menus,
+                limit=page.limit,
+                after=page.after,
+                order=page.order,
+            ),
+            background_tasks,
+            page.query,
+            page.projection(MenuRead),
+        )
+        return conditions.response(entry)
 
     async def get_menu_by_id(
         self,
         id: str,
         background_tasks: BackgroundTasks,
-    ) -> Menu:
+        conditions: Conditions,
+    ) -> Response:
         """Получение меню по id."""
-        cache = await self.cache_repo.get_menu_cache(id)
-        if cache:
-            return cache
-        item = await self.crud_repo.get_menu_by_id(id=id)
-        background_tasks.add_task(
-            self.cache_repo.set_menu_cache,
-            item,
+        entry = await self.cache_repo.get_menu_cache(
+            id,
+            partial(self.crud_repo.get_menu_by_id, id=id),
+            background_tasks,
         )
-        return item
+        return conditions.response(entry)
 
     async def create_menu(
         self,
@@ -68,10 +167,61 @@ class MenuService:
         item = await self.crud_repo.create_menu(menu=menu)
         background_tasks.add_task(
             self.cache_repo.create_update_menu_cache,
-            item
+            menu_id=str(item.id),
+            loaders=self.loaders(str(item.id)),
         )
         return item
 
+    async def create_menus(
+        self,
+        menus: list[MenuPost],
+        background_tasks: BackgroundTasks,
+    ) -> list[dict[str, str]]:
+        """Добавление и изменение пакета меню."""
+        results = await self.crud_repo.create_menus(menus=menus)
+        menu_ids = [
+            result['id'] for result in results
+            if result['status'] != 'conflict'
+        ]
+        if menu_ids:
+            background_tasks.add_task(
+                self.cache_repo.create_menus_cache,
+                menu_ids=menu_ids,
+                loaders={'menus': partial(
+                    self.crud_repo.get_menus_by_ids, ids=menu_ids,
+                )},
+            )
+        return results
+
+    async def replace_full_base_menu(
+        self,
+        menus: list[MenuTreePost],
+        background_tasks: BackgroundTasks,
+    ) -> dict[str, dict[str, Any]]:
+        """Замена всей базы древовидной структурой пакетными запросами
+        обновления базы из файла. Кеш сбрасывается один раз и
+        прогревается в фоне. Замена выполняется одной транзакцией, поэтому
+        при конфликте названий не применяется ни один объект."""
+        db = self.crud_repo.db
+        updater = BaseUpdaterRepo.from_tree(menus)
+        try:
+            diffs = await updater.apply(await db.connection())
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise FlushError('Объекты с такими параметрами уже есть')
+        if any(any(diff) for diff in diffs):
+            await self.cache_repo.delete_all_cache()
+            background_tasks.add_task(CacheWarmerRepo().warm)
+        return {
+            name: sync_result(ids, diff)
+            for name, ids, diff in zip(
+                ('menus', 'submenus', 'dishes'),
+                updater.get_data_from_file(),
+                diffs,
+            )
+        }
+
     async def update_menu(
         self,
         menu_id: str,
@@ -85,7 +235,8 @@ class MenuService:
         )
         background_tasks.add_task(
             self.cache_repo.create_update_menu_cache,
-            item,
+            menu_id=menu_id,
+            loaders=self.loaders(menu_id),
         )
         return item
 
@@ -100,3 +251,20 @@ class MenuService:
             menu_id,
         )
         await self.crud_repo.delete_menu(menu_id=menu_id)
+
+    async def delete_menus(
+        self,
+        menu_ids: list[UUID],
+        background_tasks: BackgroundTasks,
+    ) -> list[dict[str, str]]:
+        """Удаление пакета меню."""
+        results = await self.crud_repo.delete_menus(menu_ids=menu_ids)
+        deleted = [
+            result['id'] for result in results
+            if result['status'] == 'deleted'
+        ]
+        if deleted:
+            background_tasks.add_task(
+                self.cache_repo.delete_menus_cache, deleted,
+            )
+        return results
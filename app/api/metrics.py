@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.config import METRICS_LINK
+from app.database.db_loader import engine
+from app.database.pool_metrics import pool_metrics
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get(
+    METRICS_LINK,
+    response_class=PlainTextResponse,
+    status_code=200,
+    tags=['Метрики'],
+    summary='Метрики пула соединений с базой',
+)
+async def get_metrics() -> str:
+    """Время ожидания и загрузка пула соединений с базой процесса
+    в текстовом формате Prometheus."""
+    return pool_metrics.render(engine.sync_engine.pool)
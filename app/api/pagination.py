@@ -0,0 +1,56 @@
+from typing import Literal
+from urllib.parse import urlencode
+from uuid import UUID
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+from app.config import PAGE_MAX_LIMIT
+
+
+class Page:
+    """Параметры страницы списка объектов: keyset-пагинация по id
+    или названию и выбор выдаваемых полей."""
+
+    def __init__(
+        self,
+        limit: int | None = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+        after: UUID | None = Query(
+            None, description='id последнего объекта предыдущей страницы',
+        ),
+        order: Literal['id', 'title'] | None = Query(None),
+        fields: str | None = Query(
+            None,
+            regex=r'^\w+(,\w+)*$',
+            description='Поля объектов через запятую, id выдаётся всегда',
+        ),
+    ) -> None:
+        self.limit = limit
+        self.after = after
+        self.order = order
+        self.fields = sorted(set(fields.split(','))) if fields else None
+
+    @property
+    def query(self) -> str:
+        """Строка параметров страницы для ключа кеша,
+        пустая для полного списка."""
+        params = {
+            'limit': self.limit,
+            'after': self.after,
+            'order': self.order,
+            'fields': ','.join(self.fields) if self.fields else None,
+        }
+        params = {name: value for name, value in params.items() if value}
+        return '?' + urlencode(params) if params else ''
+
+    def projection(self, schema: type[BaseModel]) -> list[str] | None:
+        """Выдаваемые поля схемы или None для всех полей."""
+        if self.fields is None:
+            return None
+        unknown = set(self.fields) - set(schema.__fields__)
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f'unknown fields: {", ".join(sorted(unknown))}',
+            )
+        return ['id', *(name for name in self.fields if name != 'id')]
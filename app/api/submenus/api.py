@@ -1,10 +1,14 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from uuid import UUID
+
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm.exc import FlushError, NoResultFound
 
+from app.api.conditions import Conditions
+from app.api.pagination import Page
 from app.api.submenus.service_repository import SubmenuService
-from app.config import SUBMENU_LINK, SUBMENUS_LINK
-from app.database.schemas import SubmenuPost, SubmenuRead
+from app.config import BATCH_MAX_ITEMS, BATCH_SUFFIX, SUBMENU_LINK, SUBMENUS_LINK
+from app.database.schemas import BatchResult, SubmenuPost, SubmenuRead
 
 submenu_router = APIRouter(prefix='/api/v1')
 
@@ -19,12 +23,16 @@ submenu_router = APIRouter(prefix='/api/v1')
 async def get_submenus(
     background_tasks: BackgroundTasks,
     menu_id: str,
+    page: Page = Depends(),
+    conditions: Conditions = Depends(),
     repo: SubmenuService = Depends(),
 ) -> list[SubmenuRead]:
-    """Получение всех подменю конкретного меню."""
+    """Получение всех подменю конкретного меню или их страницы."""
     return await repo.get_all_submenus(
         menu_id=menu_id,
         background_tasks=background_tasks,
+        conditions=conditions,
+        page=page,
     )
 
 
@@ -60,6 +68,41 @@ async def post_new_submenu(
         )
 
 
+@submenu_router.post(
+    SUBMENUS_LINK + BATCH_SUFFIX,
+    response_model=list[BatchResult],
+    status_code=200,
+    tags=['Подменю'],
+    summary='Добавить или изменить пакет подменю',
+)
+async def post_submenus_batch(
+    background_tasks: BackgroundTasks,
+    menu_id: str,
+    submenus: list[SubmenuPost] = Body(
+        ..., min_items=1, max_items=BATCH_MAX_ITEMS,
+    ),
+    repo: SubmenuService = Depends(),
+) -> list[dict[str, str]]:
+    """Добавление и изменение пакета подменю меню одним запросом.
+    Для каждого объекта возвращается результат записи."""
+    try:
+        return await repo.create_submenus(
+            submenus=submenus,
+            menu_id=menu_id,
+            background_tasks=background_tasks,
+        )
+    except FlushError as error:
+        raise HTTPException(
+            status_code=400,
+            detail=error.args[0],
+        )
+    except NoResultFound as error:
+        raise HTTPException(
+            status_code=404,
+            detail=error.args[0],
+        )
+
+
 @submenu_router.get(
     SUBMENU_LINK,
     response_model=SubmenuRead,
@@ -71,6 +114,7 @@ async def get_submenu(
     background_tasks: BackgroundTasks,
     menu_id: str,
     submenu_id: str,
+    conditions: Conditions = Depends(),
     repo: SubmenuService = Depends(),
 ) -> SubmenuRead:
     """Получение подменю конкретного меню по id."""
@@ -79,6 +123,7 @@ async def get_submenu(
             id=submenu_id,
             menu_id=menu_id,
             background_tasks=background_tasks,
+            conditions=conditions,
         )
     except NoResultFound as error:
         raise HTTPException(
@@ -120,6 +165,36 @@ async def patch_submenu(
         )
 
 
+@submenu_router.delete(
+    SUBMENUS_LINK + BATCH_SUFFIX,
+    response_model=list[BatchResult],
+    status_code=200,
+    tags=['Подменю'],
+    summary='Удалить пакет подменю',
+)
+async def destroy_submenus_batch(
+    background_tasks: BackgroundTasks,
+    menu_id: str,
+    submenu_ids: list[UUID] = Body(
+        ..., min_items=1, max_items=BATCH_MAX_ITEMS,
+    ),
+    repo: SubmenuService = Depends(),
+) -> list[dict[str, str]]:
+    """Удаление пакета подменю меню одним запросом вместе с их блюдами.
+    Для каждого id возвращается результат удаления."""
+    try:
+        return await repo.delete_submenus(
+            menu_id=menu_id,
+            submenu_ids=submenu_ids,
+            background_tasks=background_tasks,
+        )
+    except NoResultFound as error:
+        raise HTTPException(
+            status_code=404,
+            detail=error.args[0],
+        )
+
+
 @submenu_router.delete(
     SUBMENU_LINK,
     status_code=200,
@@ -1,13 +1,25 @@
+from typing import Any
+from uuid import UUID, uuid4
+
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.exc import FlushError, NoResultFound
 
 from app.api.menus.crud_repository import MenuRepository
+from app.config import COUNTS_AGGREGATE
 from app.database.db_loader import get_db
-from app.database.models import Submenu
+from app.database.models import Dish, Submenu
 from app.database.schemas import SubmenuPost
-from app.database.services import check_objects, check_unique_submenu
+from app.database.services import (
+    check_objects,
+    delete_batch,
+    insert_returning,
+    paginate,
+    submenu_conflict,
+    upsert_batch,
+    write_returning,
+)
 
 
 class SubmenuRepository:
@@ -32,34 +44,46 @@ class SubmenuRepository:
             await check_objects(
                 db=self.db,
                 menu_id=menu_id,
+                conflict=submenu_conflict(submenu),
             )
-        except NoResultFound as error:
-            raise NoResultFound(error.args[0])
+        except FlushError:
+            raise FlushError('Подменю с такими параметрами уже есть')
+        values: dict[str, Any] = {
+            'title': submenu.title,
+            'description': submenu.description,
+            'menu_id': menu_id,
+        }
+        if submenu.id:
+            values['id'] = submenu.id
+        return await insert_returning(self.db, self.model, values)
+
+    async def create_submenus(
+        self,
+        submenus: list[SubmenuPost],
+        menu_id: str,
+    ) -> list[dict[str, str]]:
+        """Добавление и изменение пакета подменю меню."""
+        await check_objects(db=self.db, menu_id=menu_id)
+        rows = [
+            {
+                'id': submenu.id or uuid4(),
+                'title': submenu.title,
+                'description': submenu.description,
+                'menu_id': UUID(menu_id),
+                'content_hash': None,
+            }
+            for submenu in submenus
+        ]
         try:
-            await check_unique_submenu(
-                db=self.db,
-                submenu=submenu,
+            statuses = await upsert_batch(
+                self.db, self.model, rows, unique=['title'], parent='menu_id',
             )
         except FlushError:
             raise FlushError('Подменю с такими параметрами уже есть')
-        custom_id = submenu.id
-        if custom_id:
-            new_submenu = Submenu(
-                id=custom_id,
-                title=submenu.title,
-                description=submenu.description,
-                menu_id=menu_id,
-            )
-        else:
-            new_submenu = Submenu(
-                title=submenu.title,
-                description=submenu.description,
-                menu_id=menu_id,
-            )
-        self.db.add(new_submenu)
-        await self.db.commit()
-        await self.db.refresh(new_submenu)
-        return new_submenu
+        return [
+            {'id': str(row['id']), 'status': status}
+            for row, status in zip(rows, statuses)
+        ]
 
     async def update_submenu(
         self,
@@ -67,48 +91,103 @@ class SubmenuRepository:
         updated_submenu: SubmenuPost,
     ) -> Submenu:
         """Изменение подменю по id."""
-        current_submenu = await self.get_submenu_by_id(id=submenu_id)
-        if not current_submenu:
-            raise NoResultFound('submenu not found')
         try:
-            await check_unique_submenu(
+            await check_objects(
                 db=self.db,
-                submenu=updated_submenu,
                 submenu_id=submenu_id,
+                conflict=submenu_conflict(updated_submenu, submenu_id),
             )
         except FlushError:
             raise FlushError('Подменю с таким названием уже есть')
-        current_submenu.title = updated_submenu.title
-        current_submenu.description = updated_submenu.description
-        await self.db.merge(current_submenu)
-        await self.db.commit()
-        await self.db.refresh(current_submenu)
+        current_submenu = await write_returning(
+            self.db,
+            update(self.model).where(self.model.id == submenu_id).values(
+                title=updated_submenu.title,
+                description=updated_submenu.description,
+                content_hash=None,
+            ),
+            self.model,
+        )
+        if not current_submenu:
+            raise NoResultFound('submenu not found')
         return current_submenu
 
     async def get_submenu_by_id(self, id: str) -> Submenu:
         """Получение подменю по id."""
         current_submenu = (await self.db.execute(
-            select(self.model).where(self.model.id == id)
+            select(self.model).where(
+                self.model.id == id
+            ).execution_options(populate_existing=True)
         )).scalar()
         if not current_submenu:
             raise NoResultFound('submenu not found')
         return current_submenu
 
-    async def get_all_submenus(self, menu_id: str) -> list[Submenu]:
-        """Получение всех подменю."""
+    async def get_submenus_by_ids(self, ids: list[str]) -> list[Submenu]:
+        """Получение подменю по списку id."""
+        return (await self.db.execute(
+            select(self.model).where(
+                self.model.id.in_(ids)
+            ).execution_options(populate_existing=True)
+        )).scalars().all()
+
+    async def get_all_submenus(
+        self,
+        menu_id: str,
+        aggregate: bool = COUNTS_AGGREGATE,
+        limit: int | None = None,
+        after: UUID | None = None,
+        order: str | None = None,
+    ) -> list[Submenu]:
+        """Получение всех подменю или страницы списка подменю.
+        При aggregate=True количество блюд считается
+        одним запросом с группировкой, а не берётся из счётчика."""
         try:
             await check_objects(db=self.db, menu_id=menu_id)
         except NoResultFound:
             return []
-        else:
-            return ((await self.db.execute(
+        if not aggregate:
+            return ((await self.db.execute(paginate(
                 select(self.model).where(self.model.menu_id == menu_id),
-            )).scalars().all())
+                self.model, limit, after, order,
+            ))).scalars().all())
+        rows = (await self.db.execute(paginate(
+            select(
+                self.model.id,
+                self.model.title,
+                self.model.description,
+                self.model.menu_id,
+                func.count(Dish.id).label('dishes_count'),
+            ).outerjoin(
+                Dish, Dish.submenu_id == self.model.id
+            ).where(
+                self.model.menu_id == menu_id
+            ).group_by(self.model.id),
+            self.model, limit, after, order,
+        ))).all()
+        return [self.model(**row._mapping) for row in rows]
 
     async def delete_submenu(self, menu_id: str, submenu_id: str) -> None:
         """Удаление подменю конкретного меню по id."""
-        current_submenu = await self.get_submenu_by_id(id=submenu_id)
-        if not current_submenu:
+        if not await write_returning(
+            self.db,
+            delete(self.model).where(self.model.id == submenu_id),
+            self.model,
+        ):
             raise NoResultFound('submenu not found')
-        await self.db.delete(current_submenu)
-        await self.db.commit()
+
+    async def delete_submenus(
+        self,
+        submenu_ids: list[UUID],
+        menu_id: str,
+    ) -> list[dict[str, str]]:
+        """Удаление пакета подменю конкретного меню по id."""
+        await check_objects(db=self.db, menu_id=menu_id)
+        statuses = await delete_batch(
+            self.db, self.model, submenu_ids,
+            parent='menu_id', parent_id=menu_id,
+        )
+        return [
+            {'id': str(id), 'status': status}
+            for id, status in zip(submenu_ids, statuses)
+        ]
@@ -1,9 +1,14 @@
-from fastapi import BackgroundTasks, Depends
+from functools import partial
+from uuid import UUID
 
+from fastapi import BackgroundTasks, Depends, Response
+
+from app.api.conditions import Conditions
+from app.api.pagination import Page
 from app.api.submenus.crud_repository import SubmenuRepository
-from app.database.cache_repository import СacheRepository
+from app.database.cache_repository import Loader, СacheRepository
 from app.database.models import Submenu
-from app.database.schemas import SubmenuPost
+from app.database.schemas import SubmenuPost, SubmenuRead
 
 
 class SubmenuService:
@@ -17,39 +22,60 @@ class SubmenuService:
         self.crud_repo = crud_repo
         self.cache_repo = cache_repo
 
+    def loaders(
+        self,
+        menu_id: str,
+        submenu_id: str | None = None,
+    ) -> dict[str, Loader]:
+        """Загрузка изменённых подменю и меню для записи в кеш."""
+        loaders: dict[str, Loader] = {}
+        if submenu_id:
+            loaders['submenu'] = partial(
+                self.crud_repo.get_submenu_by_id, id=submenu_id,
+            )
+        loaders['menu'] = partial(
+            self.crud_repo.menu_repo.get_menu_by_id, id=menu_id,
+        )
+        return loaders
+
     async def get_all_submenus(
         self,
         background_tasks: BackgroundTasks,
+        conditions: Conditions,
         menu_id: str,
-    ) -> list[Submenu]:
-        """Получение всех подменю."""
-        cache = await self.cache_repo.get_all_submenus_cache(menu_id)
-        if cache:
-            return cache
-        items = await self.crud_repo.get_all_submenus(menu_id=menu_id)
-        background_tasks.add_task(
-            self.cache_repo.set_all_submenus_cache,
-            menu_id=menu_id,
-            items=items,
+        page: Page,
+    ) -> Response:
+        """Получение всех подменю или их страницы."""
+        entry = await self.cache_repo.get_all_submenus_cache(
+            menu_id,
+            partial(
+                self.crud_repo.get_all_submenus,
+                menu_id=menu_id,
+                limit=page.limit,
+                after=page.after,
+                order=page.order,
+            ),
+            background_tasks,
+            page.query,
+            page.projection(SubmenuRead),
         )
-        return items
+        return conditions.response(entry)
 
     async def get_submenu_by_id(
         self,
         background_tasks: BackgroundTasks,
+        conditions: Conditions,
         id: str,
         menu_id: str,
-    ) -> Submenu:
+    ) -> Response:
         """Получение подменю по id."""
-        cache = await self.cache_repo.get_submenu_cache(id, menu_id)
-        if cache:
-            return cache
-        item = await self.crud_repo.get_submenu_by_id(id=id)
-        background_tasks.add_task(
-            self.cache_repo.set_submenu_cache,
-            item,
+        entry = await self.cache_repo.get_submenu_cache(
+            id,
+            menu_id,
+            partial(self.crud_repo.get_submenu_by_id, id=id),
+            background_tasks,
         )
-        return item
+        return conditions.response(entry)
 
     async def create_submenu(
         self,
@@ -64,10 +90,40 @@ class SubmenuService:
         )
         background_tasks.add_task(
             self.cache_repo.create_submenu_cache,
-            item,
+            menu_id=str(item.menu_id),
+            submenu_id=str(item.id),
+            loaders=self.loaders(str(item.menu_id), str(item.id)),
         )
         return item
 
+    async def create_submenus(
+        self,
+        background_tasks: BackgroundTasks,
+        submenus: list[SubmenuPost],
+        menu_id: str,
+    ) -> list[dict[str, str]]:
+        """Добавление и изменение пакета подменю."""
+        results = await self.crud_repo.create_submenus(
+            submenus=submenus,
+            menu_id=menu_id,
+        )
+        submenu_ids = [
+            result['id'] for result in results
+            if result['status'] != 'conflict'
+        ]
+        if submenu_ids:
+            loaders = self.loaders(menu_id)
+            loaders['submenus'] = partial(
+                self.crud_repo.get_submenus_by_ids, ids=submenu_ids,
+            )
+            background_tasks.add_task(
+                self.cache_repo.create_submenus_cache,
+                menu_id=menu_id,
+                submenu_ids=submenu_ids,
+                loaders=loaders,
+            )
+        return results
+
     async def update_submenu(
         self,
         background_tasks: BackgroundTasks,
@@ -81,7 +137,9 @@ class SubmenuService:
         )
         background_tasks.add_task(
             self.cache_repo.update_submenu_cache,
-            item,
+            menu_id=str(item.menu_id),
+            submenu_id=submenu_id,
+            loaders=self.loaders(str(item.menu_id), submenu_id),
         )
         return item
 
@@ -95,8 +153,34 @@ class SubmenuService:
         background_tasks.add_task(
             self.cache_repo.delete_submenu_cache,
             menu_id=menu_id,
+            submenu_id=submenu_id,
+            loaders=self.loaders(menu_id),
         )
         await self.crud_repo.delete_submenu(
             menu_id=menu_id,
             submenu_id=submenu_id,
         )
+
+    async def delete_submenus(
+        self,
+        background_tasks: BackgroundTasks,
+        menu_id: str,
+        submenu_ids: list[UUID],
+    ) -> list[dict[str, str]]:
+        """Удаление пакета подменю конкретного меню."""
+        results = await self.crud_repo.delete_submenus(
+            submenu_ids=submenu_ids,
+            menu_id=menu_id,
+        )
+        deleted = [
+            result['id'] for result in results
+            if result['status'] == 'deleted'
+        ]
+        if deleted:
+            background_tasks.add_task(
+                self.cache_repo.delete_submenus_cache,
+                menu_id=menu_id,
+                submenu_ids=deleted,
+                loaders=self.loaders(menu_id),
+            )
+        return results
@@ -4,13 +4,17 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-PREFIX_LINK = 'http://backend:80/api/v1'
 MENUS_LINK = '/menus'
 MENU_LINK = '/menus/{menu_id}'
 SUBMENUS_LINK = '/menus/{menu_id}/submenus'
 SUBMENU_LINK = '/menus/{menu_id}/submenus/{submenu_id}'
 DISHES_LINK = '/menus/{menu_id}/submenus/{submenu_id}/dishes'
 DISH_LINK = '/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}'
+# пакетные запросы к спискам; суффикс ':batch' Starlette отбрасывает
+# при разборе пути, поэтому пакет - вложенный путь списка
+BATCH_SUFFIX = '/batch'
+FULL_BASE_LINK = '/fullbase'
+METRICS_LINK = '/metrics'
 
 POSTGRES_USER = os.getenv('POSTGRES_USER')
 POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD')
@@ -24,10 +28,71 @@ RABBITMQ_DEFAULT_PORT = os.getenv('RABBITMQ_DEFAULT_PORT')
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST')
 
 EXPIRATION = 3600
+# после мягкого устаревания запись кеша отдаётся, пока обновляется в фоне
+SOFT_EXPIRATION = 600
+# снимок древовидной структуры обновляется патчами при записи
+# и периодически перестраивается из базы после мягкого устаревания
+FULL_BASE_EXPIRATION = 24 * 3600
+FULL_BASE_SOFT_EXPIRATION = 3600
+
+# кеш тел ответов в памяти каждого процесса перед Redis,
+# согласованность поддерживается сообщениями о смене поколений
+LOCAL_CACHE = os.getenv('LOCAL_CACHE') == 'true'
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', 1000))
+LOCAL_CACHE_MAX_BYTES = int(os.getenv('LOCAL_CACHE_MAX_BYTES', 64 * 2 ** 20))
+LOCAL_CACHE_TTL = float(os.getenv('LOCAL_CACHE_TTL', 60))
+INVALIDATION_CHANNEL = 'cache_invalidation'
+
+# сжатие записей кеша больше порога в байтах: lz4, zlib или none,
+# без установленного lz4 используется zlib
+CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'lz4')
+CACHE_COMPRESS_THRESHOLD = int(os.getenv('CACHE_COMPRESS_THRESHOLD', 8192))
+
+# время жизни блокировки заполнения ключа кеша и интервал её ожидания
+CACHE_LOCK_TIMEOUT = 5
+CACHE_LOCK_POLL = 0.05
+
+# число команд в одном конвейерном запросе к Redis
+CACHE_BATCH_SIZE = 1000
+# время, на которое прогрев кеша забирает блокировки заполнения ключей
+WARM_LOCK_TIMEOUT = 60
+
+# потоковая выдача древовидной структуры базы: число строк, читаемых
+# из серверного курсора за раз, и размер отправляемой части ответа в байтах
+FULL_BASE_STREAM_ROWS = 1000
+FULL_BASE_STREAM_CHUNK = 64 * 1024
+
+# наибольшее число объектов на странице списка
+PAGE_MAX_LIMIT = 1000
+# наибольшее число объектов в одном пакетном запросе
+BATCH_MAX_ITEMS = 1000
+
+# подсчёт количества подменю и блюд в списках одним агрегирующим запросом
+# вместо хранимых счётчиков. Счётчики поддерживаются триггерами в обоих
+# режимах, флаг меняет только чтение списков меню и подменю. По умолчанию
+# выключен: чтение счётчиков не обходит дочерние таблицы. Включается
+# для сверки счётчиков с фактическим числом объектов (например, после
+# правки базы в обход приложения) и для сравнения времени чтения списков
+# на реальных данных; отдельные объекты всегда читают счётчики
+COUNTS_AGGREGATE = os.getenv('COUNTS_AGGREGATE') == 'true'
 
 MENU_FILE_PATH = '/code/app/admin/Menu.xlsx'
+FINGERPRINT_KEY = 'menu_file_fingerprint'
 
 CELERY_STATUS = os.getenv('CELERY_STATUS') == 'true'
 
+# пул соединений с базой каждого процесса: постоянные соединения и число
+# соединений сверх них, ожидание свободного соединения и время, после
+# которого соединение пересоздаётся, в секундах, проверка соединения перед
+# выдачей и число подготовленных запросов asyncpg на соединение
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true') == 'true'
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 100))
+# границы интервалов гистограммы ожидания соединения из пула в секундах
+DB_POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
 conn_url = (f'postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}'
             f'@database/{POSTGRES_DB}')
@@ -1,19 +1,377 @@
-import pickle
+import asyncio
+import hashlib
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple
 
 from aioredis import Redis
-from fastapi import Depends
+from fastapi import BackgroundTasks, Depends, Response
+from pydantic import BaseModel
+from sqlalchemy.orm.exc import NoResultFound
 
 from app.config import (
+    CACHE_BATCH_SIZE,
+    CACHE_LOCK_POLL,
+    CACHE_LOCK_TIMEOUT,
     DISH_LINK,
     DISHES_LINK,
     EXPIRATION,
+    FULL_BASE_EXPIRATION,
+    FULL_BASE_SOFT_EXPIRATION,
+    INVALIDATION_CHANNEL,
     MENU_LINK,
     MENUS_LINK,
+    SOFT_EXPIRATION,
     SUBMENU_LINK,
     SUBMENUS_LINK,
 )
-from app.database.db_loader import get_redis
-from app.database.models import Dish, Menu, Submenu
+from app.database.codec import compress, decompress, dumps, loads
+from app.database.db_loader import Base, get_redis
+from app.database.local_cache import local_cache
+from app.database.schemas import (
+    DishRead,
+    DishReadFullGet,
+    MenuRead,
+    MenuReadFullGet,
+    SubmenuRead,
+)
+
+# древовидная структура базы хранится снимком без поколений и срока жизни:
+# изменения объектов патчат его на месте, после синхронизации с файлом
+# он удаляется и собирается заново прогревом кеша
+FULL_BASE_KEY = 'full_base_snapshot'
+# Каждый ключ кеша помечается текущими поколениями своей области:
+# общим поколением всего кеша, поколением меню и поколением подменю.
+# Изменения объектов патчат записи кеша на месте, а смена поколения нужна
+# только при удалении меню или подменю вместе с вложенными объектами:
+# старые записи перестают читаться и истекают по EXPIRATION.
+ROOT_GENERATION = 'generation:root'
+MENU_GENERATION = 'generation:menu:{menu_id}'
+SUBMENU_GENERATION = 'generation:submenu:{submenu_id}'
+# страницы списка хранятся отдельными записями и не патчатся:
+# любое изменение списка сбрасывает их сменой поколения страниц
+PAGES_GENERATION = 'generation:pages:{key}'
+LIST_KEYS = ('menus', 'submenus', 'dishes')
+
+STAMP_SCRIPT = '''
+local stamp = {}
+for i, key in ipairs(KEYS) do
+    stamp[i] = redis.call('GET', key) or '0'
+end
+local stamped_key = ARGV[1] .. '@' .. table.concat(stamp, '.')
+'''
+# промах по ключу кеша заполняет один запрос: в процессе остальные ждут
+# его результат, между процессами - пока владелец блокировки заполнит кеш.
+# Блокировка берётся в том же запросе, что и чтение записи: при промахе
+# и при мягком устаревании записи, чтобы обновить её в фоне
+LOCK_PREFIX = 'lock:'
+GET_SCRIPT = STAMP_SCRIPT + '''
+local cache = redis.call('GET', stamped_key)
+if cache then
+    local soft_expiry = tonumber(string.match(cache, '^%d+'))
+    if soft_expiry == 0
+        or soft_expiry >= tonumber(redis.call('TIME')[1]) then
+        return {stamped_key, cache, 0}
+    end
+end
+local locked = redis.call(
+    'SET', ARGV[2] .. stamped_key, ARGV[3], 'NX', 'PX', ARGV[4]
+)
+return {stamped_key, cache, locked and 1 or 0}
+'''
+LOCK_SCRIPT = '''
+local cache = redis.call('GET', KEYS[1])
+if cache then
+    return {cache, 0}
+end
+local locked = redis.call('SET', KEYS[2], ARGV[1], 'NX', 'PX', ARGV[2])
+return {false, locked and 1 or 0}
+'''
+EXPIRY_SCRIPT = '''
+local function set(key, value, expiration)
+    return redis.call('SET', key, value, 'EX', expiration)
+end
+'''
+FILL_SCRIPT = EXPIRY_SCRIPT + '''
+if redis.call('GET', KEYS[2]) == ARGV[2] then
+    redis.call('DEL', KEYS[2])
+    return set(KEYS[1], ARGV[1], ARGV[3])
+end
+return false
+'''
+RELEASE_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+'''
+# изменение объекта перехватывает блокировку заполнения ключа, чтобы
+# загруженное до изменения значение не попало в кеш, и записывает новое
+# значение, только если запись не менялась с момента чтения
+WRITE_READ_SCRIPT = STAMP_SCRIPT + '''
+redis.call('DEL', ARGV[2] .. stamped_key)
+return {stamped_key, redis.call('GET', stamped_key)}
+'''
+WRITE_SCRIPT = EXPIRY_SCRIPT + '''
+local current = redis.call('GET', KEYS[1])
+if (current and redis.sha1hex(current) or '') ~= ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+if current then
+    return redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+end
+return set(KEYS[1], ARGV[2], ARGV[3])
+'''
+in_flight: dict[str, asyncio.Future] = {}
+
+Loader = Callable[[], Awaitable[Base | list[Base]]]
+Patch = Callable[[Any, dict[str, Base]], Any]
+
+
+class CacheEntry(NamedTuple):
+    """Тело ответа из кеша, его ETag и время изменения.
+    Тело хранится как в записи кеша и распаковывается при обращении,
+    ответ 304 его не распаковывает."""
+
+    payload: bytes
+    etag: str
+    modified: int
+
+    @property
+    def body(self) -> bytes:
+        """Тело ответа."""
+        return decompress(self.payload)
+
+
+class CacheKey(NamedTuple):
+    """Ключ записи кеша с поколениями, прочитанными при её получении.
+    У записи из памяти процесса ключа в Redis нет, stamped_key пустой."""
+
+    key: str
+    stamped_key: str
+    tags: list[str]
+    versions: tuple[int, ...]
+
+
+def stamp_key(key: str, stamp: list[bytes | None]) -> str:
+    """Ключ с поколениями, как его собирает STAMP_SCRIPT."""
+    return key + '@' + '.'.join(
+        generation.decode() if generation else '0' for generation in stamp
+    )
+
+
+def dump_json(content: Any) -> bytes:
+    """Сериализация содержимого в тело ответа API."""
+    return dumps(content)
+
+
+def render_json(
+    schema: type[BaseModel],
+    value: Base | list[Base],
+    fields: list[str] | None = None,
+) -> bytes:
+    """Сериализация объекта или списка объектов базы в тело ответа API."""
+    if isinstance(value, list):
+        return dump_json([read(schema, item, fields) for item in value])
+    return dump_json(read(schema, value, fields))
+
+
+def read(
+    schema: type[BaseModel],
+    item: Base,
+    fields: list[str] | None = None,
+) -> dict:
+    """Объект базы в виде ответа API, только поля fields, если они заданы."""
+    return schema.from_orm(item).dict(include=set(fields) if fields else None)
+
+
+def pages_generation(key: str) -> str | None:
+    """Поколение страниц списка по его ключу, None для остальных ключей."""
+    if key.rsplit('/', 1)[-1] in LIST_KEYS:
+        return PAGES_GENERATION.format(key=key)
+    return None
+
+
+def expirations(key: str) -> tuple[int, float]:
+    """Время жизни записи в Redis и время её мягкого устаревания.
+    Снимок древовидной структуры базы живёт дольше остальных записей,
+    но после мягкого устаревания перестраивается в фоне, чтобы патчи
+    не накапливали расхождения с базой."""
+    if key == FULL_BASE_KEY:
+        return (
+            FULL_BASE_EXPIRATION,
+            time.time() + FULL_BASE_SOFT_EXPIRATION,
+        )
+    return EXPIRATION, time.time() + SOFT_EXPIRATION
+
+
+def wrap(body: bytes, soft_expiry: float) -> bytes:
+    """Запись кеша: время мягкого устаревания, хеш, время записи
+    и сжатое тело ответа. Жёсткое устаревание - время жизни ключа в Redis."""
+    return b'%d %s %d\n' % (
+        soft_expiry, hashlib.sha1(body).hexdigest().encode(), time.time(),
+    ) + compress(body)
+
+
+def header(cache: bytes) -> tuple[int, str, int]:
+    """Время мягкого устаревания, ETag и время записи записи кеша."""
+    soft_expiry, digest, modified = cache[:cache.index(b'\n')].split()
+    return int(soft_expiry), f'"{digest.decode()}"', int(modified)
+
+
+def soft_expired(cache: bytes) -> bool:
+    """Проверка, пора ли обновлять запись кеша."""
+    soft_expiry = header(cache)[0]
+    return 0 < soft_expiry < time.time()
+
+
+def unwrap(cache: bytes) -> CacheEntry:
+    """Тело ответа, ETag и время изменения из записи кеша."""
+    return CacheEntry(cache[cache.index(b'\n') + 1:], *header(cache)[1:])
+
+
+def modified_passed(entry: CacheEntry) -> bool:
+    """Проверка, что секунда записи прошла: время изменения в заголовках
+    с точностью до секунды не совпадёт со временем следующей записи."""
+    return entry.modified < int(time.time())
+
+
+def not_modified(
+    entry: CacheEntry,
+    if_none_match: str | None = None,
+    if_modified_since: str | None = None,
+) -> bool:
+    """Проверка, что у клиента уже есть это тело ответа.
+    If-Modified-Since учитывается, только если нет If-None-Match
+    и секунда записи уже прошла."""
+    if if_none_match:
+        return if_none_match.strip() == '*' or entry.etag in {
+            tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+        }
+    if if_modified_since and modified_passed(entry):
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return entry.modified <= since
+    return False
+
+
+def cached_response(
+    entry: CacheEntry,
+    if_none_match: str | None = None,
+    if_modified_since: str | None = None,
+) -> Response:
+    """Ответ API из записи кеша с ETag и Last-Modified.
+    Last-Modified отдаётся, только когда секунда записи прошла.
+    Если у клиента уже есть это тело ответа, оно не передаётся."""
+    headers = {'ETag': entry.etag}
+    if modified_passed(entry):
+        headers['Last-Modified'] = formatdate(entry.modified, usegmt=True)
+    if not_modified(entry, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type='application/json', headers=headers)
+
+
+def upsert(
+    items: list[dict] | None,
+    item: dict,
+    **defaults: Any,
+) -> list[dict] | None:
+    """Замена полей элемента списка с тем же id или добавление в конец.
+    defaults дополняют только новый элемент."""
+    if items is None:
+        return None
+    for index, current in enumerate(items):
+        if current['id'] == item['id']:
+            return [*items[:index], {**current, **item}, *items[index + 1:]]
+    return [*items, {**item, **defaults}]
+
+
+def upsert_all(
+    items: list[dict] | None,
+    new_items: Iterable[dict],
+    **defaults: Any,
+) -> list[dict] | None:
+    """Замена полей или добавление в конец нескольких элементов списка
+    за один проход по нему."""
+    if items is None:
+        return None
+    new = {item['id']: item for item in new_items}
+    items = [
+        {**current, **new.pop(current['id'])}
+        if current['id'] in new else current
+        for current in items
+    ]
+    return [*items, *({**item, **defaults} for item in new.values())]
+
+
+def reader(
+    schema: type[BaseModel],
+    name: str,
+) -> Callable[[dict[str, Any]], dict[str, dict]]:
+    """Функция, возвращающая объекты базы objects[name] в виде ответов
+    API по id. Объекты сериализуются один раз на все записи кеша."""
+    items: dict[str, dict] = {}
+
+    def read_items(objects: dict[str, Any]) -> dict[str, dict]:
+        if not items:
+            items.update(
+                (item['id'], item)
+                for item in (read(schema, value) for value in objects[name])
+            )
+        return items
+    return read_items
+
+
+def read_by_id(
+    read_items: Callable[[dict[str, Any]], dict[str, dict]],
+    id: str,
+    current: Any,
+    objects: dict[str, Any],
+) -> dict | None:
+    """Изменение записи кеша объекта: объект с заданным id из прочитанных
+    read_items или None, если его нет."""
+    return read_items(objects).get(id)
+
+
+def remove(items: list[dict] | None, *ids: str) -> list[dict] | None:
+    """Удаление элементов списка по id."""
+    if items is None:
+        return None
+    removed = set(ids)
+    return [item for item in items if item['id'] not in removed]
+
+
+def patch_children(
+    items: list[dict] | None,
+    id: str,
+    key: str,
+    patch: Callable[[list[dict]], list[dict] | None],
+) -> list[dict] | None:
+    """Изменение списка вложенных объектов элемента с заданным id.
+    Если элемента нет, запись кеша разошлась с базой и удаляется."""
+    if items is None:
+        return None
+    for index, node in enumerate(items):
+        if node['id'] == id:
+            children = patch(node[key])
+            if children is None:
+                return None
+            node = {**node, key: children}
+            return [*items[:index], node, *items[index + 1:]]
+    return None
+
+
+def tree_node(item: dict) -> dict:
+    """Поля меню или подменю в древовидной структуре базы."""
+    return {
+        'title': item['title'],
+        'description': item['description'],
+        'id': item['id'],
+    }
 
 
 class СacheRepository():
@@ -25,55 +383,315 @@ class СacheRepository():
     ) -> None:
         self.cacher = cacher
 
-    async def delete_cache_by_mask(
+    def generation_keys(
+        self,
+        menu_id: str | None = None,
+        submenu_id: str | None = None,
+    ) -> list[str]:
+        """Ключи поколений, которыми помечается запись кеша.
+        Без menu_id - записи списка меню."""
+        generations = [ROOT_GENERATION]
+        if menu_id:
+            generations.append(MENU_GENERATION.format(menu_id=menu_id))
+        if submenu_id:
+            generations.append(
+                SUBMENU_GENERATION.format(submenu_id=submenu_id)
+            )
+        return generations
+
+    def page_generation_keys(
         self,
-        pattern: str,
+        key: str,
+        page: str,
+        menu_id: str | None = None,
+        submenu_id: str | None = None,
+    ) -> list[str]:
+        """Ключи поколений записи списка key или его страницы page."""
+        generations = self.generation_keys(menu_id, submenu_id)
+        if page and (generation := pages_generation(key)):
+            generations.append(generation)
+        return generations
+
+    async def get_cache(
+        self,
+        key: str,
+        generations: list[str],
+        token: str,
+    ) -> tuple[CacheKey, bytes | None, bool]:
+        """Получение записи кеша из памяти процесса или одним запросом к Redis.
+        Возвращает ключ с текущими поколениями для последующей записи,
+        запись из кеша или None и признак того, что блокировка заполнения
+        ключа получена с token: при промахе или устаревшей записи.
+        Устаревшие записи в памяти перечитываются из Redis."""
+        tags = [*generations, key]
+        versions = local_cache.get_versions()
+        cache = local_cache.get(key)
+        if cache is not None and not soft_expired(cache):
+            return CacheKey(key, '', tags, versions), cache, False
+        stamped_key, cache, locked = await self.cacher.eval(
+            GET_SCRIPT, len(generations), *generations,
+            key, LOCK_PREFIX, token, int(CACHE_LOCK_TIMEOUT * 1000),
+        )
+        cache_key = CacheKey(key, stamped_key.decode(), tags, versions)
+        if cache is not None:
+            local_cache.set(key, cache, tags, versions)
+        return cache_key, cache, bool(locked)
+
+    async def set_cache(
+        self,
+        cache_key: CacheKey,
+        cache: bytes,
+        token: str,
+    ) -> bool:
+        """Запись в кеш по ключу, полученному при чтении, со снятием
+        блокировки заполнения. Запись выполняется, только если блокировку
+        не перехватило изменение объекта. Если поколение успело смениться,
+        запись просто не будет прочитана."""
+        if not await self.cacher.eval(
+            FILL_SCRIPT, 2,
+            cache_key.stamped_key, LOCK_PREFIX + cache_key.stamped_key,
+            cache, token, expirations(cache_key.key)[0],
+        ):
+            return False
+        local_cache.set(
+            cache_key.key, cache, cache_key.tags, cache_key.versions,
+        )
+        return True
+
+    async def eval_many(
+        self,
+        script: str,
+        calls: list[tuple],
+        batch_size: int = CACHE_BATCH_SIZE,
+    ) -> list:
+        """Выполнение скрипта для списка наборов аргументов
+        (число ключей, ключи, аргументы) запросами по batch_size команд."""
+        results = []
+        for start in range(0, len(calls), batch_size):
+            async with self.cacher.pipeline(transaction=False) as pipe:
+                for numkeys, *args in calls[start:start + batch_size]:
+                    pipe.eval(script, numkeys, *args)
+                results.extend(await pipe.execute())
+        return results
+
+    async def fetch(
+        self,
+        key: str,
+        schema: type[BaseModel],
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+        generations: list[str],
+        fields: list[str] | None = None,
+    ) -> CacheEntry:
+        """Получение тела ответа из кеша или из базы.
+        Устаревшая запись отдаётся сразу и обновляется в фоне,
+        конкурентные промахи по одному ключу ждут одну загрузку."""
+        token = uuid.uuid4().hex
+        cache_key, cache, locked = await self.get_cache(
+            key, generations, token,
+        )
+        if cache is not None:
+            if locked:
+                background_tasks.add_task(
+                    self.fill, cache_key, schema, loader, token, fields,
+                )
+            return unwrap(cache)
+        while not locked and (future := in_flight.get(cache_key.stamped_key)):
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        in_flight[cache_key.stamped_key] = future
+        try:
+            entry = await self.load(
+                cache_key, schema, loader, token, locked, fields,
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()
+            raise
+        else:
+            future.set_result(entry)
+        finally:
+            if in_flight.get(cache_key.stamped_key) is future:
+                del in_flight[cache_key.stamped_key]
+        return entry
+
+    async def load(
+        self,
+        cache_key: CacheKey,
+        schema: type[BaseModel],
+        loader: Loader,
+        token: str,
+        locked: bool,
+        fields: list[str] | None = None,
+    ) -> CacheEntry:
+        """Загрузка тела ответа из базы под блокировкой в Redis.
+        Если блокировку держит другой процесс, ждём его запись в кеш,
+        а по истечении блокировки загружаем сами."""
+        for _ in range(int(CACHE_LOCK_TIMEOUT / CACHE_LOCK_POLL)):
+            if locked:
+                break
+            await asyncio.sleep(CACHE_LOCK_POLL)
+            cache, locked = await self.cacher.eval(
+                LOCK_SCRIPT, 2,
+                cache_key.stamped_key, LOCK_PREFIX + cache_key.stamped_key,
+                token, int(CACHE_LOCK_TIMEOUT * 1000),
+            )
+            if cache is not None:
+                return unwrap(cache)
+        return await self.fill(cache_key, schema, loader, token, fields)
+
+    async def fill(
+        self,
+        cache_key: CacheKey,
+        schema: type[BaseModel],
+        loader: Loader,
+        token: str,
+        fields: list[str] | None = None,
+    ) -> CacheEntry:
+        """Загрузка тела ответа из базы и запись в кеш под блокировкой.
+        В фоне так обновляется устаревшая запись."""
+        filled = False
+        try:
+            body = render_json(schema, await loader(), fields)
+            cache = wrap(body, expirations(cache_key.key)[1])
+            filled = await self.set_cache(cache_key, cache, token)
+        finally:
+            if not filled:
+                await self.cacher.eval(
+                    RELEASE_SCRIPT, 1,
+                    LOCK_PREFIX + cache_key.stamped_key, token,
+                )
+        return CacheEntry(body, *header(cache)[1:])
+
+    async def write_through(
+        self,
+        patches: dict[str, tuple[list[str], Patch | None]],
+        loaders: dict[str, Loader] | None = None,
+        generations: tuple[str, ...] = (),
     ) -> None:
-        """Удаление кэша по маске."""
-        for key in await self.cacher.keys(pattern + '*'):
-            await self.cacher.delete(key)
+        """Изменение записей кеша на месте после изменения объектов в базе.
+        Для каждого ключа задаются его поколения и функция, которая по
+        содержимому записи (None, если её нет) и объектам, загруженным
+        из базы уже после чтения кеша, возвращает новое содержимое.
+        None вместо функции или её результата удаляет запись, записи,
+        изменённые конкурентно, тоже удаляются. Поколения из generations
+        и поколения страниц изменённых списков меняются в том же запросе."""
+        generations = (*generations, *filter(None, map(
+            pages_generation, patches,
+        )))
+        current = []
+        if patches:
+            async with self.cacher.pipeline(transaction=False) as pipe:
+                for key, (key_generations, _) in patches.items():
+                    pipe.eval(
+                        WRITE_READ_SCRIPT, len(key_generations),
+                        *key_generations, key, LOCK_PREFIX,
+                    )
+                current = await pipe.execute()
+        try:
+            objects = {
+                name: await loader()
+                for name, loader in (loaders or {}).items()
+            }
+        except NoResultFound:
+            objects = {}
+            patches = {
+                key: (key_generations, None)
+                for key, (key_generations, _) in patches.items()
+            }
+        tags = [*generations, *patches]
+        async with self.cacher.pipeline(transaction=True) as pipe:
+            for (key, (_, patch)), (stamped_key, cache) in zip(
+                patches.items(), current,
+            ):
+                content = patch and patch(
+                    loads(unwrap(cache).body) if cache else None,
+                    objects,
+                )
+                if content is None:
+                    pipe.delete(stamped_key)
+                    continue
+                expiration, soft_expiry = expirations(key)
+                pipe.eval(
+                    WRITE_SCRIPT, 1, stamped_key,
+                    hashlib.sha1(cache).hexdigest() if cache else '',
+                    wrap(
+                        dump_json(content),
+                        header(cache)[0] if cache else soft_expiry,
+                    ),
+                    expiration,
+                )
+            for generation in generations:
+                pipe.incr(generation)
+            pipe.publish(INVALIDATION_CHANNEL, ' '.join(tags))
+            await pipe.execute()
+        local_cache.invalidate(tags)
 
-    async def set_all_dishes_cache(
+    def menu_patches(
         self,
         menu_id: str,
-        submenu_id: str,
-        items: list[Dish],
-    ) -> None:
-        """Запись всех блюд в кеш."""
-        await self.cacher.set(
-            DISHES_LINK.format(menu_id=menu_id, submenu_id=submenu_id),
-            pickle.dumps(items), ex=EXPIRATION
-        )
+    ) -> dict[str, tuple[list[str], Patch | None]]:
+        """Изменения записей меню и списка меню по меню из базы."""
+        return {
+            MENU_LINK.format(menu_id=menu_id): (
+                self.generation_keys(menu_id),
+                lambda _, objects: read(MenuRead, objects['menu']),
+            ),
+            MENUS_LINK: (
+                self.generation_keys(),
+                lambda menus, objects: upsert(
+                    menus, read(MenuRead, objects['menu']),
+                ),
+            ),
+        }
 
-    async def get_all_dishes_cache(
+    def submenu_patches(
         self,
         menu_id: str,
         submenu_id: str,
-    ) -> list[Dish] | None:
-        """Получение всех блюд из кеша."""
-        cache = await self.cacher.get(
-            DISHES_LINK.format(menu_id=menu_id, submenu_id=submenu_id),
-        )
-        if cache:
-            items = pickle.loads(cache)
-            return items
-        return None
+    ) -> dict[str, tuple[list[str], Patch | None]]:
+        """Изменения записей подменю, списка подменю, меню и списка меню
+        по подменю и меню из базы."""
+        generations = self.generation_keys(menu_id)
+        return {
+            SUBMENU_LINK.format(menu_id=menu_id, submenu_id=submenu_id): (
+                generations,
+                lambda _, objects: read(SubmenuRead, objects['submenu']),
+            ),
+            SUBMENUS_LINK.format(menu_id=menu_id): (
+                generations,
+                lambda submenus, objects: upsert(
+                    submenus, read(SubmenuRead, objects['submenu']),
+                ),
+            ),
+            **self.menu_patches(menu_id),
+        }
 
-    async def set_dish_cache(
+    async def get_all_dishes_cache(
         self,
-        item: Dish,
-        submenu_id: str,
         menu_id: str,
-    ) -> None:
-        """Запись блюда в кеш."""
-        await self.cacher.set(
-            DISH_LINK.format(
-                menu_id=menu_id,
-                submenu_id=submenu_id,
-                dish_id=str(item.id),
-            ),
-            pickle.dumps(item),
-            ex=EXPIRATION,
+        submenu_id: str,
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+        page: str = '',
+        fields: list[str] | None = None,
+    ) -> CacheEntry:
+        """Получение всех блюд или их страницы из кеша или из базы."""
+        key = DISHES_LINK.format(menu_id=menu_id, submenu_id=submenu_id)
+        return await self.fetch(
+            key + page,
+            DishRead,
+            loader,
+            background_tasks,
+            self.page_generation_keys(key, page, menu_id, submenu_id),
+            fields,
         )
 
     async def get_dish_cache(
@@ -81,206 +699,481 @@ class СacheRepository():
         id: str,
         menu_id: str,
         submenu_id: str,
-    ) -> Dish | None:
-        """Получение блюда из кеша."""
-        cache = await self.cacher.get(
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+    ) -> CacheEntry:
+        """Получение блюда из кеша или из базы."""
+        return await self.fetch(
             DISH_LINK.format(
                 menu_id=menu_id,
                 submenu_id=submenu_id,
                 dish_id=id,
             ),
+            DishRead,
+            loader,
+            background_tasks,
+            self.generation_keys(menu_id, submenu_id),
         )
-        if cache:
-            item = pickle.loads(cache)
-            return item
-        return None
 
     async def create_dish_cache(
         self,
-        item: Dish,
-        submenu_id: str,
         menu_id: str,
+        submenu_id: str,
+        dish_id: str,
+        loaders: dict[str, Loader],
     ) -> None:
-        """Работа с кэшем при создании нового блюда."""
-        await self.delete_cache_by_mask(MENU_LINK.format(menu_id=menu_id))
-        await self.delete_all_menu_cache()
-        await self.set_dish_cache(
-            item=item,
-            submenu_id=submenu_id,
-            menu_id=menu_id,
+        """Работа с кэшем при создании нового блюда.
+        loaders загружают блюдо, подменю и меню."""
+        generations = self.generation_keys(menu_id, submenu_id)
+        await self.write_through(
+            {
+                DISH_LINK.format(
+                    menu_id=menu_id,
+                    submenu_id=submenu_id,
+                    dish_id=dish_id,
+                ): (
+                    generations,
+                    lambda _, objects: read(DishRead, objects['dish']),
+                ),
+                DISHES_LINK.format(menu_id=menu_id, submenu_id=submenu_id): (
+                    generations,
+                    lambda dishes, objects: upsert(
+                        dishes, read(DishRead, objects['dish']),
+                    ),
+                ),
+                **self.submenu_patches(menu_id, submenu_id),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: patch_children(
+                        tree, menu_id, 'submenus',
+                        lambda submenus: patch_children(
+                            submenus, submenu_id, 'dishes',
+                            lambda dishes: upsert(
+                                dishes, read(DishReadFullGet, objects['dish']),
+                            ),
+                        ),
+                    ),
+                ),
+            },
+            loaders=loaders,
         )
 
     async def update_dish_cache(
         self,
-        item: Dish,
         menu_id: str,
         submenu_id: str,
+        dish_id: str,
+        loaders: dict[str, Loader],
     ) -> None:
         """Работа с кэшем при изменении блюда."""
-        await self.delete_all_dish_cache(submenu_id, menu_id)
-        await self.delete_full_base_cache()
-        await self.set_dish_cache(
-            item=item,
-            submenu_id=submenu_id,
+        await self.create_dish_cache(
             menu_id=menu_id,
+            submenu_id=submenu_id,
+            dish_id=dish_id,
+            loaders=loaders,
         )
 
-    async def delete_dish_cache(
+    async def create_dishes_cache(
         self,
-        menu_id: str
+        menu_id: str,
+        submenu_id: str,
+        dish_ids: list[str],
+        loaders: dict[str, Loader],
     ) -> None:
-        """Работа с кэшем при удалении блюда."""
-        await self.delete_cache_by_mask(MENU_LINK.format(menu_id=menu_id))
-        await self.delete_all_menu_cache()
+        """Работа с кэшем после записи пакета блюд одним запросом к Redis.
+        loaders загружают блюда, подменю и меню."""
+        generations = self.generation_keys(menu_id, submenu_id)
+        dishes_read = reader(DishRead, 'dishes')
+        tree_dishes_read = reader(DishReadFullGet, 'dishes')
+        await self.write_through(
+            {
+                **{
+                    DISH_LINK.format(
+                        menu_id=menu_id,
+                        submenu_id=submenu_id,
+                        dish_id=dish_id,
+                    ): (
+                        generations,
+                        partial(read_by_id, dishes_read, dish_id),
+                    )
+                    for dish_id in dish_ids
+                },
+                DISHES_LINK.format(menu_id=menu_id, submenu_id=submenu_id): (
+                    generations,
+                    lambda dishes, objects: upsert_all(
+                        dishes, dishes_read(objects).values(),
+                    ),
+                ),
+                **self.submenu_patches(menu_id, submenu_id),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: patch_children(
+                        tree, menu_id, 'submenus',
+                        lambda submenus: patch_children(
+                            submenus, submenu_id, 'dishes',
+                            lambda dishes: upsert_all(
+                                dishes, tree_dishes_read(objects).values(),
+                            ),
+                        ),
+                    ),
+                ),
+            },
+            loaders=loaders,
+        )
 
-    async def delete_all_dish_cache(
+    async def delete_dish_cache(
         self,
-        submenu_id: str,
         menu_id: str,
+        submenu_id: str,
+        dish_id: str,
+        loaders: dict[str, Loader],
     ) -> None:
-        """Удаление всех блюд подменю из кеша."""
-        await self.cacher.delete(
-            DISHES_LINK.format(menu_id=menu_id, submenu_id=submenu_id)
+        """Работа с кэшем при удалении блюда.
+        loaders загружают подменю и меню."""
+        await self.delete_dishes_cache(
+            menu_id, submenu_id, [dish_id], loaders,
         )
 
-    async def set_all_submenus_cache(
+    async def delete_dishes_cache(
         self,
         menu_id: str,
-        items: list[Submenu],
+        submenu_id: str,
+        dish_ids: list[str],
+        loaders: dict[str, Loader],
     ) -> None:
-        """Запись всех подменю в кеш."""
-        await self.cacher.set(
-            SUBMENUS_LINK.format(menu_id=menu_id),
-            pickle.dumps(items),
-            ex=EXPIRATION,
+        """Работа с кэшем при удалении пакета блюд одной записью.
+        loaders загружают подменю и меню."""
+        generations = self.generation_keys(menu_id, submenu_id)
+        await self.write_through(
+            {
+                **{
+                    DISH_LINK.format(
+                        menu_id=menu_id,
+                        submenu_id=submenu_id,
+                        dish_id=dish_id,
+                    ): (generations, None)
+                    for dish_id in dish_ids
+                },
+                DISHES_LINK.format(menu_id=menu_id, submenu_id=submenu_id): (
+                    generations,
+                    lambda dishes, objects: remove(dishes, *dish_ids),
+                ),
+                **self.submenu_patches(menu_id, submenu_id),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: patch_children(
+                        tree, menu_id, 'submenus',
+                        lambda submenus: patch_children(
+                            submenus, submenu_id, 'dishes',
+                            lambda dishes: remove(dishes, *dish_ids),
+                        ),
+                    ),
+                ),
+            },
+            loaders=loaders,
         )
 
     async def get_all_submenus_cache(
         self,
         menu_id: str,
-    ) -> list[Submenu] | None:
-        """Получение всех подменю из кеша."""
-        cache = await self.cacher.get(SUBMENUS_LINK.format(menu_id=menu_id))
-        if cache:
-            items = pickle.loads(cache)
-            return items
-        return None
-
-    async def set_submenu_cache(self, item: Submenu) -> None:
-        """Запись подменю в кеш."""
-        await self.cacher.set(
-            SUBMENU_LINK.format(
-                menu_id=str(item.menu_id),
-                submenu_id=str(item.id),
-            ),
-            pickle.dumps(item),
-            ex=EXPIRATION,
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+        page: str = '',
+        fields: list[str] | None = None,
+    ) -> CacheEntry:
+        """Получение всех подменю или их страницы из кеша или из базы."""
+        key = SUBMENUS_LINK.format(menu_id=menu_id)
+        return await self.fetch(
+            key + page,
+            SubmenuRead,
+            loader,
+            background_tasks,
+            self.page_generation_keys(key, page, menu_id),
+            fields,
         )
 
-    async def get_submenu_cache(self, id: str, menu_id: str) -> Submenu | None:
-        """Получение подменю из кеша."""
-        cache = await self.cacher.get(
+    async def get_submenu_cache(
+        self,
+        id: str,
+        menu_id: str,
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+    ) -> CacheEntry:
+        """Получение подменю из кеша или из базы."""
+        return await self.fetch(
             SUBMENU_LINK.format(menu_id=menu_id, submenu_id=id),
+            SubmenuRead,
+            loader,
+            background_tasks,
+            self.generation_keys(menu_id),
         )
-        if cache:
-            item = pickle.loads(cache)
-            return item
-        return None
 
-    async def create_submenu_cache(self, item: Submenu) -> None:
-        """Работа с кэшем при создании нового подменю."""
-        await self.delete_cache_by_mask(
-            MENU_LINK.format(menu_id=str(item.menu_id)),
+    async def create_submenu_cache(
+        self,
+        menu_id: str,
+        submenu_id: str,
+        loaders: dict[str, Loader],
+    ) -> None:
+        """Работа с кэшем при создании нового подменю.
+        loaders загружают подменю и меню."""
+        await self.write_through(
+            {
+                **self.submenu_patches(menu_id, submenu_id),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: patch_children(
+                        tree, menu_id, 'submenus',
+                        lambda submenus: upsert(
+                            submenus,
+                            tree_node(read(SubmenuRead, objects['submenu'])),
+                            dishes=[],
+                        ),
+                    ),
+                ),
+            },
+            loaders=loaders,
         )
-        await self.delete_all_menu_cache()
-        await self.set_submenu_cache(item)
 
-    async def update_submenu_cache(self, item: Submenu) -> None:
+    async def update_submenu_cache(
+        self,
+        menu_id: str,
+        submenu_id: str,
+        loaders: dict[str, Loader],
+    ) -> None:
         """Работа с кэшем при изменении подменю."""
-        await self.delete_all_submenu_cache(str(item.menu_id))
-        await self.delete_full_base_cache()
-        await self.set_submenu_cache(item)
-
-    async def delete_submenu_cache(self, menu_id: str) -> None:
-        """Работа с кэшем при удалении подменю."""
-        await self.delete_cache_by_mask(
-            MENU_LINK.format(menu_id=menu_id)
+        await self.create_submenu_cache(
+            menu_id=menu_id,
+            submenu_id=submenu_id,
+            loaders=loaders,
         )
-        await self.delete_all_menu_cache()
-
-    async def delete_all_submenu_cache(self, menu_id: str) -> None:
-        """Удаление всех подменю меню из кеша."""
-        await self.cacher.delete(SUBMENUS_LINK.format(menu_id=menu_id))
-
-    async def set_all_menus_cache(self, items: list[Menu]) -> None:
-        """Запись всех меню в кеш."""
-        await self.cacher.set(
-            MENUS_LINK,
-            pickle.dumps(items),
-            ex=EXPIRATION,
+
+    async def create_submenus_cache(
+        self,
+        menu_id: str,
+        submenu_ids: list[str],
+        loaders: dict[str, Loader],
+    ) -> None:
+        """Работа с кэшем после записи пакета подменю одним запросом
+        к Redis. loaders загружают подменю и меню."""
+        generations = self.generation_keys(menu_id)
+        submenus_read = reader(SubmenuRead, 'submenus')
+        await self.write_through(
+            {
+                **{
+                    SUBMENU_LINK.format(
+                        menu_id=menu_id,
+                        submenu_id=submenu_id,
+                    ): (
+                        generations,
+                        partial(read_by_id, submenus_read, submenu_id),
+                    )
+                    for submenu_id in submenu_ids
+                },
+                SUBMENUS_LINK.format(menu_id=menu_id): (
+                    generations,
+                    lambda submenus, objects: upsert_all(
+                        submenus, submenus_read(objects).values(),
+                    ),
+                ),
+                **self.menu_patches(menu_id),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: patch_children(
+                        tree, menu_id, 'submenus',
+                        lambda submenus: upsert_all(
+                            submenus,
+                            map(tree_node, submenus_read(objects).values()),
+                            dishes=[],
+                        ),
+                    ),
+                ),
+            },
+            loaders=loaders,
         )
 
-    async def get_all_menus_cache(self) -> list[Menu] | None:
-        """Получение всех меню из кеша."""
-        cache = await self.cacher.get(MENUS_LINK)
-        if cache:
-            items = pickle.loads(cache)
-            return items
-        return None
+    async def delete_submenu_cache(
+        self,
+        menu_id: str,
+        submenu_id: str,
+        loaders: dict[str, Loader],
+    ) -> None:
+        """Работа с кэшем при удалении подменю.
+        loaders загружают меню, записи блюд подменю сбрасываются
+        сменой его поколения."""
+        await self.delete_submenus_cache(menu_id, [submenu_id], loaders)
 
-    async def set_full_base_menu_cache(self, items: list[Menu]) -> None:
-        """Запись древовидной структуры базы в кэш."""
-        await self.cacher.set(
-            'full_base_menu',
-            pickle.dumps(items),
-            ex=EXPIRATION,
+    async def delete_submenus_cache(
+        self,
+        menu_id: str,
+        submenu_ids: list[str],
+        loaders: dict[str, Loader],
+    ) -> None:
+        """Работа с кэшем при удалении пакета подменю одной записью.
+        loaders загружают меню, записи блюд подменю сбрасываются
+        сменой их поколений."""
+        generations = self.generation_keys(menu_id)
+        await self.write_through(
+            {
+                **{
+                    SUBMENU_LINK.format(
+                        menu_id=menu_id,
+                        submenu_id=submenu_id,
+                    ): (generations, None)
+                    for submenu_id in submenu_ids
+                },
+                SUBMENUS_LINK.format(menu_id=menu_id): (
+                    generations,
+                    lambda submenus, objects: remove(submenus, *submenu_ids),
+                ),
+                **self.menu_patches(menu_id),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: patch_children(
+                        tree, menu_id, 'submenus',
+                        lambda submenus: remove(submenus, *submenu_ids),
+                    ),
+                ),
+            },
+            loaders=loaders,
+            generations=tuple(
+                SUBMENU_GENERATION.format(submenu_id=submenu_id)
+                for submenu_id in submenu_ids
+            ),
         )
 
-    async def get_full_base_menu_cache(self) -> list[Menu] | None:
-        """Получение древовидной структуры базы из кеша."""
-        cache = await self.cacher.get('full_base_menu')
-        if cache:
-            items = pickle.loads(cache)
-            return items
-        return None
+    async def get_all_menus_cache(
+        self,
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+        page: str = '',
+        fields: list[str] | None = None,
+    ) -> CacheEntry:
+        """Получение всех меню или их страницы из кеша или из базы."""
+        return await self.fetch(
+            MENUS_LINK + page,
+            MenuRead,
+            loader,
+            background_tasks,
+            self.page_generation_keys(MENUS_LINK, page),
+            fields,
+        )
 
-    async def set_menu_cache(self, item: Menu) -> None:
-        """Запись меню в кеш."""
-        await self.cacher.set(
-            MENU_LINK.format(menu_id=str(item.id)),
-            pickle.dumps(item),
-            ex=EXPIRATION,
+    async def get_full_base_menu_cache(
+        self,
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+    ) -> CacheEntry:
+        """Получение снимка древовидной структуры базы из кеша или из базы."""
+        return await self.fetch(
+            FULL_BASE_KEY, MenuReadFullGet, loader, background_tasks, [],
         )
 
-    async def get_menu_cache(self, id: str) -> Menu | None:
-        """Получение меню из кеша."""
-        cache = await self.cacher.get(MENU_LINK.format(menu_id=id))
-        if cache:
-            item = pickle.loads(cache)
-            return item
-        return None
+    async def get_menu_cache(
+        self,
+        id: str,
+        loader: Loader,
+        background_tasks: BackgroundTasks,
+    ) -> CacheEntry:
+        """Получение меню из кеша или из базы."""
+        return await self.fetch(
+            MENU_LINK.format(menu_id=id),
+            MenuRead,
+            loader,
+            background_tasks,
+            self.generation_keys(id),
+        )
 
-    async def create_update_menu_cache(self, item: Menu) -> None:
-        """Работа с кэшем при создании нового меню."""
-        await self.delete_all_menu_cache()
-        await self.cacher.set(
-            MENU_LINK.format(menu_id=str(item.id)),
-            pickle.dumps(item),
-            ex=EXPIRATION,
+    async def create_update_menu_cache(
+        self,
+        menu_id: str,
+        loaders: dict[str, Loader],
+    ) -> None:
+        """Работа с кэшем при создании или изменении меню.
+        loaders загружают меню."""
+        await self.write_through(
+            {
+                **self.menu_patches(menu_id),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: upsert(
+                        tree,
+                        tree_node(read(MenuRead, objects['menu'])),
+                        submenus=[],
+                    ),
+                ),
+            },
+            loaders=loaders,
         )
 
-    async def delete_all_menu_cache(self) -> None:
-        """Удаление всех меню из кеша."""
-        await self.cacher.delete(MENUS_LINK)
-        await self.delete_full_base_cache()
+    async def create_menus_cache(
+        self,
+        menu_ids: list[str],
+        loaders: dict[str, Loader],
+    ) -> None:
+        """Работа с кэшем после записи пакета меню одним запросом к Redis.
+        loaders загружают меню."""
+        menus_read = reader(MenuRead, 'menus')
+        await self.write_through(
+            {
+                **{
+                    MENU_LINK.format(menu_id=menu_id): (
+                        self.generation_keys(menu_id),
+                        partial(read_by_id, menus_read, menu_id),
+                    )
+                    for menu_id in menu_ids
+                },
+                MENUS_LINK: (
+                    self.generation_keys(),
+                    lambda menus, objects: upsert_all(
+                        menus, menus_read(objects).values(),
+                    ),
+                ),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: upsert_all(
+                        tree,
+                        map(tree_node, menus_read(objects).values()),
+                        submenus=[],
+                    ),
+                ),
+            },
+            loaders=loaders,
+        )
 
-    async def delete_full_base_cache(self) -> None:
-        """Удаление древовидной структуры базы из кеша."""
-        await self.cacher.delete('full_base_menu')
+    async def delete_all_cache(self) -> None:
+        """Удаление всего кеша меню, подменю и блюд."""
+        await self.write_through(
+            {FULL_BASE_KEY: ([], None)},
+            generations=(ROOT_GENERATION,),
+        )
 
     async def delete_menu_cache(self, menu_id: str) -> None:
-        """Работа с кэшем при удалении меню."""
-        await self.delete_cache_by_mask(
-            MENU_LINK.format(menu_id=menu_id),
+        """Работа с кэшем при удалении меню.
+        Записи подменю и блюд меню сбрасываются сменой его поколения."""
+        await self.delete_menus_cache([menu_id])
+
+    async def delete_menus_cache(self, menu_ids: list[str]) -> None:
+        """Работа с кэшем при удалении пакета меню одной записью.
+        Записи подменю и блюд меню сбрасываются сменой их поколений."""
+        await self.write_through(
+            {
+                **{
+                    MENU_LINK.format(menu_id=menu_id): (
+                        self.generation_keys(menu_id), None,
+                    )
+                    for menu_id in menu_ids
+                },
+                MENUS_LINK: (
+                    self.generation_keys(),
+                    lambda menus, objects: remove(menus, *menu_ids),
+                ),
+                FULL_BASE_KEY: (
+                    [],
+                    lambda tree, objects: remove(tree, *menu_ids),
+                ),
+            },
+            generations=tuple(
+                MENU_GENERATION.format(menu_id=menu_id)
+                for menu_id in menu_ids
+            ),
         )
-        await self.delete_all_menu_cache()
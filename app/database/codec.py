@@ -0,0 +1,61 @@
+import json
+import zlib
+from typing import Any
+
+from app.config import CACHE_COMPRESS_THRESHOLD, CACHE_COMPRESSION
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# сжатые данные отличаются от тела ответа по первым байтам:
+# JSON начинается с '{' или '[', поток zlib - с 'x'
+LZ4_MAGIC = b'\x04\x22\x4d\x18'
+ZLIB_MAGIC = b'x'
+
+
+def dumps(content: Any) -> bytes:
+    """Сериализация в компактный JSON, через orjson, если он установлен."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
+
+
+def loads(body: bytes) -> Any:
+    """Десериализация JSON."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def compress(
+    body: bytes,
+    method: str = CACHE_COMPRESSION,
+    threshold: int = CACHE_COMPRESS_THRESHOLD,
+) -> bytes:
+    """Сжатие тела ответа для хранения в кеше, если оно больше порога.
+    Без установленного lz4 используется zlib."""
+    if method == 'none' or len(body) < threshold:
+        return body
+    if method == 'lz4' and lz4 is not None:
+        return lz4.frame.compress(body)
+    return zlib.compress(body, 1)
+
+
+def decompress(payload: bytes) -> bytes:
+    """Тело ответа из данных, сжатых любым из методов или несжатых."""
+    if payload.startswith(ZLIB_MAGIC):
+        return zlib.decompress(payload)
+    if payload.startswith(LZ4_MAGIC):
+        return lz4.frame.decompress(payload)
+    return payload
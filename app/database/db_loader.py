@@ -1,12 +1,34 @@
 from aioredis import ConnectionPool, Redis
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from app.config import REDIS_URL, conn_url
+from app.config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    FINGERPRINT_KEY,
+    REDIS_URL,
+    conn_url,
+)
+from app.database.pool_metrics import MeteredPool
 
 Base = declarative_base()
-engine = create_async_engine(conn_url)
+engine = create_async_engine(
+    conn_url,
+    poolclass=MeteredPool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={'prepared_statement_cache_size': DB_STATEMENT_CACHE_SIZE},
+)
 
 AsyncSessionLocal = sessionmaker(autocommit=False, autoflush=False,
                                  bind=engine, class_=AsyncSession)
@@ -18,10 +40,21 @@ async def get_db():
         yield async_session
 
 
+def create_tables(conn: Connection) -> bool:
+    """Создание отсутствующих таблиц.
+    Возвращает True, если хотя бы одна таблица создана заново."""
+    existing = set(inspect(conn).get_table_names())
+    Base.metadata.create_all(conn)
+    return not existing.issuperset(Base.metadata.tables)
+
+
 async def init_db():
-    """Создание таблиц."""
+    """Создание таблиц. Если таблицы созданы заново, отпечаток файла меню
+    сбрасывается, чтобы следующая синхронизация заполнила пустую базу."""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        created = await conn.run_sync(create_tables)
+    if created:
+        await get_redis().delete(FINGERPRINT_KEY)
 
 
 def create_redis():
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+
+from aioredis import Redis
+from aioredis.exceptions import ConnectionError
+
+from app.config import (
+    INVALIDATION_CHANNEL,
+    LOCAL_CACHE_MAX_BYTES,
+    LOCAL_CACHE_MAX_ENTRIES,
+    LOCAL_CACHE_TTL,
+)
+
+
+class LocalCache:
+    """Кеш тел ответов в памяти процесса перед кешем Redis.
+    Записи помечаются ключами поколений своей области и удаляются
+    по сообщениям об их смене из канала Redis.
+    Для проверки записи после чтения хранится номер последней смены
+    каждой области, но не больше max_entries областей: при переполнении
+    номера забываются, а записи по более ранним чтениям пропускаются."""
+
+    def __init__(
+        self,
+        max_entries: int = LOCAL_CACHE_MAX_ENTRIES,
+        max_bytes: int = LOCAL_CACHE_MAX_BYTES,
+        ttl: float = LOCAL_CACHE_TTL,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: OrderedDict[
+            str, tuple[bytes, tuple[str, ...], float]
+        ] = OrderedDict()
+        self.tagged: defaultdict[str, set[str]] = defaultdict(set)
+        self.versions: dict[str, int] = {}
+        self.size = 0
+        self.epoch = 0
+        self.sequence = 0
+        self.floor = 0
+        self.subscribed = False
+
+    def get_versions(self) -> tuple[int, ...]:
+        """Текущая версия кеша для проверки при записи.
+        Без подписки на канал инвалидации версия не нужна."""
+        if not self.subscribed:
+            return ()
+        return self.epoch, self.sequence
+
+    def changed(self, tags: list[str], versions: tuple[int, ...]) -> bool:
+        """Признак смены области с тегом из tags после чтения версии."""
+        if versions[0] != self.epoch or versions[1] < self.floor:
+            return True
+        return any(self.versions.get(tag, 0) > versions[1] for tag in tags)
+
+    def full(self) -> bool:
+        """Признак превышения числа записей или их объёма."""
+        if len(self.entries) > self.max_entries:
+            return True
+        return self.size > self.max_bytes
+
+    def get(self, key: str) -> bytes | None:
+        """Получение тела ответа из памяти.
+        Без подписки на канал инвалидации кеш не используется."""
+        if not self.subscribed:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] < time.monotonic():
+            self.pop(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(
+        self,
+        key: str,
+        body: bytes,
+        tags: list[str],
+        versions: tuple[int, ...],
+    ) -> None:
+        """Запись тела ответа в память.
+        Запись пропускается, если область успела смениться после чтения."""
+        if not self.subscribed or not versions:
+            return
+        if len(body) > self.max_bytes or self.changed(tags, versions):
+            return
+        self.pop(key)
+        self.entries[key] = (body, tuple(tags), time.monotonic() + self.ttl)
+        self.size += len(body)
+        for tag in tags:
+            self.tagged[tag].add(key)
+        while self.full():
+            self.pop(next(iter(self.entries)))
+
+    def pop(self, key: str) -> None:
+        """Удаление записи из памяти."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[0])
+        for tag in entry[1]:
+            keys = self.tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tagged[tag]
+
+    def invalidate(self, tags: list[str]) -> None:
+        """Удаление записей областей, поколения которых сменились."""
+        self.sequence += 1
+        if len(self.versions) + len(tags) > self.max_entries:
+            self.versions.clear()
+            self.floor = self.sequence
+        for tag in tags:
+            self.versions[tag] = self.sequence
+            for key in list(self.tagged.get(tag, ())):
+                self.pop(key)
+
+    def clear(self) -> None:
+        """Удаление всех записей."""
+        self.epoch += 1
+        self.entries.clear()
+        self.tagged.clear()
+        self.versions.clear()
+        self.size = 0
+
+    async def subscribe(self, cacher: Redis) -> None:
+        """Получение сообщений о смене поколений из канала Redis.
+        Кеш используется только пока подписка активна."""
+        try:
+            async with cacher.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.clear()
+                self.subscribed = True
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self.invalidate(message['data'].decode().split())
+        finally:
+            self.subscribed = False
+            self.clear()
+
+    async def listen(self, cacher: Redis) -> None:
+        """Подписка на канал инвалидации с переподключением."""
+        while True:
+            try:
+                await self.subscribe(cacher)
+            except (ConnectionError, OSError):
+                await asyncio.sleep(1)
+
+
+local_cache = LocalCache()
@@ -1,10 +1,9 @@
 import uuid
 
-from sqlalchemy import DECIMAL, Column, ForeignKey, Integer, String, Text
+from sqlalchemy import DDL, DECIMAL, Column, ForeignKey, Integer, String, Text, event
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import column_property, relationship
+from sqlalchemy.orm import relationship
 from sqlalchemy.schema import UniqueConstraint
-from sqlalchemy.sql import func, select
 
 from app.database.db_loader import Base
 
@@ -36,7 +35,11 @@ class Dish(Base):
     )
     submenu_id = Column(
         UUID(as_uuid=True),
-        ForeignKey('submenus.id'),
+        ForeignKey('submenus.id', ondelete='CASCADE'),
+    )
+    content_hash = Column(
+        String(32),
+        nullable=True,
     )
     submenu = relationship(
         'Submenu',
@@ -72,20 +75,27 @@ class Submenu(Base):
     )
     menu_id = Column(
         UUID(as_uuid=True),
-        ForeignKey('menus.id'),
+        ForeignKey('menus.id', ondelete='CASCADE'),
+    )
+    content_hash = Column(
+        String(32),
+        nullable=True,
     )
     dishes = relationship(
         'Dish',
         back_populates='submenu',
         cascade='all, delete',
+        passive_deletes=True,
     )
     menu = relationship(
         'Menu',
         back_populates='submenus',
     )
-    dishes_count = column_property(
-        select(func.count(Dish.id)).where(
-            Dish.submenu_id == id).correlate_except(Dish).as_scalar()
+    dishes_count = Column(
+        Integer(),
+        nullable=False,
+        default=0,
+        server_default='0',
     )
 
 
@@ -108,17 +118,170 @@ class Menu(Base):
         Text,
         nullable=False,
     )
+    content_hash = Column(
+        String(32),
+        nullable=True,
+    )
     submenus = relationship(
         'Submenu',
         back_populates='menu',
         cascade='all, delete',
+        passive_deletes=True,
     )
-    submenus_count = column_property(
-        select(func.count(Submenu.id)).where(
-            Submenu.menu_id == id).correlate_except(Submenu).as_scalar()
+    submenus_count = Column(
+        Integer(),
+        nullable=False,
+        default=0,
+        server_default='0',
     )
-    dishes_count = column_property(
-        select(func.count(Dish.id)).where(Dish.submenu_id.in_(
-            select(Submenu.id).where(Submenu.menu_id == id)
-        )).correlate_except(Dish).as_scalar()
+    dishes_count = Column(
+        Integer(),
+        nullable=False,
+        default=0,
+        server_default='0',
     )
+
+
+# Миграций в проекте нет: таблицы, созданные до появления столбцов
+# хеша содержимого и счётчиков, дополняются при запуске. Пустой хеш
+# означает, что объект будет перезаписан при следующей синхронизации
+# с файлом. Счётчики заполняются один раз, при добавлении столбцов,
+# дальше их поддерживают триггеры.
+for table in ('menus', 'submenus', 'dishes'):
+    event.listen(Base.metadata, 'after_create', DDL(
+        f'ALTER TABLE {table} '
+        'ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32)'
+    ))
+event.listen(Base.metadata, 'after_create', DDL('''
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT FROM information_schema.columns
+        WHERE table_schema = current_schema()
+            AND table_name = 'submenus' AND column_name = 'dishes_count'
+    ) THEN
+        ALTER TABLE submenus
+            ADD COLUMN dishes_count INTEGER NOT NULL DEFAULT 0;
+        UPDATE submenus SET dishes_count = (
+            SELECT COUNT(*) FROM dishes WHERE dishes.submenu_id = submenus.id
+        );
+    END IF;
+END;
+$$
+'''))
+event.listen(Base.metadata, 'after_create', DDL('''
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT FROM information_schema.columns
+        WHERE table_schema = current_schema()
+            AND table_name = 'menus' AND column_name = 'submenus_count'
+    ) THEN
+        ALTER TABLE menus
+            ADD COLUMN submenus_count INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN dishes_count INTEGER NOT NULL DEFAULT 0;
+        UPDATE menus SET
+            submenus_count = (
+                SELECT COUNT(*) FROM submenus
+                WHERE submenus.menu_id = menus.id
+            ),
+            dishes_count = (
+                SELECT COALESCE(SUM(submenus.dishes_count), 0) FROM submenus
+                WHERE submenus.menu_id = menus.id
+            );
+    END IF;
+END;
+$$
+'''))
+
+# Внешние ключи, созданные без ON DELETE CASCADE, пересоздаются
+# с каскадным удалением: ORM не удаляет дочерние объекты сама.
+for table, column, parent in (
+    ('submenus', 'menu_id', 'menus'),
+    ('dishes', 'submenu_id', 'submenus'),
+):
+    event.listen(Base.metadata, 'after_create', DDL(f'''
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT FROM pg_constraint
+        WHERE conname = '{table}_{column}_fkey' AND confdeltype = 'c'
+    ) THEN
+        ALTER TABLE {table}
+            DROP CONSTRAINT IF EXISTS {table}_{column}_fkey,
+            ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column})
+                REFERENCES {parent} (id) ON DELETE CASCADE;
+    END IF;
+END;
+$$
+'''))
+
+
+# Дочерние подменю и блюда удаляет сама база каскадом внешних ключей,
+# поэтому удаление меню или подменю выполняется одним запросом без
+# загрузки дочерних объектов в сессию.
+# Счётчики подменю и блюд поддерживаются триггерами в той же транзакции,
+# что и изменение дочерних объектов. Блюдо меняет счётчик меню через своё
+# подменю: если подменю удалено вместе с блюдами, счётчик меню уже
+# уменьшил триггер подменю.
+event.listen(Base.metadata, 'after_create', DDL('''
+CREATE OR REPLACE FUNCTION update_dishes_count() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.submenu_id IS NOT DISTINCT FROM NEW.submenu_id
+    THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE submenus SET dishes_count = dishes_count - 1
+        WHERE id = OLD.submenu_id;
+        UPDATE menus SET dishes_count = dishes_count - 1
+        WHERE id = (SELECT menu_id FROM submenus WHERE id = OLD.submenu_id);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+        UPDATE submenus SET dishes_count = dishes_count + 1
+        WHERE id = NEW.submenu_id;
+        UPDATE menus SET dishes_count = dishes_count + 1
+        WHERE id = (SELECT menu_id FROM submenus WHERE id = NEW.submenu_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+'''))
+event.listen(Base.metadata, 'after_create', DDL(
+    'DROP TRIGGER IF EXISTS dishes_count_trigger ON dishes'
+))
+event.listen(Base.metadata, 'after_create', DDL('''
+CREATE TRIGGER dishes_count_trigger
+AFTER INSERT OR DELETE OR UPDATE OF submenu_id ON dishes
+FOR EACH ROW EXECUTE FUNCTION update_dishes_count()
+'''))
+event.listen(Base.metadata, 'after_create', DDL('''
+CREATE OR REPLACE FUNCTION update_submenus_count() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.menu_id IS NOT DISTINCT FROM NEW.menu_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE menus SET
+            submenus_count = submenus_count - 1,
+            dishes_count = dishes_count - OLD.dishes_count
+        WHERE id = OLD.menu_id;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+        UPDATE menus SET
+            submenus_count = submenus_count + 1,
+            dishes_count = dishes_count + NEW.dishes_count
+        WHERE id = NEW.menu_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+'''))
+event.listen(Base.metadata, 'after_create', DDL(
+    'DROP TRIGGER IF EXISTS submenus_count_trigger ON submenus'
+))
+event.listen(Base.metadata, 'after_create', DDL('''
+CREATE TRIGGER submenus_count_trigger
+AFTER INSERT OR DELETE OR UPDATE OF menu_id ON submenus
+FOR EACH ROW EXECUTE FUNCTION update_submenus_count()
+'''))
@@ -0,0 +1,94 @@
+import os
+import time
+from bisect import bisect_left
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import DB_POOL_WAIT_BUCKETS
+
+
+class PoolMetrics:
+    """Метрики пула соединений с базой процесса: число выдач соединений,
+    гистограмма времени их ожидания и число отказов по таймауту."""
+
+    def __init__(
+        self,
+        buckets: tuple[float, ...] = DB_POOL_WAIT_BUCKETS,
+    ) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, wait: float, timed_out: bool = False) -> None:
+        """Учёт одного ожидания соединения."""
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.counts[bisect_left(self.buckets, wait)] += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def render(self, pool: 'MeteredPool') -> str:
+        """Метрики и текущая загрузка пула в текстовом формате Prometheus.
+        Метки pid различают пулы процессов uvicorn."""
+        label = f'pid="{os.getpid()}"'
+        capacity = pool.size() + max(pool.max_overflow, 0)
+        saturation = pool.checkedout() / capacity if capacity else 0
+        lines = [
+            '# TYPE db_pool_wait_seconds histogram',
+        ]
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            lines.append(
+                f'db_pool_wait_seconds_bucket{{{label},le="{bound}"}} {total}'
+            )
+        lines += [
+            f'db_pool_wait_seconds_sum{{{label}}} {self.wait_total}',
+            f'db_pool_wait_seconds_count{{{label}}} {total}',
+            '# TYPE db_pool_wait_seconds_max gauge',
+            f'db_pool_wait_seconds_max{{{label}}} {self.wait_max}',
+            '# TYPE db_pool_checkouts_total counter',
+            f'db_pool_checkouts_total{{{label}}} {self.checkouts}',
+            '# TYPE db_pool_timeouts_total counter',
+            f'db_pool_timeouts_total{{{label}}} {self.timeouts}',
+            '# TYPE db_pool_size gauge',
+            f'db_pool_size{{{label}}} {pool.size()}',
+            '# TYPE db_pool_capacity gauge',
+            f'db_pool_capacity{{{label}}} {capacity}',
+            '# TYPE db_pool_checked_out gauge',
+            f'db_pool_checked_out{{{label}}} {pool.checkedout()}',
+            '# TYPE db_pool_overflow gauge',
+            f'db_pool_overflow{{{label}}} {max(pool.overflow(), 0)}',
+            '# TYPE db_pool_saturation gauge',
+            f'db_pool_saturation{{{label}}} {saturation}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Пул соединений, учитывающий время получения соединения
+    в метриках процесса. Хранит число соединений сверх размера пула
+    для расчёта его ёмкости."""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs) -> None:
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            pool_metrics.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.observe(time.perf_counter() - start)
+        return connection
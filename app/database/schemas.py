@@ -1,9 +1,17 @@
 from decimal import Decimal
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel, validator
 
 
+def discount_price(price: Decimal, discount: int | None) -> str:
+    """Цена со скидкой в виде строки для вывода."""
+    if discount:
+        return str(round(float(price) * (1 - discount / 100), 2))
+    return str(price)
+
+
 class MenuBase(BaseModel):
     """Базовая схема меню."""
 
@@ -14,7 +22,7 @@ class MenuBase(BaseModel):
 class MenuPost(MenuBase):
     """Схема для создания нового меню."""
 
-    id: str | None
+    id: UUID | None
 
 
 class MenuWithID(MenuBase):
@@ -59,7 +67,7 @@ class SubmenuWithID(SubmenuBase):
 class SubmenuPost(SubmenuBase):
     """Схема для создания нового меню."""
 
-    id: str | None
+    id: UUID | None
 
 
 class SubmenuRead(SubmenuWithID):
@@ -98,7 +106,7 @@ class DishWithID(DishBase):
 class DishPost(DishBase):
     """Схема для создания нового блюда."""
 
-    id: str | None
+    id: UUID | None
     discount: int | None
     price: str
 
@@ -131,10 +139,7 @@ class DishRead(DishWithID):
     @validator('price')
     def validate_price(cls, value: Decimal, values: dict) -> str:
         """Расчёт цены со скидкой и перевод в строку для вывода."""
-        discount = values.get('discount')
-        if discount:
-            value = round(float(value) * (1 - discount / 100), 2)
-        return str(value)
+        return discount_price(value, values.get('discount'))
 
     @validator('submenu_id')
     def validate_submenu_id(cls, value: UUID) -> str:
@@ -155,10 +160,7 @@ class DishReadFullGet(DishWithID):
     @validator('price')
     def validate_price(cls, value: Decimal, values: dict) -> str:
         """Расчёт цены со скидкой и перевод в строку для вывода."""
-        discount = values.get('discount')
-        if discount:
-            value = round(float(value) * (1 - discount / 100), 2)
-        return str(value)
+        return discount_price(value, values.get('discount'))
 
 
 class SubmenuReadFullGet(SubmenuWithID):
@@ -179,3 +181,34 @@ class MenuReadFullGet(MenuWithID):
     class Config:
         extra = 'ignore'
         orm_mode = True
+
+
+class SubmenuTreePost(SubmenuPost):
+    """Схема подменю в древовидной структуре базы для замены."""
+
+    dishes: list[DishPost] = []
+
+
+class MenuTreePost(MenuPost):
+    """Схема меню в древовидной структуре базы для замены."""
+
+    submenus: list[SubmenuTreePost] = []
+
+
+class BatchResult(BaseModel):
+    """Результат записи объекта из пакета."""
+
+    id: str
+    status: Literal[
+        'created', 'updated', 'unchanged', 'conflict', 'deleted', 'not_found',
+    ]
+
+
+class SyncResult(BaseModel):
+    """Число добавленных, изменённых и удалённых объектов одного типа
+    и результат для каждого объекта."""
+
+    created: int
+    updated: int
+    deleted: int
+    items: list[BatchResult]
@@ -1,105 +1,225 @@
-from sqlalchemy import exists, select
+from typing import Any, TypeVar
+from uuid import UUID
+
+from sqlalchemy import and_, delete, exists, false, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm.exc import FlushError, NoResultFound
+from sqlalchemy.sql import ColumnElement, Select
+from sqlalchemy.sql.dml import UpdateBase
 
+from app.database.db_loader import Base
 from app.database.models import Dish, Menu, Submenu
 from app.database.schemas import DishPost, MenuPost, SubmenuPost
 
+Model = TypeVar('Model', bound=Base)
+
+
+def paginate(
+    query: Select,
+    model: type[Base],
+    limit: int | None = None,
+    after: UUID | None = None,
+    order: str | None = None,
+) -> Select:
+    """Keyset-пагинация запроса: limit объектов, следующих за объектом
+    after в порядке поля order и id. Без параметров запрос не меняется."""
+    if limit is None and after is None and order is None:
+        return query
+    column = getattr(model, order or 'id')
+    if after is not None:
+        previous = aliased(model)
+        query = query.where(tuple_(column, model.id) > select(
+            getattr(previous, order or 'id'), previous.id,
+        ).where(previous.id == after).scalar_subquery())
+    return query.order_by(column, model.id).limit(limit)
+
+
+async def write_returning(
+    db: AsyncSession,
+    statement: UpdateBase,
+    model: type[Model],
+) -> Model | None:
+    """Выполнение INSERT, UPDATE или DELETE с RETURNING и фиксация транзакции.
+    Возвращает объект модели из строки, записанной тем же запросом,
+    без повторного чтения, или None, если строка не найдена."""
+    row = (await db.execute(
+        statement.returning(*model.__table__.columns)
+    )).one_or_none()
+    await db.commit()
+    return model(**row._mapping) if row else None
+
+
+async def insert_returning(
+    db: AsyncSession,
+    model: type[Model],
+    values: dict[str, Any],
+) -> Model:
+    """Добавление строки через INSERT с RETURNING и фиксация транзакции.
+    Возвращает объект модели из добавленной строки."""
+    row = (await db.execute(
+        insert(model).values(**values).returning(*model.__table__.columns)
+    )).one()
+    await db.commit()
+    return model(**row._mapping)
+
+
+async def upsert_batch(
+    db: AsyncSession,
+    model: type[Base],
+    rows: list[dict],
+    unique: list[str],
+    parent: str | None = None,
+) -> list[str]:
+    """Добавление и изменение пакета объектов одним INSERT ... ON CONFLICT.
+    Возвращает статус каждой записи: created, updated или conflict, если
+    уникальные поля unique заняты другим объектом, id или уникальные поля
+    повторяются в пакете или объект с этим id принадлежит другому родителю
+    (поле parent)."""
+    columns = [getattr(model, name) for name in unique]
+
+    def key(row: dict) -> tuple:
+        return tuple(row[name] for name in unique)
+
+    taken = {
+        tuple(values): id
+        for id, *values in await db.execute(
+            select(model.id, *columns).where(
+                tuple_(*columns).in_([key(row) for row in rows])
+            )
+        )
+    }
+    statuses = ['conflict'] * len(rows)
+    accepted: dict[UUID, int] = {}
+    keys = set()
+    for index, row in enumerate(rows):
+        if row['id'] in accepted or key(row) in keys:
+            continue
+        if taken.get(key(row), row['id']) != row['id']:
+            continue
+        accepted[row['id']] = index
+        keys.add(key(row))
+    if not accepted:
+        return statuses
+    statement = insert(model).values(
+        [rows[index] for index in accepted.values()]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[model.id],
+        set_={
+            name: statement.excluded[name] for name in rows[0] if name != 'id'
+        },
+        where=(
+            getattr(model, parent) == statement.excluded[parent]
+            if parent else None
+        ),
+    ).returning(model.id, literal_column('xmax = 0'))
+    try:
+        for id, inserted in await db.execute(statement):
+            statuses[accepted[id]] = 'created' if inserted else 'updated'
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise FlushError
+    return statuses
+
+
+async def delete_batch(
+    db: AsyncSession,
+    model: type[Base],
+    ids: list[UUID],
+    parent: str | None = None,
+    parent_id: str | None = None,
+) -> list[str]:
+    """Удаление пакета объектов одним DELETE ... RETURNING, дочерние
+    объекты удаляет каскад внешних ключей. Возвращает статус каждого id:
+    deleted или not_found, если объекта нет или он принадлежит другому
+    родителю (поле parent)."""
+    statement = delete(model).where(model.id.in_(ids))
+    if parent:
+        statement = statement.where(getattr(model, parent) == parent_id)
+    deleted = set(
+        (await db.execute(statement.returning(model.id))).scalars()
+    )
+    await db.commit()
+    return ['deleted' if id in deleted else 'not_found' for id in ids]
+
 
 async def check_objects(
     db: AsyncSession,
     menu_id: str | None = None,
     submenu_id: str | None = None,
     dish_id: str | None = None,
+    conflict: ColumnElement | None = None,
 ) -> None:
-    """Проверка на существование объектов"""
-    if menu_id:
-        query = select(exists().where(Menu.id == menu_id))
-        exists_menu = await db.scalar(query)
-        if not exists_menu:
-            raise NoResultFound('menu not found')
-
-    if submenu_id:
-        query = select(exists().where(Submenu.id == submenu_id))
-        exists_submenu = await db.scalar(query)
-        if not exists_submenu:
-            raise NoResultFound('submenu not found')
-
-    if dish_id:
-        query = select(exists().where(Dish.id == dish_id))
-        exists_submenu = await db.scalar(query)
-        if not exists_submenu:
-            raise NoResultFound('dish not found')
-
-
-async def check_unique_dish(
-    db: AsyncSession,
+    """Проверка на существование объектов и отсутствие конфликтующего
+    объекта одним запросом к базе."""
+    objects: dict[str, tuple[type[Base], str | None]] = {
+        'menu not found': (Menu, menu_id),
+        'submenu not found': (Submenu, submenu_id),
+        'dish not found': (Dish, dish_id),
+    }
+    checks = {
+        message: exists().where(model.id == object_id)
+        for message, (model, object_id) in objects.items() if object_id
+    }
+    if conflict is None and not checks:
+        return
+    found, *results = (await db.execute(select(
+        conflict if conflict is not None else false(), *checks.values(),
+    ))).one()
+    for message, result in zip(checks, results):
+        if not result:
+            raise NoResultFound(message)
+    if found:
+        raise FlushError
+
+
+def dish_conflict(
     dish: DishPost,
     dish_id: str | None = None,
-) -> None:
-    """Проверка на существование блюда."""
-    if dish_id:
-        query = select(exists().where(
-            Dish.title == dish.title,
-            Dish.description == dish.description,
-            Dish.id != dish_id,
-        ))
-    else:
-        query = select(exists().where(
-            Dish.title == dish.title,
-            Dish.description == dish.description,
-        ))
-    exists_dish = await db.scalar(query)
-    if exists_dish:
-        raise FlushError
-    if dish.id:
-        query = select(exists().where(Dish.id == dish.id))
-        exists_dish = await db.scalar(query)
-        if exists_dish:
-            raise FlushError
+) -> ColumnElement:
+    """Условие существования блюда с тем же названием и описанием
+    или с заданным id."""
+    return conflict(
+        Dish,
+        [Dish.title == dish.title, Dish.description == dish.description],
+        dish.id,
+        dish_id,
+    )
 
 
-async def check_unique_menu(
-    db: AsyncSession,
+def menu_conflict(
     menu: MenuPost,
     menu_id: str | None = None,
-) -> None:
-    """Проверка на существование меню."""
-    if menu_id:
-        query = select(exists().where(
-            Menu.title == menu.title,
-            Menu.id != menu_id,
-        ))
-    else:
-        query = select(exists().where(Menu.title == menu.title))
-    exists_menu = await db.scalar(query)
-    if exists_menu:
-        raise FlushError
-    if menu.id:
-        query = select(exists().where(Menu.id == menu.id))
-        exists_menu = await db.scalar(query)
-        if exists_menu:
-            raise FlushError
+) -> ColumnElement:
+    """Условие существования меню с тем же названием или с заданным id."""
+    return conflict(Menu, [Menu.title == menu.title], menu.id, menu_id)
 
 
-async def check_unique_submenu(
-    db: AsyncSession,
+def submenu_conflict(
     submenu: SubmenuPost,
     submenu_id: str | None = None,
-) -> None:
-    """Проверка на существование подменю."""
-    if submenu_id:
-        query = select(exists().where(
-            Submenu.title == submenu.title,
-            Submenu.id != submenu_id,
-        ))
-    else:
-        query = select(exists().where(Submenu.title == submenu.title))
-    exists_submenu = await db.scalar(query)
-    if exists_submenu:
-        raise FlushError
-    if submenu.id:
-        query = select(exists().where(Submenu.id == submenu.id))
-        exists_submenu = await db.scalar(query)
-        if exists_submenu:
-            raise FlushError
+) -> ColumnElement:
+    """Условие существования подменю с тем же названием или с заданным id."""
+    return conflict(
+        Submenu, [Submenu.title == submenu.title], submenu.id, submenu_id,
+    )
+
+
+def conflict(
+    model: type[Base],
+    same: list[ColumnElement],
+    new_id: UUID | None = None,
+    object_id: str | None = None,
+) -> ColumnElement:
+    """Условие существования другого объекта с теми же полями same
+    или объекта с id new_id."""
+    if object_id:
+        same = [*same, model.id != object_id]
+    clause = and_(*same)
+    if new_id:
+        clause = or_(clause, model.id == new_id)
+    return exists().where(clause)
@@ -1,11 +1,17 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
 
 from app.api.dishes.api import dish_router
 from app.api.menus.api import menu_router
+from app.api.metrics import metrics_router
 from app.api.submenus.api import submenu_router
-from app.config import CELERY_STATUS
-from app.database.db_loader import init_db
+from app.config import CELERY_STATUS, LOCAL_CACHE
+from app.database.db_loader import get_redis, init_db
+from app.database.local_cache import local_cache
 from app.tasks.tasks import update_base
+from app.tasks.warmer import CacheWarmerRepo
 
 app = FastAPI(
     title='Restaurant API',
@@ -24,19 +30,51 @@ app = FastAPI(
             'name': 'Блюда',
             'description': 'Операции с блюдами',
         },
+        {
+            'name': 'Метрики',
+            'description': 'Метрики процесса приложения',
+        },
     ]
 )
 
 
+def log_task_error(task: asyncio.Task) -> None:
+    """Запись в лог исключения фоновой задачи, завершившейся с ошибкой."""
+    if not task.cancelled() and task.exception():
+        logging.error(
+            'Фоновая задача %s завершилась с ошибкой', task.get_name(),
+            exc_info=task.exception(),
+        )
+
+
 @app.on_event('startup')
 async def on_startup():
     """Выполняется при запуске приложения.
-    Инициализирует БД и запускает задачу обновления БД."""
+    Инициализирует БД, подписывает кеш в памяти на инвалидацию,
+    прогревает кеш и запускает задачу обновления БД."""
     await init_db()
+    app.state.cache_warmer = asyncio.create_task(
+        CacheWarmerRepo().warm(), name='cache_warmer',
+    )
+    app.state.cache_warmer.add_done_callback(log_task_error)
+    if LOCAL_CACHE:
+        app.state.local_cache_listener = asyncio.create_task(
+            local_cache.listen(get_redis())
+        )
     if CELERY_STATUS:
         update_base.delay()
 
 
+@app.on_event('shutdown')
+async def on_shutdown():
+    """Выполняется при остановке приложения.
+    Останавливает прогрев кеша и подписку кеша в памяти на инвалидацию."""
+    app.state.cache_warmer.cancel()
+    if LOCAL_CACHE:
+        app.state.local_cache_listener.cancel()
+
+
 app.include_router(menu_router)
 app.include_router(submenu_router)
 app.include_router(dish_router)
+app.include_router(metrics_router)
@@ -0,0 +1,42 @@
+import hashlib
+import json
+import os
+
+from redis import Redis
+
+from app.config import FINGERPRINT_KEY, MENU_FILE_PATH, REDIS_URL
+
+
+class FingerprintRepo:
+    """Сервисный репозиторий отпечатка файла меню.
+    Отпечаток последней успешной синхронизации хранится в Redis."""
+
+    def __init__(self, file_path: str = MENU_FILE_PATH) -> None:
+        self.cacher = Redis.from_url(REDIS_URL, decode_responses=True)
+        stat = os.stat(file_path)
+        self.current: dict[str, str] = {
+            'mtime': str(stat.st_mtime_ns),
+            'size': str(stat.st_size),
+        }
+        self.saved: dict[str, str] = self.cacher.hgetall(FINGERPRINT_KEY)
+
+    def file_changed(self) -> bool:
+        """Проверить, менялись ли время изменения и размер файла."""
+        return any(
+            self.saved.get(key) != value
+            for key, value in self.current.items()
+        )
+
+    def tree_changed(self, parser_data: list[dict]) -> bool:
+        """Проверить, менялось ли содержимое файла после парсинга."""
+        self.current['tree_hash'] = hashlib.sha256(json.dumps(
+            parser_data,
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        ).encode()).hexdigest()
+        return self.saved.get('tree_hash') != self.current['tree_hash']
+
+    def save(self) -> None:
+        """Сохранить отпечаток после успешной синхронизации."""
+        self.cacher.hset(FINGERPRINT_KEY, mapping=dict(self.current.items()))
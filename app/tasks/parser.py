@@ -1,70 +1,114 @@
+import hashlib
+import json
+
 from openpyxl import load_workbook
-from openpyxl.worksheet.worksheet import Worksheet
 
 from app.config import MENU_FILE_PATH
 
+# столбцы A-G: меню занимает A-C, подменю B-D, блюдо C-G
+MAX_COLUMN = 7
+
+
+def make_hash(*values: str | int | float | None) -> str:
+    """Посчитать хеш содержимого объекта."""
+    return hashlib.blake2b(
+        json.dumps(values, ensure_ascii=False, default=str).encode(),
+        digest_size=16,
+    ).hexdigest()
+
 
 class ParserRepo:
-    """Сервисный репозиторий для парсинга объектов из файла."""
+    """Сервисный репозиторий для парсинга объектов из файла."""
 
-    def __init__(self) -> None:
-        self.sheet: Worksheet = load_workbook(filename=MENU_FILE_PATH).active
+    def __init__(self, file_path: str = MENU_FILE_PATH) -> None:
+        self.file_path = file_path
         self.parse_result: list = []
 
-    def make_dish(self, row: int) -> dict:
-        """Собрать словарь с данными о блюде из файла."""
+    def make_dish(self, row: tuple, submenu_id: str) -> dict:
+        """Собрать словарь с данными о блюде из строки файла."""
         dish: dict[str, str | int] = {}
-        cells = self.sheet[f'C{row}':f'G{row}'][0]  # type: ignore
-        dish['id'] = cells[0].value
-        dish['title'] = cells[1].value
-        dish['description'] = cells[2].value
-        dish['price'] = str(cells[3].value).replace(',', '.')
-        if cells[4].value:
-            dish['discount'] = cells[4].value
+        dish['id'] = row[2]
+        dish['title'] = row[3]
+        dish['description'] = row[4]
+        dish['price'] = str(row[5]).replace(',', '.')
+        if row[6]:
+            dish['discount'] = row[6]
         else:
             dish['discount'] = 0
+        dish['hash'] = make_hash(
+            submenu_id,
+            dish['id'],
+            dish['title'],
+            dish['description'],
+            dish['price'],
+            dish['discount'],
+        )
         return dish
 
-    def make_submenu(self, row: int, max_row: int) -> dict:
-        """Собрать словарь с данными о подменю из файла."""
+    def make_submenu(self, row: tuple, menu_id: str) -> dict:
+        """Собрать словарь с данными о подменю из строки файла."""
         submenu: dict = {
             'dishes': [],
         }
-        cells = self.sheet[f'B{row}':f'D{row}'][0]  # type: ignore
-        submenu['id'] = cells[0].value
-        submenu['title'] = cells[1].value
-        submenu['description'] = cells[2].value
-        for i in range(row + 1, max_row + 1):
-            if self.sheet[f'C{i}'].value:
-                dish = self.make_dish(i)
-                if dish['description']:
-                    submenu['dishes'].append(dish)
-                else:
-                    break
+        submenu['id'] = row[1]
+        submenu['title'] = row[2]
+        submenu['description'] = row[3]
+        submenu['hash'] = make_hash(
+            menu_id,
+            submenu['id'],
+            submenu['title'],
+            submenu['description'],
+        )
         return submenu
 
-    def make_menu(self, row: int, max_row: int) -> dict:
-        """Собрать словарь с данными о меню из файла."""
+    def make_menu(self, row: tuple) -> dict:
+        """Собрать словарь с данными о меню из строки файла."""
         menu: dict = {
             'submenus': [],
         }
-        cells = self.sheet[f'A{row}':f'C{row}'][0]  # type: ignore
-        menu['id'] = cells[0].value
-        menu['title'] = cells[1].value
-        menu['description'] = cells[2].value
-        for i in range(row + 1, max_row + 1):
-            if self.sheet[f'B{i}'].value:
-                submenu = self.make_submenu(i, max_row)
-                if submenu['description']:
-                    menu['submenus'].append(submenu)
-                else:
-                    break
+        menu['id'] = row[0]
+        menu['title'] = row[1]
+        menu['description'] = row[2]
+        menu['hash'] = make_hash(
+            menu['id'],
+            menu['title'],
+            menu['description'],
+        )
         return menu
 
     def parser(self) -> list[dict[str, str | list]]:
-        """Парсинг файла."""
-        for i in range(1, self.sheet.max_row + 1):
-            if self.sheet[f'A{i}'].value:
-                self.parse_result.append(self.make_menu(i, self.sheet.max_row))
-
+        """Парсинг файла за один проход по строкам.
+        Уровень вложенности объекта определяется первым
+        заполненным столбцом строки. Подменю без описания завершает
+        список подменю меню, блюдо без описания - список блюд подменю:
+        следующие за ними строки до нового меню или подменю пропускаются."""
+        workbook = load_workbook(
+            filename=self.file_path,
+            read_only=True,
+            data_only=True,
+        )
+        try:
+            menu, submenu = None, None
+            for row in workbook.active.iter_rows(
+                max_col=MAX_COLUMN,
+                values_only=True,
+            ):
+                if row[0]:
+                    menu = self.make_menu(row)
+                    submenu = None
+                    self.parse_result.append(menu)
+                elif row[1] and menu:
+                    submenu = self.make_submenu(row, menu['id'])
+                    if submenu['description']:
+                        menu['submenus'].append(submenu)
+                    else:
+                        menu, submenu = None, None
+                elif row[2] and submenu:
+                    dish = self.make_dish(row, submenu['id'])
+                    if dish['description']:
+                        submenu['dishes'].append(dish)
+                    else:
+                        submenu = None
+        finally:
+            workbook.close()
         return self.parse_result
@@ -8,8 +8,10 @@ from app.config import (
     RABBITMQ_DEFAULT_USER,
     RABBITMQ_HOST,
 )
+from app.tasks.fingerprint import FingerprintRepo
 from app.tasks.parser import ParserRepo
 from app.tasks.updater import BaseUpdaterRepo
+from app.tasks.warmer import CacheWarmerRepo
 
 celery = Celery(
     'tasks',
@@ -23,12 +25,17 @@ celery = Celery(
     max_retries=None,
 )
 def update_base():
-    """Задача обновления данных в базе из файла."""
+    """Задача обновления данных в базе из файла.
+    Если файл не менялся с последней синхронизации, она пропускается."""
     try:
-        parser = ParserRepo()
-        parser_data = parser.parser()
-        updater = BaseUpdaterRepo(parser_data)
-        updater.run()
+        fingerprint = FingerprintRepo()
+        if fingerprint.file_changed():
+            parser = ParserRepo()
+            parser_data = parser.parser()
+            if fingerprint.tree_changed(parser_data):
+                updater = BaseUpdaterRepo(parser_data)
+                updater.run()
+            fingerprint.save()
     except Exception as error:
         # сложно заложить обработку всех кейсов, которые пользователь
         # может навертеть в файле, поэтому ловим всё и смотрим
@@ -36,3 +43,11 @@ def update_base():
         logging.error(error)
     finally:
         update_base.retry()
+
+
+@celery.task
+def warm_cache():
+    """Задача прогрева кеша.
+    Возвращает число записанных ключей и время прогрева в секундах."""
+    written, elapsed = CacheWarmerRepo().run()
+    return {'written': written, 'elapsed': elapsed}
@@ -1,329 +1,308 @@
-import requests
+import asyncio
+from typing import Any, Callable
+from uuid import UUID, uuid4
 
-from app.config import (
-    DISH_LINK,
-    DISHES_LINK,
-    MENU_LINK,
-    MENUS_LINK,
-    PREFIX_LINK,
-    SUBMENU_LINK,
-    SUBMENUS_LINK,
+from aioredis import Redis
+from sqlalchemy import (
+    String,
+    Table,
+    bindparam,
+    cast,
+    delete,
+    insert,
+    literal,
+    select,
+    union_all,
+    update,
 )
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import REDIS_URL, conn_url
+from app.database.cache_repository import СacheRepository
+from app.database.models import Dish, Menu, Submenu
+from app.database.schemas import DishPost, MenuPost, MenuTreePost, SubmenuPost
+from app.tasks.parser import make_hash
+from app.tasks.warmer import CacheWarmerRepo
+
+Diff = tuple[list[dict], list[dict], list[UUID]]
 
 
 class BaseUpdaterRepo():
-    """Сервисный репозиторий для обновления данных
+    """Сервисный репозиторий для обновления данных
     в базе после парсинга файла."""
 
     def __init__(self, parser_data: list[dict]):
         self.parser_data = parser_data
+        self.menus: Table = Menu.__table__
+        self.submenus: Table = Submenu.__table__
+        self.dishes: Table = Dish.__table__
 
-    def get_menus_from_db(self) -> list[str]:
-        """Получить список id всех существующих меню из базы."""
-        url = PREFIX_LINK + MENUS_LINK
-        response = requests.get(url).json()
-        menus_id = []
-        for i in response:
-            menus_id.append(i['id'])
-        return menus_id
+    @classmethod
+    def from_tree(cls, tree: list[MenuTreePost]) -> 'BaseUpdaterRepo':
+        """Обновление базы по древовидной структуре из запроса к API.
+        Объекты без id получают новый id, хеши содержимого считаются
+        так же, как при парсинге файла."""
+        parser_data = []
+        for menu in tree:
+            menu_id = str(menu.id or uuid4())
+            submenus = []
+            for submenu in menu.submenus:
+                submenu_id = str(submenu.id or uuid4())
+                dishes = []
+                for dish in submenu.dishes:
+                    dish_row: dict[str, str | int] = {
+                        'id': str(dish.id or uuid4()),
+                        'title': dish.title,
+                        'description': dish.description,
+                        'price': str(dish.price),
+                        'discount': dish.discount or 0,
+                    }
+                    dish_row['hash'] = make_hash(
+                        submenu_id, *dish_row.values(),
+                    )
+                    dishes.append(dish_row)
+                submenus.append({
+                    'id': submenu_id,
+                    'title': submenu.title,
+                    'description': submenu.description,
+                    'dishes': dishes,
+                    'hash': make_hash(
+                        menu_id, submenu_id,
+                        submenu.title, submenu.description,
+                    ),
+                })
+            parser_data.append({
+                'id': menu_id,
+                'title': menu.title,
+                'description': menu.description,
+                'submenus': submenus,
+                'hash': make_hash(menu_id, menu.title, menu.description),
+            })
+        return cls(parser_data)
 
-    def get_submenus_from_db(self, menu_id: str) -> list[str]:
-        """Получить список id всех существующих подменю из базы."""
-        url = PREFIX_LINK + SUBMENUS_LINK.format(menu_id=menu_id)
-        response = requests.get(url).json()
-        submenus_id = []
-        for i in response:
-            submenus_id.append(i['id'])
-        return submenus_id
+    def get_data_from_file(self) -> tuple[dict, dict, dict]:
+        """Разложить объекты из файла по таблицам вместе с id родителя."""
+        menus, submenus, dishes = {}, {}, {}
+        for menu in self.parser_data:
+            menus[UUID(menu['id'])] = (menu, None)
+            for submenu in menu['submenus']:
+                submenus[UUID(submenu['id'])] = (submenu, menu['id'])
+                for dish in submenu['dishes']:
+                    dishes[UUID(dish['id'])] = (dish, submenu['id'])
+        return menus, submenus, dishes
 
-    def get_dishes_from_db(self, menu_id: str, submenu_id: str) -> list[str]:
-        """Получить список id всех существующих блюд из базы."""
-        url = PREFIX_LINK + DISHES_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
-        )
-        response = requests.get(url).json()
-        dishes_id = []
-        for i in response:
-            dishes_id.append(i['id'])
-        return dishes_id
+    async def get_hashes_from_db(
+        self,
+        conn: AsyncConnection,
+    ) -> tuple[dict, dict, dict]:
+        """Получить id и хеши содержимого всех объектов базы одним запросом."""
+        tables = (self.menus, self.submenus, self.dishes)
+        query = union_all(*(
+            select(
+                literal(index).label('table_index'),
+                table.c.id,
+                table.c.content_hash,
+            ) for index, table in enumerate(tables)
+        ))
+        hashes: tuple[dict, dict, dict] = ({}, {}, {})
+        for row in await conn.execute(query):
+            hashes[row.table_index][row.id] = row.content_hash
+        return hashes
 
-    def post_menu(self, menu: dict[str, str | list]) -> None:
-        """Запостить новое меню в базу."""
-        url = PREFIX_LINK + MENUS_LINK
-        data = {
-            'id': menu['id'],
-            'title': menu['title'],
-            'description': menu['description'],
+    def make_menu_row(self, menu: dict, parent_id: None) -> dict:
+        """Собрать запись меню для базы, проверив данные схемой API."""
+        valid_menu = MenuPost(**menu)
+        return {
+            'id': valid_menu.id,
+            'title': valid_menu.title,
+            'description': valid_menu.description,
+            'content_hash': menu['hash'],
         }
-        requests.post(url, json=data)
 
-    def post_submenu(
-        self,
-        submenu: dict[str, str | list],
-        menu_id: str,
-    ) -> None:
-        """Запостить новое подменю в базу."""
-        url = PREFIX_LINK + SUBMENUS_LINK.format(menu_id=menu_id)
-        data = {
-            'id': submenu['id'],
-            'title': submenu['title'],
-            'description': submenu['description'],
+    def make_submenu_row(self, submenu: dict, menu_id: str) -> dict:
+        """Собрать запись подменю для базы, проверив данные схемой API."""
+        valid_submenu = SubmenuPost(**submenu)
+        return {
+            'id': valid_submenu.id,
+            'title': valid_submenu.title,
+            'description': valid_submenu.description,
+            'menu_id': UUID(menu_id),
+            'content_hash': submenu['hash'],
         }
-        requests.post(url, json=data)
 
-    def post_submenus_batch(self, submenus: list, menu_id: str) -> None:
-        """Запостить новые подменю в базу списком."""
-        for submenu in submenus:
-            self.post_submenu(
-                submenu=submenu,
-                menu_id=menu_id,
-            )
-
-    def post_dish(
-        self,
-        dish: dict[str, str],
-        submenu_id: str,
-        menu_id: str,
-    ) -> None:
-        """Запостить новое блюдо в базу."""
-        url = PREFIX_LINK + DISHES_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
-        )
-        data = {
-            'id': dish['id'],
-            'title': dish['title'],
-            'description': dish['description'],
-            'price': dish['price'],
-            'discount': dish['discount'],
+    def make_dish_row(self, dish: dict, submenu_id: str) -> dict:
+        """Собрать запись блюда для базы, проверив данные схемой API."""
+        valid_dish = DishPost(**dish)
+        return {
+            'id': valid_dish.id,
+            'title': valid_dish.title,
+            'description': valid_dish.description,
+            'price': valid_dish.price,
+            'discount': valid_dish.discount or 0,
+            'submenu_id': UUID(submenu_id),
+            'content_hash': dish['hash'],
         }
-        requests.post(url, json=data)
 
-    def post_dishes_batch(
+    def make_diff(
         self,
-        dishes: list,
-        submenu_id: str,
-        menu_id: str,
-    ) -> None:
-        """Запостить новые блюда в базу списком."""
-        for dish in dishes:
-            self.post_dish(
-                dish=dish,
-                submenu_id=submenu_id,
-                menu_id=menu_id,
-            )
-
-    def patch_menu(self, menu: dict[str, str | list]) -> None:
-        """Обновить данные о меню в базе."""
-        data = {
-            'title': menu['title'],
-            'description': menu['description'],
-        }
-        url = PREFIX_LINK + MENU_LINK.format(menu_id=menu['id'])
-        requests.patch(url, json=data)
-
-    def check_menu(self, menu: dict[str, str | list]) -> None:
-        """Проверить состояние меню в базе и по необходимости обновить."""
-        url = PREFIX_LINK + MENU_LINK.format(menu_id=menu['id'])
-        current_menu = requests.get(url).json()
-        if current_menu['title'] != menu['title'] or \
-                current_menu['description'] != menu['description']:
-            self.patch_menu(menu=menu)
+        new: dict[UUID, tuple[dict, str | None]],
+        old: dict[UUID, str | None],
+        make_row: Callable[[dict, Any], dict],
+    ) -> tuple[list[dict], list[dict], list[UUID]]:
+        """Сравнить хеши объектов из файла и базы.
+        Возвращает записи для добавления, изменения и id для удаления.
+        Записи собираются только для изменившихся объектов."""
+        to_insert, to_update = [], []
+        for id, (entity, parent_id) in new.items():
+            if id not in old:
+                to_insert.append(make_row(entity, parent_id))
+            elif entity['hash'] != old[id]:
+                to_update.append(make_row(entity, parent_id))
+        to_delete = [id for id in old if id not in new]
+        return to_insert, to_update, to_delete
 
-    def patch_submenu(
+    async def get_cascaded(
         self,
-        submenu: dict[str, str | list],
-        menu_id: str,
-    ) -> None:
-        """Обновить данные о подменю в базе."""
-        data = {
-            'title': submenu['title'],
-            'description': submenu['description'],
-        }
-        url = PREFIX_LINK + SUBMENU_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu['id'],
-        )
-        requests.patch(url, json=data)
+        conn: AsyncConnection,
+        menu_ids: list[UUID],
+        submenu_ids: list[UUID],
+    ) -> tuple[set[UUID], set[UUID]]:
+        """Получить id подменю и блюд, которые каскадно удалятся
+        вместе с удаляемыми меню и подменю."""
+        submenus: set[UUID] = set()
+        dishes: set[UUID] = set()
+        if menu_ids:
+            submenus.update((await conn.execute(
+                select(self.submenus.c.id).where(
+                    self.submenus.c.menu_id.in_(menu_ids)
+                )
+            )).scalars())
+        if submenus or submenu_ids:
+            dishes.update((await conn.execute(
+                select(self.dishes.c.id).where(
+                    self.dishes.c.submenu_id.in_([*submenus, *submenu_ids])
+                )
+            )).scalars())
+        return submenus, dishes
 
-    def check_submenu(
+    def restore_rows(
         self,
-        submenu: dict[str, str | list],
-        menu_id: str,
-    ) -> None:
-        """Проверить состояние подменю в базе и по необходимости обновить."""
-        url = PREFIX_LINK + SUBMENU_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu['id'],
-        )
-        current_submenu = requests.get(url).json()
-        if current_submenu['title'] != submenu['title'] or \
-                current_submenu['description'] != submenu['description']:
-            self.patch_submenu(submenu=submenu, menu_id=menu_id)
+        new: dict[UUID, tuple[dict, str | None]],
+        diff: Diff,
+        cascaded: set[UUID],
+        make_row: Callable[[dict, Any], dict],
+    ) -> tuple[list[dict], list[dict]]:
+        """Записи для добавления и изменения с учётом объектов, которые
+        остаются в данных, но удаляются каскадом вместе с родителем:
+        они добавляются заново."""
+        to_insert, to_update, _ = diff
+        inserted = {row['id'] for row in to_insert}
+        restored = [
+            make_row(entity, parent_id)
+            for id, (entity, parent_id) in new.items()
+            if id in cascaded and id not in inserted
+        ]
+        return [*to_insert, *restored], [
+            row for row in to_update if row['id'] not in cascaded
+        ]
 
-    def patch_dish(
+    async def upsert_rows(
         self,
-        dish: dict[str, str],
-        submenu_id: str,
-        menu_id: str,
+        conn: AsyncConnection,
+        table: Table,
+        to_insert: list[dict],
+        to_update: list[dict],
     ) -> None:
-        """Обновить данные о блюде в базе."""
-        data = {
-            'title': dish['title'],
-            'description': dish['description'],
-            'price': dish['price'],
-            'discount': dish['discount'],
-        }
-        url = PREFIX_LINK + DISH_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
-            dish_id=dish['id'],
-        )
-        requests.patch(url, json=data)
+        """Изменить и добавить записи таблицы пакетными запросами.
+        Изменение выполняется первым и освобождает старые названия
+        для новых объектов. Перед ним изменяемым объектам временно
+        назначается название по id, чтобы объекты могли обменяться
+        названиями без нарушения уникальности."""
+        if to_update:
+            await conn.execute(update(table).where(
+                table.c.id.in_([row['id'] for row in to_update])
+            ).values(title=cast(table.c.id, String)))
+            columns = [column for column in to_update[0] if column != 'id']
+            query = update(table).where(
+                table.c.id == bindparam('b_id')
+            ).values({
+                column: bindparam(f'b_{column}') for column in columns
+            })
+            await conn.execute(query, [
+                {f'b_{key}': value for key, value in row.items()}
+                for row in to_update
+            ])
+        if to_insert:
+            await conn.execute(insert(table), to_insert)
 
-    def check_dish(
+    async def delete_rows(
         self,
-        dish: dict[str, str],
-        submenu_id: str,
-        menu_id: str,
+        conn: AsyncConnection,
+        table: Table,
+        to_delete: list[UUID],
     ) -> None:
-        """Проверить состояние блюда в базе и по необходимости обновить."""
-        url = PREFIX_LINK + DISH_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
-            dish_id=dish['id'],
-        )
-        current_dish = requests.get(url).json()
-        price = str(round(
-            float(dish['price']) * (1 - current_dish['discount'] / 100), 2
-        ))
-        if current_dish['title'] != dish['title'] or \
-                current_dish['description'] != dish['description'] or \
-                current_dish['price'] != price or \
-                current_dish['discount'] != dish['discount']:
-            self.patch_dish(
-                dish=dish,
-                submenu_id=submenu_id,
-                menu_id=menu_id,
-            )
-
-    def delete_menu(self, menu_id: str) -> None:
-        """Удалить меню из базы."""
-        url = PREFIX_LINK + MENU_LINK.format(menu_id=menu_id)
-        requests.delete(url)
+        """Удалить записи таблицы одним запросом."""
+        if to_delete:
+            await conn.execute(delete(table).where(table.c.id.in_(to_delete)))
 
-    def delete_submenu(self, submenu_id: str, menu_id: str) -> None:
-        """Удалить подменю из базы."""
-        url = PREFIX_LINK + SUBMENU_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
+    async def apply(self, conn: AsyncConnection) -> tuple[Diff, Diff, Diff]:
+        """Привести базу в соответствие с данными в транзакции conn.
+        Возвращает изменения меню, подменю и блюд."""
+        file_menus, file_submenus, file_dishes = self.get_data_from_file()
+        db_menus, db_submenus, db_dishes = await self.get_hashes_from_db(conn)
+        menus_diff = self.make_diff(file_menus, db_menus, self.make_menu_row)
+        submenus_diff = self.make_diff(
+            file_submenus, db_submenus, self.make_submenu_row,
         )
-        requests.delete(url)
-
-    def delete_dish(self, dish_id: str, menu_id: str, submenu_id: str) -> None:
-        """Удалить блюдо из базы."""
-        url = PREFIX_LINK + DISH_LINK.format(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
-            dish_id=dish_id,
+        dishes_diff = self.make_diff(
+            file_dishes, db_dishes, self.make_dish_row,
         )
-        requests.delete(url)
-
-    def check_dishes(
-        self,
-        dishes: list[dict[str, str]],
-        menu_id: str,
-        submenu_id: str,
-    ) -> None:
-        """Проверить состояние блюд в базе и привести
-        в соответствие с файлом."""
-        dishes_id = self.get_dishes_from_db(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
+        # удаление до вставки освобождает уникальные названия для новых
+        # объектов; дочерние объекты, перенесённые из удаляемого родителя,
+        # удаляются каскадом и добавляются заново
+        cascaded_submenus, cascaded_dishes = await self.get_cascaded(
+            conn, menus_diff[2], submenus_diff[2],
         )
-        for dish in dishes:
-            if dish['id'] not in dishes_id:
-                self.post_dish(
-                    dish=dish,
-                    submenu_id=submenu_id,
-                    menu_id=menu_id,
-                )
-            else:
-                self.check_dish(dish, submenu_id, menu_id)
-                dishes_id.remove(dish['id'])
-        for id in dishes_id:
-            self.delete_dish(
-                dish_id=id,
-                menu_id=menu_id,
-                submenu_id=submenu_id,
-            )
+        await self.delete_rows(conn, self.dishes, dishes_diff[2])
+        await self.delete_rows(conn, self.submenus, submenus_diff[2])
+        await self.delete_rows(conn, self.menus, menus_diff[2])
+        await self.upsert_rows(conn, self.menus, *menus_diff[:2])
+        await self.upsert_rows(conn, self.submenus, *self.restore_rows(
+            file_submenus, submenus_diff, cascaded_submenus,
+            self.make_submenu_row,
+        ))
+        await self.upsert_rows(conn, self.dishes, *self.restore_rows(
+            file_dishes, dishes_diff, cascaded_dishes, self.make_dish_row,
+        ))
+        return menus_diff, submenus_diff, dishes_diff
 
-    def check_submenus(
-        self,
-        submenus: list[dict],
-        menu_id: str,
-    ) -> None:
-        """Проверить состояние подменю в базе и привести
-        в соответствие с файлом."""
-        submenus_id = self.get_submenus_from_db(menu_id)
-        for submenu in submenus:
-            if submenu['id'] not in submenus_id:
-                self.post_submenu(
-                    submenu=submenu,
-                    menu_id=menu_id,
-                )
-                self.post_dishes_batch(
-                    dishes=submenu['dishes'],
-                    submenu_id=submenu['id'],
-                    menu_id=menu_id,
-                )
-            else:
-                self.check_submenu(
-                    submenu=submenu,
-                    menu_id=menu_id,
-                )
-                if submenu['dishes']:
-                    self.check_dishes(
-                        dishes=submenu['dishes'],
-                        menu_id=menu_id,
-                        submenu_id=submenu['id'],
-                    )
-                submenus_id.remove(submenu['id'])
-        for id in submenus_id:
-            self.delete_submenu(
-                submenu_id=id,
-                menu_id=menu_id,
-            )
+    async def update_base(self) -> bool:
+        """Привести базу в соответствие с файлом в одной транзакции.
+        Возвращает True, если в базе что-то изменилось."""
+        engine = create_async_engine(conn_url, poolclass=NullPool)
+        try:
+            async with engine.begin() as conn:
+                diffs = await self.apply(conn)
+        finally:
+            await engine.dispose()
+        return any(any(diff) for diff in diffs)
 
-    def check_menus(self) -> None:
-        """Проверить состояние меню в базе и привести
-        в соответствие с файлом."""
-        menus_id = self.get_menus_from_db()
-        for menu in self.parser_data:
-            if menu['id'] not in menus_id:
-                self.post_menu(menu=menu)
-                self.post_submenus_batch(
-                    submenus=menu['submenus'],
-                    menu_id=menu['id'],
-                )
-                for submenu in menu['submenus']:
-                    self.post_dishes_batch(
-                        dishes=submenu['dishes'],
-                        submenu_id=submenu['id'],
-                        menu_id=menu['id'],
-                    )
-            else:
-                self.check_menu(menu=menu)
-                if menu['submenus']:
-                    self.check_submenus(
-                        submenus=menu['submenus'],
-                        menu_id=menu['id'],
-                    )
-                menus_id.remove(menu['id'])
-        for id in menus_id:
-            self.delete_menu(menu_id=id)
+    async def invalidate_cache(self) -> None:
+        """Сбросить кеш после обновления базы."""
+        cacher = Redis.from_url(REDIS_URL)
+        try:
+            await СacheRepository(cacher=cacher).delete_all_cache()
+        finally:
+            await cacher.connection_pool.disconnect()
+
+    async def update(self) -> None:
+        """Обновить базу, сбросить кеш, если данные изменились,
+        и прогреть его."""
+        if await self.update_base():
+            await self.invalidate_cache()
+        await CacheWarmerRepo().warm()
 
     def run(self) -> None:
         """Запустить обновление данных в базе."""
-        self.check_menus()
+        asyncio.run(self.update())
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from aioredis import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.api.menus.crud_repository import MenuRepository
+from app.config import (
+    DISH_LINK,
+    DISHES_LINK,
+    MENU_LINK,
+    MENUS_LINK,
+    REDIS_URL,
+    SUBMENU_LINK,
+    SUBMENUS_LINK,
+    WARM_LOCK_TIMEOUT,
+    conn_url,
+)
+from app.database.cache_repository import (
+    FILL_SCRIPT,
+    FULL_BASE_KEY,
+    LOCK_PREFIX,
+    RELEASE_SCRIPT,
+    СacheRepository,
+    dump_json,
+    expirations,
+    read,
+    stamp_key,
+    wrap,
+)
+from app.database.models import Dish, Menu, Submenu
+from app.database.schemas import DishRead, MenuRead, MenuReadFullGet, SubmenuRead
+
+# блокировка берётся только для отсутствующих в кеше ключей,
+# заполненные записи прогрев не трогает
+WARM_LOCK_SCRIPT = '''
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if redis.call('SET', KEYS[2], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+'''
+
+
+class CacheWarmerRepo:
+    """Сервисный репозиторий для прогрева кеша.
+    Заполняет отсутствующие записи всех ключей API и древовидной
+    структуры базы пакетными запросами к Redis."""
+
+    def __init__(self) -> None:
+        self.token = uuid.uuid4().hex
+
+    async def get_keys(
+        self,
+        db: AsyncSession,
+        cache_repo: СacheRepository,
+    ) -> dict[str, list[str]]:
+        """Ключи кеша всех объектов базы с их поколениями."""
+        generation_keys = cache_repo.generation_keys
+        keys: dict[str, list[str]] = {
+            MENUS_LINK: generation_keys(),
+            FULL_BASE_KEY: [],
+        }
+        for (menu_id,) in await db.execute(select(Menu.id)):
+            menu_id = str(menu_id)
+            keys[MENU_LINK.format(menu_id=menu_id)] = generation_keys(menu_id)
+            keys[SUBMENUS_LINK.format(menu_id=menu_id)] = generation_keys(
+                menu_id
+            )
+        for submenu_id, menu_id in await db.execute(
+            select(Submenu.id, Submenu.menu_id)
+        ):
+            menu_id, submenu_id = str(menu_id), str(submenu_id)
+            keys[SUBMENU_LINK.format(
+                menu_id=menu_id,
+                submenu_id=submenu_id,
+            )] = generation_keys(menu_id)
+            keys[DISHES_LINK.format(
+                menu_id=menu_id,
+                submenu_id=submenu_id,
+            )] = generation_keys(menu_id, submenu_id)
+        for dish_id, submenu_id, menu_id in await db.execute(
+            select(Dish.id, Submenu.id, Submenu.menu_id).join(Submenu)
+        ):
+            menu_id, submenu_id = str(menu_id), str(submenu_id)
+            keys[DISH_LINK.format(
+                menu_id=menu_id,
+                submenu_id=submenu_id,
+                dish_id=str(dish_id),
+            )] = generation_keys(menu_id, submenu_id)
+        return keys
+
+    async def stamp_keys(
+        self,
+        cache_repo: СacheRepository,
+        keys: dict[str, list[str]],
+    ) -> dict[str, str]:
+        """Ключи с текущими поколениями, прочитанными одним запросом."""
+        generations = list({
+            generation
+            for key_generations in keys.values()
+            for generation in key_generations
+        })
+        values = dict(zip(
+            generations, await cache_repo.cacher.mget(generations),
+        ))
+        return {
+            key: stamp_key(key, [values[generation] for generation in stamp])
+            for key, stamp in keys.items()
+        }
+
+    def render(self, menus: list[Menu]) -> dict[str, bytes]:
+        """Тела ответов всех ключей кеша по древовидной структуре базы."""
+        bodies = {}
+        menus_read = []
+        for menu in menus:
+            menu_read = read(MenuRead, menu)
+            menus_read.append(menu_read)
+            menu_id = menu_read['id']
+            bodies[MENU_LINK.format(menu_id=menu_id)] = dump_json(menu_read)
+            submenus_read = []
+            for submenu in menu.submenus:
+                submenu_read = read(SubmenuRead, submenu)
+                submenus_read.append(submenu_read)
+                submenu_id = submenu_read['id']
+                bodies[SUBMENU_LINK.format(
+                    menu_id=menu_id,
+                    submenu_id=submenu_id,
+                )] = dump_json(submenu_read)
+                dishes_read = [read(DishRead, dish) for dish in submenu.dishes]
+                for dish_read in dishes_read:
+                    bodies[DISH_LINK.format(
+                        menu_id=menu_id,
+                        submenu_id=submenu_id,
+                        dish_id=dish_read['id'],
+                    )] = dump_json(dish_read)
+                bodies[DISHES_LINK.format(
+                    menu_id=menu_id,
+                    submenu_id=submenu_id,
+                )] = dump_json(dishes_read)
+            bodies[SUBMENUS_LINK.format(menu_id=menu_id)] = dump_json(
+                submenus_read
+            )
+        bodies[MENUS_LINK] = dump_json(menus_read)
+        bodies[FULL_BASE_KEY] = dump_json(
+            [read(MenuReadFullGet, menu) for menu in menus]
+        )
+        return bodies
+
+    async def fill(
+        self,
+        db: AsyncSession,
+        cache_repo: СacheRepository,
+        stamped_keys: dict[str, str],
+    ) -> int:
+        """Заполнение отсутствующих записей кеша.
+        Данные загружаются из базы после получения блокировок,
+        поэтому изменения объектов во время прогрева не теряются.
+        Возвращает число записанных ключей."""
+        locked = [
+            key for key, result in zip(
+                stamped_keys,
+                await cache_repo.eval_many(WARM_LOCK_SCRIPT, [
+                    (2, stamped_key, LOCK_PREFIX + stamped_key,
+                     self.token, WARM_LOCK_TIMEOUT * 1000)
+                    for stamped_key in stamped_keys.values()
+                ]),
+            ) if result
+        ]
+        written = set()
+        try:
+            if locked:
+                bodies = self.render(
+                    await MenuRepository(db=db).get_full_base_menu()
+                )
+                filled = [key for key in locked if key in bodies]
+                written = {
+                    key for key, result in zip(
+                        filled,
+                        await cache_repo.eval_many(FILL_SCRIPT, [
+                            (2, stamped_keys[key],
+                             LOCK_PREFIX + stamped_keys[key],
+                             wrap(bodies[key], expirations(key)[1]),
+                             self.token, expirations(key)[0])
+                            for key in filled
+                        ]),
+                    ) if result
+                }
+        finally:
+            await cache_repo.eval_many(RELEASE_SCRIPT, [
+                (1, LOCK_PREFIX + stamped_keys[key], self.token)
+                for key in locked if key not in written
+            ])
+        return len(written)
+
+    async def warm(self) -> tuple[int, float]:
+        """Прогреть кеш.
+        Возвращает число записанных ключей и время прогрева в секундах."""
+        start = time.monotonic()
+        engine = create_async_engine(conn_url, poolclass=NullPool)
+        cacher = Redis.from_url(REDIS_URL)
+        cache_repo = СacheRepository(cacher=cacher)
+        try:
+            async with AsyncSession(engine) as db:
+                stamped_keys = await self.stamp_keys(
+                    cache_repo, await self.get_keys(db, cache_repo),
+                )
+                written = await self.fill(db, cache_repo, stamped_keys)
+        finally:
+            await cacher.connection_pool.disconnect()
+            await engine.dispose()
+        elapsed = time.monotonic() - start
+        logging.info(
+            'Прогрев кеша: записано ключей %s из %s за %.3f с',
+            written, len(stamped_keys), elapsed,
+        )
+        return written, elapsed
+
+    def run(self) -> tuple[int, float]:
+        """Запустить прогрев кеша."""
+        return asyncio.run(self.warm())
+
+
+if __name__ == '__main__':
+    written, elapsed = CacheWarmerRepo().run()
+    print(f'Записано ключей: {written}, время прогрева: {elapsed:.3f} с')
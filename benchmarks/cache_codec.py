@@ -0,0 +1,122 @@
+"""Сравнение записей кеша /fullbase: pickle объектов базы, как их хранил
+прежний кеш, и кодек кеша app.database.codec.
+
+Дерево добавляется в базу в транзакции и читается тем же запросом,
+что и /fullbase. После замеров транзакция откатывается.
+
+Запуск: python -m benchmarks.cache_codec [число блюд] [повторы]
+"""
+import asyncio
+import pickle
+import sys
+import timeit
+import uuid
+from functools import partial
+from typing import Any, Callable
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.menus.crud_repository import MenuRepository
+from app.database import codec
+from app.database.cache_repository import render_json
+from app.database.db_loader import AsyncSessionLocal
+from app.database.models import Dish, Menu, Submenu
+from app.database.schemas import MenuReadFullGet
+
+MENUS = 10
+SUBMENUS = 10
+
+
+async def seed(db: AsyncSession, dishes: int) -> None:
+    """Добавление дерева с заданным числом блюд в текущую транзакцию."""
+    per_submenu = max(1, dishes // (MENUS * SUBMENUS))
+    token = uuid.uuid4().hex[:8]
+    menus: list[dict[str, Any]] = []
+    submenus: list[dict[str, Any]] = []
+    dish_rows: list[dict[str, Any]] = []
+    for menu in range(MENUS):
+        menu_id = uuid.uuid4()
+        menus.append({
+            'id': menu_id,
+            'title': f'Меню {menu} {token}',
+            'description': 'Описание меню',
+        })
+        for submenu in range(SUBMENUS):
+            submenu_id = uuid.uuid4()
+            submenus.append({
+                'id': submenu_id,
+                'title': f'Подменю {menu}.{submenu} {token}',
+                'description': 'Описание подменю',
+                'menu_id': menu_id,
+            })
+            dish_rows.extend(
+                {
+                    'id': uuid.uuid4(),
+                    'title': f'Блюдо {menu}.{submenu}.{dish} {token}',
+                    'description': 'Описание блюда',
+                    'discount': dish % 20,
+                    'price': f'{100 + dish}.50',
+                    'submenu_id': submenu_id,
+                }
+                for dish in range(per_submenu)
+            )
+    for model, rows in ((Menu, menus), (Submenu, submenus), (Dish, dish_rows)):
+        await db.execute(insert(model), rows)
+
+
+def encode(menus: list[Menu], method: str) -> bytes:
+    """Запись кеша кодеком: тело ответа /fullbase, сжатое методом method."""
+    return codec.compress(render_json(MenuReadFullGet, menus), method)
+
+
+def decode(payload: bytes) -> Any:
+    """Содержимое записи кеша, сделанной кодеком."""
+    return codec.loads(codec.decompress(payload))
+
+
+def codecs(
+    menus: list[Menu],
+) -> dict[str, tuple[Callable[[], bytes], Callable[[bytes], Any]]]:
+    """Способы записи кеша: кодирование дерева объектов базы
+    и декодирование записи."""
+    result: dict[str, tuple[Callable[[], bytes], Callable[[bytes], Any]]] = {
+        'pickle ORM': (partial(pickle.dumps, menus), pickle.loads),
+    }
+    for method in ('none', 'zlib', 'lz4'):
+        if method == 'lz4' and codec.lz4 is None:
+            continue
+        result[f'codec+{method}'] = (partial(encode, menus, method), decode)
+    return result
+
+
+def measure(function: Callable[[], Any], repeat: int) -> float:
+    """Лучшее время выполнения в миллисекундах."""
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+async def run(dishes: int, repeat: int) -> None:
+    """Вывод размера записи и времени кодирования и декодирования."""
+    async with AsyncSessionLocal() as db:
+        try:
+            await seed(db, dishes)
+            menus = await MenuRepository(db).get_full_base_menu()
+            print(f'{"кодек":<18}{"байт":>10}{"кодирование, мс":>18}'
+                  f'{"декодирование, мс":>20}')
+            for name, (dump, load) in codecs(menus).items():
+                payload = dump()
+                encoding = measure(dump, repeat)
+                decoding = measure(partial(load, payload), repeat)
+                print(f'{name:<18}{len(payload):>10}'
+                      f'{encoding:>18.2f}{decoding:>20.2f}')
+        finally:
+            await db.rollback()
+
+
+def main(dishes: int = 10000, repeat: int = 20) -> None:
+    """Запуск сравнения."""
+    asyncio.run(run(dishes, repeat))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
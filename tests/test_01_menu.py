@@ -1,3 +1,4 @@
+import asyncio
 from http import HTTPStatus
 from typing import Any
 
@@ -94,6 +95,37 @@ async def test_get_posted_menu(
         'Количество блюд не соответствует ожидаемому'
 
 
+async def test_get_menu_not_modified(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Повторное получение меню с ETag и временем изменения."""
+    url = reverse(get_menu, menu_id=saved_data['menu']['id'])
+    await client.get(url)
+    # Last-Modified отдаётся после секунды записи в кеш
+    await asyncio.sleep(1)
+    response = await client.get(url)
+    assert 'ETag' in response.headers, 'ETag нет в ответе'
+    assert 'Last-Modified' in response.headers, 'Last-Modified нет в ответе'
+    etag = response.headers['ETag']
+    response = await client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, \
+        'Статус ответа не 304'
+    assert response.content == b'', 'Ответ 304 содержит тело'
+    response = await client.get(url, headers={
+        'If-Modified-Since': response.headers['Last-Modified'],
+    })
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, \
+        'Статус ответа не 304'
+    response = await client.get(
+        reverse(get_menus), headers={'If-None-Match': etag},
+    )
+    assert response.status_code == HTTPStatus.OK, \
+        'Список меню не отдан по ETag меню'
+
+    saved_data['etag'] = etag
+
+
 async def test_patch_menu(
     menu_patch: dict[str, str],
     saved_data: dict[str, Any],
@@ -143,6 +175,20 @@ async def test_get_patched_menu(
         'Количество блюд не соответствует ожидаемому'
 
 
+async def test_patched_menu_modified(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Изменённое меню отдаётся по старому ETag."""
+    response = await client.get(
+        reverse(get_menu, menu_id=saved_data['menu']['id']),
+        headers={'If-None-Match': saved_data['etag']},
+    )
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert response.headers['ETag'] != saved_data['etag'], \
+        'ETag меню не изменился'
+
+
 async def test_delete_menu(
     saved_data: dict[str, Any],
     client: AsyncClient,
@@ -6,15 +6,38 @@ from httpx import AsyncClient
 
 from app.api.dishes.api import get_dishes, post_new_dish
 from app.api.menus.api import destroy_menu, get_menu, get_menus, post_new_menu
+from app.api.menus.crud_repository import MenuRepository
 from app.api.submenus.api import (
     destroy_submenu,
     get_submenu,
     get_submenus,
     post_new_submenu,
 )
+from app.api.submenus.crud_repository import SubmenuRepository
+from tests.conftest import TestAsyncSessionLocal
 from tests.service import reverse
 
 
+async def get_counts(
+    menu_id: str,
+    aggregate: bool,
+) -> tuple[dict[str, tuple[int, int]], dict[str, int]]:
+    """Количества подменю и блюд меню и количества блюд подменю меню
+    из счётчиков или из запроса с группировкой."""
+    async with TestAsyncSessionLocal() as db:
+        menus = await MenuRepository(db).get_all_menus(aggregate=aggregate)
+        submenus = await SubmenuRepository(db).get_all_submenus(
+            menu_id, aggregate=aggregate,
+        )
+    return (
+        {
+            str(menu.id): (menu.submenus_count, menu.dishes_count)
+            for menu in menus
+        },
+        {str(submenu.id): submenu.dishes_count for submenu in submenus},
+    )
+
+
 async def test_post_menu(
     menu_post: dict[str, str],
     saved_data: dict[str, Any],
@@ -182,6 +205,17 @@ async def test_get_currnet_submenu(
         'Количество блюд не соответствует ожидаемому'
 
 
+async def test_aggregate_counts(saved_data: dict[str, Any]) -> None:
+    """Количества из запроса с группировкой совпадают со счётчиками."""
+    menu = saved_data['menu']
+    submenu = saved_data['submenu']
+    counts = await get_counts(menu['id'], aggregate=True)
+    assert counts == ({menu['id']: (1, 2)}, {submenu['id']: 2}), \
+        'Количества подменю и блюд не соответствуют ожидаемым'
+    assert counts == await get_counts(menu['id'], aggregate=False), \
+        'Количества из запроса с группировкой не совпадают со счётчиками'
+
+
 async def test_delete_submenu(
     saved_data: dict[str, Any],
     client: AsyncClient,
@@ -257,6 +291,16 @@ async def test_current_menu_empty(
         'Количество блюд не соответствует ожидаемому'
 
 
+async def test_aggregate_counts_empty(saved_data: dict[str, Any]) -> None:
+    """Количества меню без подменю из запроса с группировкой."""
+    menu = saved_data['menu']
+    counts = await get_counts(menu['id'], aggregate=True)
+    assert counts == ({menu['id']: (0, 0)}, {}), \
+        'Количества подменю и блюд не соответствуют ожидаемым'
+    assert counts == await get_counts(menu['id'], aggregate=False), \
+        'Количества из запроса с группировкой не совпадают со счётчиками'
+
+
 async def test_delete_menu(
     saved_data: dict[str, Any],
     client: AsyncClient,
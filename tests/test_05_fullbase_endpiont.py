@@ -1,3 +1,4 @@
+import time
 from decimal import Decimal
 from http import HTTPStatus
 from typing import Any
@@ -7,6 +8,7 @@ from httpx import AsyncClient
 from app.api.dishes.api import destroy_dish, post_new_dish
 from app.api.menus.api import destroy_menu, get_full_base_menu, post_new_menu
 from app.api.submenus.api import destroy_submenu, post_new_submenu
+from app.database.cache_repository import FULL_BASE_KEY, expirations, soft_expired, wrap
 from tests.service import reverse
 
 
@@ -156,6 +158,55 @@ async def test_full_base(
         'Идентификатора блюда не соответствует ожидаемому'
 
 
+async def test_full_base_not_modified(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Проверка ответа 304 на запрос с ETag текущего снимка базы."""
+    response = await client.get(
+        reverse(get_full_base_menu),
+    )
+    etag = response.headers.get('etag')
+    assert etag, 'ETag нет в ответе'
+
+    response = await client.get(
+        reverse(get_full_base_menu),
+        headers={'If-None-Match': etag},
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, \
+        'Статус ответа не 304'
+    assert response.content == b'', 'Ответ 304 содержит тело'
+    assert response.headers.get('etag') == etag, \
+        'ETag не соответствует ожидаемому'
+
+    saved_data['etag'] = etag
+
+
+async def test_full_base_stream(client: AsyncClient) -> None:
+    """Проверка потоковой выдачи полной базы."""
+    response = await client.get(
+        reverse(get_full_base_menu),
+    )
+    streamed = await client.get(
+        reverse(get_full_base_menu),
+        params={'stream': 'true'},
+    )
+    assert streamed.status_code == HTTPStatus.OK, \
+        'Статус ответа не 200'
+    assert streamed.json() == response.json(), \
+        'Потоковая выдача не совпадает с полной выдачей базы'
+
+
+def test_full_base_expiration() -> None:
+    """Проверка срока жизни и мягкого устаревания снимка базы."""
+    expiration, soft_expiry = expirations(FULL_BASE_KEY)
+    assert expiration > 0, 'У снимка базы нет срока жизни'
+    assert not soft_expired(wrap(b'[]', soft_expiry)), \
+        'Новый снимок базы уже устарел'
+    assert soft_expired(wrap(b'[]', time.time() - 1)), \
+        'Устаревший снимок базы не перестраивается'
+
+
 async def test_delete_dish(
     saved_data: dict[str, Any],
     client: AsyncClient,
@@ -215,6 +266,23 @@ async def test_full_base_after_dish_dete(
         'Количество блюд не соответствует ожидаемому'
 
 
+async def test_full_base_etag_after_dish_delete(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Проверка смены ETag снимка базы после удаления блюда."""
+    response = await client.get(
+        reverse(get_full_base_menu),
+        headers={'If-None-Match': saved_data['etag']},
+    )
+    assert response.status_code == HTTPStatus.OK, \
+        'Статус ответа не 200'
+    assert response.headers.get('etag') != saved_data['etag'], \
+        'ETag не сменился после изменения базы'
+    assert len(response.json()[0]['submenus'][0]['dishes']) == 0, \
+        'Количество блюд не соответствует ожидаемому'
+
+
 async def test_delete_submenu(
     saved_data: dict[str, Any],
     client: AsyncClient,
@@ -0,0 +1,144 @@
+from http import HTTPStatus
+from typing import Any
+
+from httpx import AsyncClient
+
+from app.api.dishes.api import get_dishes, post_new_dish
+from app.api.menus.api import destroy_menu, get_menus, post_new_menu
+from app.api.submenus.api import get_submenus, post_new_submenu
+from tests.service import reverse
+
+DISH_TITLES = ('Dish C', 'Dish A', 'Dish B')
+
+
+async def test_post_objects(
+    menu_post: dict[str, str],
+    submenu_post: dict[str, str],
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Добавление меню, подменю и блюд для постраничного вывода."""
+    menu = (await client.post(
+        reverse(post_new_menu),
+        json=menu_post,
+    )).json()
+    submenu = (await client.post(
+        reverse(post_new_submenu, menu_id=menu['id']),
+        json=submenu_post,
+    )).json()
+    dishes = []
+    for title in DISH_TITLES:
+        response = await client.post(
+            reverse(
+                post_new_dish,
+                menu_id=menu['id'],
+                submenu_id=submenu['id'],
+            ),
+            json={'title': title, 'description': 'Some', 'price': '10'},
+        )
+        assert response.status_code == HTTPStatus.CREATED, \
+            'Статус ответа не 201'
+        dishes.append(response.json())
+
+    saved_data['menu'] = menu
+    saved_data['submenu'] = submenu
+    saved_data['dishes'] = dishes
+
+
+async def test_dishes_pages(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Постраничный вывод блюд по id."""
+    url = reverse(
+        get_dishes,
+        menu_id=saved_data['menu']['id'],
+        submenu_id=saved_data['submenu']['id'],
+    )
+    ids = sorted(dish['id'] for dish in saved_data['dishes'])
+    first = await client.get(url, params={'limit': 2})
+    assert first.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert [dish['id'] for dish in first.json()] == ids[:2], \
+        'Первая страница не соответствует ожидаемой'
+    second = await client.get(
+        url, params={'limit': 2, 'after': first.json()[-1]['id']},
+    )
+    assert second.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert [dish['id'] for dish in second.json()] == ids[2:], \
+        'Вторая страница не соответствует ожидаемой'
+    assert len((await client.get(url)).json()) == len(DISH_TITLES), \
+        'Полный список блюд не соответствует ожидаемому'
+
+
+async def test_dishes_pages_by_title(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Постраничный вывод блюд по названию."""
+    url = reverse(
+        get_dishes,
+        menu_id=saved_data['menu']['id'],
+        submenu_id=saved_data['submenu']['id'],
+    )
+    first = await client.get(url, params={'limit': 1, 'order': 'title'})
+    second = await client.get(url, params={
+        'limit': 5, 'order': 'title', 'after': first.json()[0]['id'],
+    })
+    assert [dish['title'] for dish in first.json() + second.json()] == \
+        sorted(DISH_TITLES), 'Порядок блюд не соответствует ожидаемому'
+
+
+async def test_fields(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Выбор выдаваемых полей списка."""
+    response = await client.get(
+        reverse(get_submenus, menu_id=saved_data['menu']['id']),
+        params={'fields': 'title'},
+    )
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert response.json() == [{
+        'id': saved_data['submenu']['id'],
+        'title': saved_data['submenu']['title'],
+    }], 'Поля подменю не соответствуют ожидаемым'
+
+
+async def test_unknown_fields(client: AsyncClient) -> None:
+    """Неизвестное поле в списке выдаваемых полей."""
+    response = await client.get(
+        reverse(get_menus),
+        params={'fields': 'title,price'},
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, \
+        'Статус ответа не 422'
+
+
+async def test_page_after_create(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Страница списка обновляется после добавления объекта."""
+    menu = saved_data['menu']
+    submenu = saved_data['submenu']
+    url = reverse(get_dishes, menu_id=menu['id'], submenu_id=submenu['id'])
+    params = {'limit': 10, 'fields': 'title'}
+    assert len((await client.get(url, params=params)).json()) == \
+        len(DISH_TITLES), 'Количество блюд не соответствует ожидаемому'
+    await client.post(
+        url, json={'title': 'Dish D', 'description': 'Some', 'price': '10'},
+    )
+    assert len((await client.get(url, params=params)).json()) == \
+        len(DISH_TITLES) + 1, 'Страница блюд не обновилась'
+
+
+async def test_delete_menu(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Удаление текущего меню."""
+    response = await client.delete(
+        reverse(destroy_menu, menu_id=saved_data['menu']['id']),
+    )
+    assert response.status_code == HTTPStatus.OK, \
+        'Статус ответа не 200'
@@ -0,0 +1,311 @@
+from http import HTTPStatus
+from typing import Any
+
+from httpx import AsyncClient
+
+from app.api.dishes.api import destroy_dishes_batch, get_dishes, post_dishes_batch
+from app.api.menus.api import (
+    destroy_menus_batch,
+    get_full_base_menu,
+    get_menu,
+    get_menus,
+    post_menus_batch,
+    put_full_base_menu,
+)
+from app.api.submenus.api import (
+    destroy_submenus_batch,
+    get_submenu,
+    get_submenus,
+    post_submenus_batch,
+)
+from tests.service import reverse
+
+MISSING_ID = '00000000-0000-0000-0000-000000000000'
+
+
+async def test_post_menus_batch(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Добавление пакета меню."""
+    response = await client.post(
+        reverse(post_menus_batch),
+        json=[
+            {'title': 'Batch menu', 'description': 'Some'},
+            {'title': 'Batch menu', 'description': 'Other'},
+        ],
+    )
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert [item['status'] for item in response.json()] == [
+        'created', 'conflict',
+    ], 'Результаты записи меню не соответствуют ожидаемым'
+
+    saved_data['menu_id'] = response.json()[0]['id']
+
+
+async def test_post_submenus_batch(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Добавление пакета подменю."""
+    menu_id = saved_data['menu_id']
+    response = await client.post(
+        reverse(post_submenus_batch, menu_id=menu_id),
+        json=[{'title': 'Batch submenu', 'description': 'Some'}],
+    )
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert response.json()[0]['status'] == 'created', \
+        'Подменю не добавлено'
+    saved_data['submenu_id'] = response.json()[0]['id']
+
+    menu = (await client.get(reverse(get_menu, menu_id=menu_id))).json()
+    assert menu['submenus_count'] == 1, \
+        'Количество подменю не соответствует ожидаемому'
+
+
+async def test_post_dishes_batch(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Добавление и изменение пакета блюд."""
+    ids = {
+        'menu_id': saved_data['menu_id'],
+        'submenu_id': saved_data['submenu_id'],
+    }
+    dishes = [
+        {'title': 'Dish 1', 'description': 'Some', 'price': '10'},
+        {'title': 'Dish 2', 'description': 'Some', 'price': '20'},
+        {'title': 'Dish 1', 'description': 'Some', 'price': '30'},
+    ]
+    response = await client.post(
+        reverse(post_dishes_batch, **ids), json=dishes,
+    )
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    results = response.json()
+    assert [item['status'] for item in results] == [
+        'created', 'created', 'conflict',
+    ], 'Результаты записи блюд не соответствуют ожидаемым'
+    dishes_list = (await client.get(reverse(get_dishes, **ids))).json()
+    assert len(dishes_list) == 2, 'Количество блюд не соответствует ожидаемому'
+
+    response = await client.post(
+        reverse(post_dishes_batch, **ids),
+        json=[{**dishes[0], 'id': results[0]['id'], 'price': '15'}],
+    )
+    assert response.json() == [
+        {'id': results[0]['id'], 'status': 'updated'},
+    ], 'Блюдо не изменено'
+    prices = {
+        dish['id']: dish['price']
+        for dish in (await client.get(reverse(get_dishes, **ids))).json()
+    }
+    assert prices[results[0]['id']] == '15.00', \
+        'Цена блюда в списке не обновилась'
+    submenu = (await client.get(reverse(
+        get_submenu, menu_id=ids['menu_id'], submenu_id=ids['submenu_id'],
+    ))).json()
+    assert submenu['dishes_count'] == 2, \
+        'Количество блюд не соответствует ожидаемому'
+
+
+async def test_post_dishes_batch_not_found(client: AsyncClient) -> None:
+    """Пакет блюд для несуществующего подменю."""
+    response = await client.post(
+        reverse(
+            post_dishes_batch,
+            menu_id='00000000-0000-0000-0000-000000000000',
+            submenu_id='00000000-0000-0000-0000-000000000000',
+        ),
+        json=[{'title': 'Dish', 'description': 'Some', 'price': '10'}],
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND, \
+        'Статус ответа не 404'
+
+
+async def test_put_full_base(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Замена всей базы древовидной структурой."""
+    tree = [{
+        'id': saved_data['menu_id'],
+        'title': 'Batch menu',
+        'description': 'Updated',
+        'submenus': [{
+            'title': 'Tree submenu',
+            'description': 'Some',
+            'dishes': [
+                {'title': 'Tree dish', 'description': 'Some', 'price': '5'},
+            ],
+        }],
+    }]
+    response = await client.put(reverse(put_full_base_menu), json=tree)
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    result = response.json()
+    assert {
+        name: (counts['created'], counts['updated'], counts['deleted'])
+        for name, counts in result.items()
+    } == {
+        'menus': (0, 1, 0),
+        'submenus': (1, 0, 1),
+        'dishes': (1, 0, 2),
+    }, 'Результат замены базы не соответствует ожидаемому'
+    assert result['menus']['items'] == [
+        {'id': saved_data['menu_id'], 'status': 'updated'},
+    ], 'Результат замены меню не соответствует ожидаемому'
+    assert [item['status'] for item in result['submenus']['items']] == [
+        'created', 'deleted',
+    ], 'Результат замены подменю не соответствует ожидаемому'
+    data = (await client.get(reverse(get_full_base_menu))).json()
+    assert data[0]['description'] == 'Updated', \
+        'Описание меню не соответствует ожидаемому'
+    assert [
+        dish['title'] for dish in data[0]['submenus'][0]['dishes']
+    ] == ['Tree dish'], 'Блюда не соответствуют ожидаемым'
+
+
+async def test_put_full_base_same_titles(client: AsyncClient) -> None:
+    """Замена базы объектами без id с уже занятыми названиями."""
+    old_data = (await client.get(reverse(get_full_base_menu))).json()
+    tree = [{
+        'title': 'Batch menu',
+        'description': 'Replaced',
+        'submenus': [{
+            'title': 'Tree submenu',
+            'description': 'Some',
+            'dishes': [
+                {'title': 'Tree dish', 'description': 'Some', 'price': '7'},
+            ],
+        }],
+    }]
+    response = await client.put(reverse(put_full_base_menu), json=tree)
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert {
+        name: (result['created'], result['deleted'])
+        for name, result in response.json().items()
+    } == {
+        'menus': (1, 1), 'submenus': (1, 1), 'dishes': (1, 1),
+    }, 'Результат замены базы не соответствует ожидаемому'
+    data = (await client.get(reverse(get_full_base_menu))).json()
+    assert data[0]['id'] != old_data[0]['id'], 'Меню не заменено'
+    assert data[0]['description'] == 'Replaced', \
+        'Описание меню не соответствует ожидаемому'
+    assert data[0]['submenus'][0]['dishes'][0]['price'] == '7.00', \
+        'Цена блюда не соответствует ожидаемой'
+
+
+async def test_put_full_base_invalid_id(client: AsyncClient) -> None:
+    """Замена базы структурой с некорректным id."""
+    response = await client.put(
+        reverse(put_full_base_menu),
+        json=[{'id': 'menu', 'title': 'Menu', 'description': 'Some'}],
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, \
+        'Статус ответа не 422'
+
+
+async def test_put_empty_full_base(client: AsyncClient) -> None:
+    """Замена всей базы пустой структурой."""
+    response = await client.put(reverse(put_full_base_menu), json=[])
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert response.json()['menus']['deleted'] == 1, \
+        'Меню не удалено'
+    assert (await client.get(reverse(get_full_base_menu))).json() == [], \
+        'В ответе непустой список'
+
+
+async def test_delete_dishes_batch(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Удаление пакета блюд."""
+    menu_id = (await client.post(
+        reverse(post_menus_batch),
+        json=[{'title': 'Delete menu', 'description': 'Some'}],
+    )).json()[0]['id']
+    submenu_id = (await client.post(
+        reverse(post_submenus_batch, menu_id=menu_id),
+        json=[
+            {'title': 'Delete submenu 1', 'description': 'Some'},
+            {'title': 'Delete submenu 2', 'description': 'Some'},
+        ],
+    )).json()[0]['id']
+    ids = {'menu_id': menu_id, 'submenu_id': submenu_id}
+    dish_ids = [item['id'] for item in (await client.post(
+        reverse(post_dishes_batch, **ids),
+        json=[
+            {'title': f'Delete dish {number}', 'description': 'Some',
+             'price': '10'}
+            for number in range(3)
+        ],
+    )).json()]
+    await client.get(reverse(get_dishes, **ids))
+
+    response = await client.request(
+        'DELETE',
+        reverse(destroy_dishes_batch, **ids),
+        json=[dish_ids[0], MISSING_ID],
+    )
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    assert response.json() == [
+        {'id': dish_ids[0], 'status': 'deleted'},
+        {'id': MISSING_ID, 'status': 'not_found'},
+    ], 'Результаты удаления блюд не соответствуют ожидаемым'
+    assert [
+        dish['id'] for dish in
+        (await client.get(reverse(get_dishes, **ids))).json()
+    ] == dish_ids[1:], 'Список блюд не соответствует ожидаемому'
+    menu = (await client.get(reverse(get_menu, menu_id=menu_id))).json()
+    assert menu['dishes_count'] == 2, \
+        'Количество блюд не соответствует ожидаемому'
+    saved_data['delete_ids'] = ids
+
+
+async def test_delete_submenus_batch(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Удаление пакета подменю вместе с блюдами."""
+    ids = saved_data['delete_ids']
+    response = await client.request(
+        'DELETE',
+        reverse(destroy_submenus_batch, menu_id=ids['menu_id']),
+        json=[ids['submenu_id']],
+    )
+    assert response.json() == [
+        {'id': ids['submenu_id'], 'status': 'deleted'},
+    ], 'Подменю не удалено'
+    assert (await client.get(reverse(get_dishes, **ids))).json() == [], \
+        'Блюда подменю не удалены'
+    assert len((await client.get(
+        reverse(get_submenus, menu_id=ids['menu_id'])
+    )).json()) == 1, 'Количество подменю не соответствует ожидаемому'
+    menu = (await client.get(reverse(get_menu, menu_id=ids['menu_id']))).json()
+    assert (menu['submenus_count'], menu['dishes_count']) == (1, 0), \
+        'Счётчики меню не соответствуют ожидаемым'
+
+
+async def test_delete_menus_batch(
+    saved_data: dict[str, Any],
+    client: AsyncClient,
+) -> None:
+    """Удаление пакета меню вместе с подменю и блюдами."""
+    menu_id = saved_data['delete_ids']['menu_id']
+    response = await client.request(
+        'DELETE', reverse(destroy_menus_batch), json=[menu_id],
+    )
+    assert response.json() == [{'id': menu_id, 'status': 'deleted'}], \
+        'Меню не удалено'
+    assert (await client.get(reverse(get_menus))).json() == [], \
+        'В ответе непустой список'
+    assert (await client.get(reverse(get_full_base_menu))).json() == [], \
+        'В ответе непустой список'
+
+
+async def test_delete_batch_invalid_id(client: AsyncClient) -> None:
+    """Удаление пакета меню с некорректным id."""
+    response = await client.request(
+        'DELETE', reverse(destroy_menus_batch), json=['menu'],
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, \
+        'Статус ответа не 422'
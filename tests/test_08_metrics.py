@@ -0,0 +1,37 @@
+from http import HTTPStatus
+
+from httpx import AsyncClient
+
+from app.api.metrics import get_metrics
+from app.config import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from app.database.db_loader import engine
+from tests.service import reverse
+
+
+def metric(text: str, name: str) -> float:
+    """Значение метрики из ответа в текстовом формате Prometheus."""
+    for line in text.splitlines():
+        if line.startswith(name + '{'):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'Метрики {name} нет в ответе')
+
+
+async def test_pool_metrics(client: AsyncClient) -> None:
+    """Метрики пула соединений с базой."""
+    response = await client.get(reverse(get_metrics))
+    assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+    checkouts = metric(response.text, 'db_pool_checkouts_total')
+    assert metric(response.text, 'db_pool_capacity') == \
+        DB_POOL_SIZE + DB_MAX_OVERFLOW, 'Ёмкость пула не соответствует ожидаемой'
+
+    async with engine.connect():
+        text = (await client.get(reverse(get_metrics))).text
+        assert metric(text, 'db_pool_checkouts_total') == checkouts + 1, \
+            'Выдача соединения не учтена'
+        assert metric(text, 'db_pool_checked_out') >= 1, \
+            'Выданное соединение не учтено'
+        assert 0 < metric(text, 'db_pool_saturation') <= 1, \
+            'Загрузка пула не соответствует ожидаемой'
+    assert metric(text, 'db_pool_wait_seconds_count') >= checkouts + 1, \
+        'Ожидание соединения не учтено'
+    await engine.dispose()
@@ -0,0 +1,79 @@
+from app.database.local_cache import LocalCache
+
+TAGS = ['generation:root', '/menus']
+
+
+def make_cache(**kwargs) -> LocalCache:
+    """Кеш в памяти с активной подпиской на канал инвалидации."""
+    cache = LocalCache(**kwargs)
+    cache.subscribed = True
+    return cache
+
+
+def test_set_get() -> None:
+    """Запись и чтение тела ответа."""
+    cache = make_cache()
+    cache.set('/menus', b'[]', TAGS, cache.get_versions())
+    assert cache.get('/menus') == b'[]', 'Запись не прочитана из памяти'
+
+
+def test_invalidate() -> None:
+    """Удаление записей по тегу сменившегося поколения."""
+    cache = make_cache()
+    cache.set('/menus', b'[]', TAGS, cache.get_versions())
+    cache.invalidate(['generation:root'])
+    assert cache.get('/menus') is None, 'Запись не удалена'
+    assert cache.tagged == {}, 'Теги удалённой записи не удалены'
+
+
+def test_set_after_invalidate() -> None:
+    """Запись по чтению до смены поколения пропускается."""
+    cache = make_cache()
+    versions = cache.get_versions()
+    cache.invalidate(['/menus'])
+    cache.set('/menus', b'[]', TAGS, versions)
+    assert cache.get('/menus') is None, 'Устаревшая запись сохранена'
+    cache.set('/menus', b'[]', TAGS, cache.get_versions())
+    assert cache.get('/menus') == b'[]', 'Запись не сохранена'
+
+
+def test_versions_not_stored_on_read() -> None:
+    """Чтение версии не добавляет записей о поколениях."""
+    cache = make_cache()
+    for number in range(100):
+        cache.get_versions()
+        cache.get(f'/menus?after={number}')
+    assert cache.versions == {}, 'Версии сохраняются при чтении'
+
+
+def test_versions_bounded() -> None:
+    """Число хранимых поколений ограничено размером кеша."""
+    cache = make_cache(max_entries=10)
+    versions = cache.get_versions()
+    for number in range(100):
+        cache.invalidate([f'/menus?after={number}'])
+    assert len(cache.versions) <= 10, 'Число поколений не ограничено'
+    cache.set('/menus?after=0', b'[]', TAGS, versions)
+    assert cache.get('/menus?after=0') is None, \
+        'Запись по забытому поколению сохранена'
+
+
+def test_disabled() -> None:
+    """Без подписки на канал инвалидации кеш не используется."""
+    cache = LocalCache()
+    assert cache.get_versions() == (), 'Версия выдана без подписки'
+    cache.set('/menus', b'[]', TAGS, cache.get_versions())
+    assert cache.entries == {}, 'Запись сохранена без подписки'
+    cache.invalidate(['/menus'])
+    cache.subscribed = True
+    assert cache.get('/menus') is None, 'В памяти есть запись'
+
+
+def test_evict() -> None:
+    """Вытеснение старых записей при превышении размера."""
+    cache = make_cache(max_entries=2)
+    for key in ('/a', '/b', '/c'):
+        cache.set(key, b'[]', [key], cache.get_versions())
+    assert list(cache.entries) == ['/b', '/c'], \
+        'Вытеснена не самая старая запись'
+    assert '/a' not in cache.tagged, 'Теги вытесненной записи не удалены'
@@ -0,0 +1,185 @@
+from pathlib import Path
+from typing import Any
+
+from httpx import AsyncClient
+from openpyxl import Workbook
+
+from app.api.menus.api import destroy_menu, get_full_base_menu, get_menu
+from app.tasks.parser import ParserRepo
+from app.tasks.updater import BaseUpdaterRepo
+from tests.conftest import test_engine
+from tests.service import reverse
+
+MENU_ID = '2b2a9a36-3c36-4c6a-9a1d-6b0f3c1f8a01'
+NEW_MENU_ID = '2b2a9a36-3c36-4c6a-9a1d-6b0f3c1f8a02'
+SUBMENU_ID = '5e8f1c2d-7a4b-4e3f-8c2d-1a2b3c4d5e01'
+DISH_ID = '9c1d2e3f-4a5b-4c6d-8e7f-0a1b2c3d4e01'
+
+
+def write_sheet(path: Path, menu_id: str, price: float = 10.5) -> str:
+    """Запись файла меню с одним меню, подменю и блюдом."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append([menu_id, 'File menu', 'Some'])
+    sheet.append([None, SUBMENU_ID, 'File submenu', 'Some'])
+    sheet.append([None, None, DISH_ID, 'File dish', 'Some', price, None])
+    workbook.save(path)
+    return str(path)
+
+
+def write_menus(path: Path, menus: list[tuple[str, str]]) -> str:
+    """Запись файла меню с меню по списку id и названий."""
+    workbook = Workbook()
+    sheet = workbook.active
+    for menu_id, title in menus:
+        sheet.append([menu_id, title, 'Some'])
+    workbook.save(path)
+    return str(path)
+
+
+async def apply_file(file_path: str) -> Any:
+    """Разбор файла, приведение базы в соответствие с ним
+    и сброс кеша."""
+    updater = BaseUpdaterRepo(ParserRepo(file_path).parser())
+    async with test_engine.begin() as conn:
+        diffs = await updater.apply(conn)
+    await updater.invalidate_cache()
+    return diffs
+
+
+def test_parser(tmp_path: Path) -> None:
+    """Разбор файла меню."""
+    data: list[dict[str, Any]] = ParserRepo(
+        write_sheet(tmp_path / 'Menu.xlsx', MENU_ID)
+    ).parser()
+    assert [menu['id'] for menu in data] == [MENU_ID], \
+        'Меню не соответствуют ожидаемым'
+    submenu = data[0]['submenus'][0]
+    assert submenu['title'] == 'File submenu', \
+        'Подменю не соответствует ожидаемому'
+    assert submenu['dishes'][0]['price'] == '10.5', \
+        'Цена блюда не соответствует ожидаемой'
+
+
+def test_parser_tree(tmp_path: Path) -> None:
+    """Разбор нескольких меню за один проход по строкам.
+    Подменю без описания завершает подменю меню,
+    блюдо без описания - блюда подменю."""
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in (
+        ['m1', 'Menu 1', 'Some'],
+        [None, 's1', 'Submenu 1', 'Some'],
+        [None, None, 'd1', 'Dish 1', 'Some', '1,5', 10],
+        [],
+        [None, None, 'd2', 'Dish 2', 'Some', 2, None],
+        [None, 's2', 'Submenu 2', None],
+        [None, None, 'd3', 'Dish 3', 'Some', 3, None],
+        [None, 's4', 'Submenu 4', 'Some'],
+        ['m2', 'Menu 2', 'Some'],
+        [None, 's3', 'Submenu 3', 'Some'],
+        [None, None, 'd4', 'Dish 4', None, 4, None],
+        [None, None, 'd5', 'Dish 5', 'Some', 5, None],
+        [None, 's5', 'Submenu 5', 'Some'],
+        [None, None, 'd6', 'Dish 6', 'Some', 6, None],
+    ):
+        sheet.append(row)
+    workbook.save(tmp_path / 'Menu.xlsx')
+    data: list[dict[str, Any]] = ParserRepo(
+        str(tmp_path / 'Menu.xlsx')
+    ).parser()
+    assert [
+        (menu['id'], [
+            (submenu['id'], [dish['id'] for dish in submenu['dishes']])
+            for submenu in menu['submenus']
+        ])
+        for menu in data
+    ] == [
+        ('m1', [('s1', ['d1', 'd2'])]),
+        ('m2', [('s3', []), ('s5', ['d6'])]),
+    ], 'Структура меню не соответствует ожидаемой'
+    dish = data[0]['submenus'][0]['dishes'][0]
+    assert (dish['price'], dish['discount']) == ('1.5', 10), \
+        'Цена и скидка блюда не соответствуют ожидаемым'
+
+
+def test_parser_hash(tmp_path: Path) -> None:
+    """Хеш содержимого меняется только у изменённых объектов."""
+    old: list[dict[str, Any]] = ParserRepo(
+        write_sheet(tmp_path / 'old.xlsx', MENU_ID)
+    ).parser()
+    new: list[dict[str, Any]] = ParserRepo(
+        write_sheet(tmp_path / 'new.xlsx', MENU_ID, 12)
+    ).parser()
+    assert old[0]['hash'] == new[0]['hash'], 'Хеш меню изменился'
+    assert old[0]['submenus'][0]['hash'] == new[0]['submenus'][0]['hash'], \
+        'Хеш подменю изменился'
+    assert old[0]['submenus'][0]['dishes'][0]['hash'] != \
+        new[0]['submenus'][0]['dishes'][0]['hash'], 'Хеш блюда не изменился'
+
+
+async def test_apply_file(tmp_path: Path, client: AsyncClient) -> None:
+    """Добавление и изменение объектов из файла."""
+    diffs = await apply_file(write_sheet(tmp_path / 'Menu.xlsx', MENU_ID))
+    assert [len(diff[0]) for diff in diffs] == [1, 1, 1], \
+        'Объекты не добавлены'
+    diffs = await apply_file(write_sheet(tmp_path / 'Menu.xlsx', MENU_ID, 12))
+    assert [len(diff[1]) for diff in diffs] == [0, 0, 1], \
+        'Изменено не только блюдо'
+    assert not any(any(diff) for diff in await apply_file(
+        write_sheet(tmp_path / 'Menu.xlsx', MENU_ID, 12)
+    )), 'Неизменённый файл изменил базу'
+
+
+async def test_apply_changed_menu_id(
+    tmp_path: Path,
+    client: AsyncClient,
+) -> None:
+    """Смена id меню в файле при том же названии."""
+    diffs = await apply_file(write_sheet(tmp_path / 'Menu.xlsx', NEW_MENU_ID))
+    assert [len(diff[2]) for diff in diffs] == [1, 0, 0], \
+        'Удалено не только старое меню'
+    data = (await client.get(reverse(get_full_base_menu))).json()
+    assert [menu['id'] for menu in data] == [NEW_MENU_ID], \
+        'Меню не заменено'
+    assert data[0]['submenus'][0]['id'] == SUBMENU_ID, 'Подменю не перенесено'
+    assert data[0]['submenus'][0]['dishes'][0]['id'] == DISH_ID, \
+        'Блюдо не сохранено'
+    menu = (await client.get(reverse(get_menu, menu_id=NEW_MENU_ID))).json()
+    assert (menu['submenus_count'], menu['dishes_count']) == (1, 1), \
+        'Счётчики меню не соответствуют ожидаемым'
+    await client.delete(reverse(destroy_menu, menu_id=NEW_MENU_ID))
+
+
+async def test_apply_renamed_title(
+    tmp_path: Path,
+    client: AsyncClient,
+) -> None:
+    """Новое меню с названием переименованного меню."""
+    await apply_file(write_menus(tmp_path / 'Menu.xlsx', [(MENU_ID, 'X')]))
+    diffs = await apply_file(write_menus(
+        tmp_path / 'Menu.xlsx', [(MENU_ID, 'Y'), (NEW_MENU_ID, 'X')],
+    ))
+    assert (len(diffs[0][0]), len(diffs[0][1])) == (1, 1), \
+        'Меню не добавлено и не изменено'
+    data = (await client.get(reverse(get_full_base_menu))).json()
+    assert {menu['id']: menu['title'] for menu in data} == {
+        MENU_ID: 'Y', NEW_MENU_ID: 'X',
+    }, 'Названия меню не соответствуют ожидаемым'
+
+
+async def test_apply_swapped_titles(
+    tmp_path: Path,
+    client: AsyncClient,
+) -> None:
+    """Обмен названиями двух меню."""
+    diffs = await apply_file(write_menus(
+        tmp_path / 'Menu.xlsx', [(MENU_ID, 'X'), (NEW_MENU_ID, 'Y')],
+    ))
+    assert len(diffs[0][1]) == 2, 'Названия меню не изменены'
+    data = (await client.get(reverse(get_full_base_menu))).json()
+    assert {menu['id']: menu['title'] for menu in data} == {
+        MENU_ID: 'X', NEW_MENU_ID: 'Y',
+    }, 'Названия меню не соответствуют ожидаемым'
+    await client.delete(reverse(destroy_menu, menu_id=MENU_ID))
+    await client.delete(reverse(destroy_menu, menu_id=NEW_MENU_ID))
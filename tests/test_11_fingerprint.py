@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+from app.config import FINGERPRINT_KEY
+from app.database.db_loader import create_tables
+from app.tasks.fingerprint import FingerprintRepo
+from app.tasks.parser import ParserRepo
+from tests.conftest import test_engine
+from tests.test_10_updater import MENU_ID, write_sheet
+
+
+def saved_fingerprint(file_path: str) -> FingerprintRepo:
+    """Сохранение отпечатка файла после синхронизации с чистого листа."""
+    fingerprint = FingerprintRepo(file_path)
+    fingerprint.cacher.delete(FINGERPRINT_KEY)
+    fingerprint.saved = {}
+    fingerprint.tree_changed(ParserRepo(file_path).parser())
+    fingerprint.save()
+    return FingerprintRepo(file_path)
+
+
+def test_file_unchanged(tmp_path: Path) -> None:
+    """Неизменённый файл пропускается без разбора."""
+    file_path = write_sheet(tmp_path / 'Menu.xlsx', MENU_ID)
+    assert not saved_fingerprint(file_path).file_changed(), \
+        'Неизменённый файл считается изменённым'
+
+
+def test_file_changed(tmp_path: Path) -> None:
+    """Изменённый файл разбирается заново."""
+    file_path = write_sheet(tmp_path / 'Menu.xlsx', MENU_ID)
+    saved_fingerprint(file_path)
+    write_sheet(tmp_path / 'Menu.xlsx', MENU_ID, 12)
+    fingerprint = FingerprintRepo(file_path)
+    assert fingerprint.file_changed(), 'Изменение файла не обнаружено'
+    assert fingerprint.tree_changed(ParserRepo(file_path).parser()), \
+        'Изменение содержимого файла не обнаружено'
+
+
+def test_tree_unchanged(tmp_path: Path) -> None:
+    """Пересохранённый без изменений файл не синхронизируется."""
+    file_path = write_sheet(tmp_path / 'Menu.xlsx', MENU_ID)
+    saved_fingerprint(file_path)
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    fingerprint = FingerprintRepo(file_path)
+    assert fingerprint.file_changed(), 'Изменение времени файла не обнаружено'
+    assert not fingerprint.tree_changed(ParserRepo(file_path).parser()), \
+        'Неизменённое содержимое файла считается изменённым'
+
+
+def test_no_saved_fingerprint(tmp_path: Path) -> None:
+    """Без сохранённого отпечатка файл синхронизируется."""
+    file_path = write_sheet(tmp_path / 'Menu.xlsx', MENU_ID)
+    saved_fingerprint(file_path).cacher.delete(FINGERPRINT_KEY)
+    fingerprint = FingerprintRepo(file_path)
+    assert fingerprint.file_changed(), 'Файл пропущен без отпечатка'
+    assert fingerprint.tree_changed(ParserRepo(file_path).parser()), \
+        'Содержимое файла пропущено без отпечатка'
+
+
+async def test_create_existing_tables() -> None:
+    """Существующие таблицы не считаются созданными заново."""
+    async with test_engine.begin() as conn:
+        assert not await conn.run_sync(create_tables), \
+            'Существующие таблицы считаются созданными'
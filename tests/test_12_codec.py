@@ -0,0 +1,47 @@
+import pytest
+
+from app.database.codec import compress, decompress, dumps, loads, lz4
+
+CONTENT = [
+    {
+        'id': '2b2a9a36-3c36-4c6a-9a1d-6b0f3c1f8a01',
+        'title': 'Меню',
+        'submenus': [{'title': 'Подменю', 'price': '10.50'}] * 100,
+    },
+]
+
+
+def test_dumps_loads() -> None:
+    """Сериализация в компактный JSON и обратно."""
+    body = dumps(CONTENT)
+    assert loads(body) == CONTENT, 'Содержимое изменилось после сериализации'
+    assert b', ' not in body and b': ' not in body, 'JSON не компактный'
+    assert 'Меню'.encode() in body, 'Кириллица экранирована'
+
+
+def test_compress_below_threshold() -> None:
+    """Тело меньше порога хранится без сжатия."""
+    body = dumps(CONTENT)
+    assert compress(body, 'zlib', len(body) + 1) == body, \
+        'Тело меньше порога сжато'
+    assert decompress(body) == body, 'Несжатое тело изменено'
+
+
+@pytest.mark.parametrize('method', [
+    'zlib',
+    pytest.param('lz4', marks=pytest.mark.skipif(
+        lz4 is None, reason='lz4 не установлен',
+    )),
+])
+def test_compress_round_trip(method: str) -> None:
+    """Сжатие тела больше порога и распаковка."""
+    body = dumps(CONTENT)
+    payload = compress(body, method, len(body))
+    assert len(payload) < len(body), 'Тело больше порога не сжато'
+    assert decompress(payload) == body, 'Тело изменилось после распаковки'
+
+
+def test_compress_none() -> None:
+    """Без метода сжатия тело хранится как есть."""
+    body = dumps(CONTENT)
+    assert compress(body, 'none', 0) == body, 'Тело сжато без метода сжатия'
@@ -0,0 +1,69 @@
+from sqlalchemy import text
+
+from app.database.db_loader import create_tables
+from tests.conftest import test_engine
+
+MENU_ID = '7d1e2f3a-4b5c-4d6e-8f7a-1b2c3d4e5f01'
+SUBMENU_ID = '7d1e2f3a-4b5c-4d6e-8f7a-1b2c3d4e5f02'
+
+# схема таблиц до появления счётчиков, их триггеров
+# и каскадного удаления дочерних объектов
+OLD_SCHEMA = (
+    'DROP TRIGGER IF EXISTS dishes_count_trigger ON dishes',
+    'DROP TRIGGER IF EXISTS submenus_count_trigger ON submenus',
+    'ALTER TABLE menus DROP COLUMN submenus_count, DROP COLUMN dishes_count',
+    'ALTER TABLE submenus DROP COLUMN dishes_count',
+    'ALTER TABLE submenus DROP CONSTRAINT submenus_menu_id_fkey, '
+    'ADD CONSTRAINT submenus_menu_id_fkey FOREIGN KEY (menu_id) '
+    'REFERENCES menus (id)',
+    'ALTER TABLE dishes DROP CONSTRAINT dishes_submenu_id_fkey, '
+    'ADD CONSTRAINT dishes_submenu_id_fkey FOREIGN KEY (submenu_id) '
+    'REFERENCES submenus (id)',
+)
+ROWS = (
+    'INSERT INTO menus (id, title, description) '
+    f"VALUES ('{MENU_ID}', 'Old menu', 'Some')",
+    'INSERT INTO submenus (id, title, description, menu_id) '
+    f"VALUES ('{SUBMENU_ID}', 'Old submenu', 'Some', '{MENU_ID}')",
+    'INSERT INTO dishes (id, title, description, price, submenu_id) '
+    f"VALUES (gen_random_uuid(), 'Old dish 1', 'Some', 1, '{SUBMENU_ID}'), "
+    f"(gen_random_uuid(), 'Old dish 2', 'Some', 2, '{SUBMENU_ID}')",
+)
+
+
+async def get_counts() -> tuple[int, ...]:
+    """Счётчики подменю и блюд меню и счётчик блюд подменю."""
+    async with test_engine.begin() as conn:
+        return tuple((await conn.execute(text(
+            'SELECT menus.submenus_count, menus.dishes_count, '
+            'submenus.dishes_count FROM menus '
+            'JOIN submenus ON submenus.menu_id = menus.id '
+            f"WHERE menus.id = '{MENU_ID}'"
+        ))).one())
+
+
+async def test_upgrade_schema() -> None:
+    """Дополнение таблиц, созданных до появления счётчиков
+    и каскадного удаления."""
+    async with test_engine.begin() as conn:
+        for statement in (*OLD_SCHEMA, *ROWS):
+            await conn.execute(text(statement))
+    async with test_engine.begin() as conn:
+        assert not await conn.run_sync(create_tables), \
+            'Существующие таблицы считаются созданными'
+    assert await get_counts() == (1, 2, 2), \
+        'Счётчики не заполнены по существующим объектам'
+
+    async with test_engine.begin() as conn:
+        await conn.run_sync(create_tables)
+        await conn.execute(text(
+            "DELETE FROM dishes WHERE title = 'Old dish 2'"
+        ))
+    assert await get_counts() == (1, 1, 1), \
+        'Счётчики не поддерживаются триггерами после обновления схемы'
+
+    async with test_engine.begin() as conn:
+        await conn.execute(text(f"DELETE FROM menus WHERE id = '{MENU_ID}'"))
+        assert not (await conn.execute(text(
+            f"SELECT id FROM dishes WHERE submenu_id = '{SUBMENU_ID}'"
+        ))).all(), 'Блюда удалённого меню не удалены каскадом'
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import uuid
+from email.utils import formatdate
+from http import HTTPStatus
+
+import pytest
+from aioredis import Redis
+from fastapi import BackgroundTasks
+
+from app.config import REDIS_URL
+from app.database import cache_repository
+from app.database.cache_repository import (
+    CacheEntry,
+    Loader,
+    СacheRepository,
+    cached_response,
+)
+from app.database.models import Menu
+from app.database.schemas import MenuRead
+
+
+class CountingLoader:
+    """Загрузчик меню, считающий обращения к базе."""
+
+    def __init__(self, title: str = 'Menu', delay: float = 0.1) -> None:
+        self.title = title
+        self.delay = delay
+        self.calls = 0
+        self.started = asyncio.Event()
+
+    async def __call__(self) -> Menu:
+        self.calls += 1
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        return Menu(
+            id=uuid.UUID(int=0),
+            title=self.title,
+            description='Some',
+            submenus_count=0,
+            dishes_count=0,
+        )
+
+
+def make_key() -> str:
+    """Ключ кеша, не пересекающийся с ключами API."""
+    return f'/test/{uuid.uuid4()}'
+
+
+async def fetch(
+    key: str,
+    loader: Loader,
+    background_tasks: BackgroundTasks | None = None,
+) -> bytes:
+    """Тело ответа по ключу из кеша или из загрузчика."""
+    cacher = Redis.from_url(REDIS_URL)
+    try:
+        entry = await СacheRepository(cacher=cacher).fetch(
+            key, MenuRead, loader, background_tasks or BackgroundTasks(), [],
+        )
+    finally:
+        await cacher.connection_pool.disconnect()
+    return entry.body
+
+
+async def test_concurrent_misses() -> None:
+    """Конкурентные промахи по одному ключу ждут одну загрузку."""
+    key, loader = make_key(), CountingLoader()
+    bodies = await asyncio.gather(*(fetch(key, loader) for _ in range(10)))
+    assert loader.calls == 1, 'Загрузок больше одной'
+    assert len(set(bodies)) == 1, 'Тела ответов различаются'
+    assert await fetch(key, loader) == bodies[0], 'Запись не взята из кеша'
+    assert loader.calls == 1, 'Повторная загрузка при наличии записи'
+
+
+async def test_owner_cancelled() -> None:
+    """Ожидающие загрузку подхватывают её после отмены загружающего."""
+    key, loader = make_key(), CountingLoader(delay=0.5)
+    owner = asyncio.create_task(fetch(key, loader))
+    await loader.started.wait()
+    waiters = [asyncio.create_task(fetch(key, loader)) for _ in range(5)]
+    await asyncio.sleep(0.1)
+    owner.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+    bodies = await asyncio.gather(*waiters)
+    assert loader.calls == 2, 'Загрузка не подхвачена одним ожидающим'
+    assert len(set(bodies)) == 1, 'Тела ответов различаются'
+
+
+async def test_locked_by_other_process() -> None:
+    """Промах ждёт записи в кеш процесса, держащего блокировку."""
+    key, loader = make_key(), CountingLoader()
+    cacher = Redis.from_url(REDIS_URL)
+    cache_repo, token = СacheRepository(cacher=cacher), uuid.uuid4().hex
+    try:
+        cache_key, _, locked = await cache_repo.get_cache(key, [], token)
+        assert locked, 'Блокировка заполнения не получена'
+        waiter = asyncio.create_task(fetch(key, loader))
+        await asyncio.sleep(0.1)
+        entry = await cache_repo.fill(
+            cache_key, MenuRead, CountingLoader('Other', 0), token,
+        )
+    finally:
+        await cacher.connection_pool.disconnect()
+    assert await waiter == entry.body, 'Запись другого процесса не получена'
+    assert loader.calls == 0, 'Загрузка при блокировке другого процесса'
+
+
+async def test_soft_expired(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Устаревшая запись отдаётся сразу и обновляется в фоне."""
+    monkeypatch.setattr(cache_repository, 'SOFT_EXPIRATION', -1)
+    key, old, new = make_key(), CountingLoader('Old', 0), CountingLoader('New', 0)
+    stale = await fetch(key, old)
+    background_tasks = BackgroundTasks()
+    assert await fetch(key, new, background_tasks) == stale, \
+        'Устаревшая запись не отдана'
+    assert (new.calls, len(background_tasks.tasks)) == (0, 1), \
+        'Обновление записи не отложено в фон'
+    await background_tasks()
+    assert new.calls == 1, 'Запись не обновлена в фоне'
+    assert b'New' in await fetch(key, new), 'Обновлённая запись не отдана'
+
+
+async def test_hard_expired(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Истёкшая запись загружается заново до ответа."""
+    monkeypatch.setattr(cache_repository, 'EXPIRATION', 1)
+    key, old, new = make_key(), CountingLoader('Old', 0), CountingLoader('New', 0)
+    await fetch(key, old)
+    await asyncio.sleep(1.1)
+    background_tasks = BackgroundTasks()
+    assert b'New' in await fetch(key, new, background_tasks), \
+        'Истёкшая запись отдана'
+    assert (new.calls, len(background_tasks.tasks)) == (1, 0), \
+        'Истёкшая запись не загружена до ответа'
+
+
+def test_modified_same_second(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Время изменения не отдаётся и не сравнивается в секунду записи."""
+    now = int(time.time())
+    monkeypatch.setattr(time, 'time', lambda: now + 0.5)
+    entry = CacheEntry(b'[]', '"etag"', now)
+    assert 'Last-Modified' not in cached_response(entry).headers, \
+        'Last-Modified отдан в секунду записи'
+    response = cached_response(
+        entry, if_modified_since=formatdate(now, usegmt=True),
+    )
+    assert response.status_code == HTTPStatus.OK, \
+        'Ответ 304 по времени изменения в секунду записи'
+
+    entry = CacheEntry(b'[]', '"etag"', now - 1)
+    last_modified = cached_response(entry).headers.get('Last-Modified')
+    assert last_modified == formatdate(now - 1, usegmt=True), \
+        'Last-Modified не соответствует ожидаемому'
+    response = cached_response(entry, if_modified_since=last_modified)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, \
+        'Статус ответа не 304'
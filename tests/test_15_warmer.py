@@ -0,0 +1,88 @@
+import asyncio
+from http import HTTPStatus
+
+from aioredis import Redis
+from httpx import AsyncClient
+from pytest import LogCaptureFixture
+
+from app.api.dishes.api import post_new_dish
+from app.api.menus.api import (
+    destroy_menu,
+    get_full_base_menu,
+    get_menu,
+    menu_router,
+    post_new_menu,
+)
+from app.api.submenus.api import post_new_submenu
+from app.config import REDIS_URL
+from app.database.cache_repository import FULL_BASE_KEY, СacheRepository
+from app.main import log_task_error
+from app.tasks.warmer import CacheWarmerRepo
+from tests.conftest import TestAsyncSessionLocal
+from tests.service import reverse
+
+
+def api_path(key: str) -> str:
+    """Адрес API, ответ которого хранится в записи кеша key."""
+    if key == FULL_BASE_KEY:
+        return reverse(get_full_base_menu)
+    return menu_router.prefix + key
+
+
+async def get_bodies(client: AsyncClient, keys: list[str]) -> dict[str, bytes]:
+    """Тела ответов API по ключам кеша."""
+    bodies = {}
+    for key in keys:
+        response = await client.get(api_path(key))
+        assert response.status_code == HTTPStatus.OK, 'Статус ответа не 200'
+        bodies[key] = response.content
+    return bodies
+
+
+async def test_warm(
+    menu_post: dict[str, str],
+    submenu_post: dict[str, str],
+    dish_post: dict[str, str],
+    client: AsyncClient,
+) -> None:
+    """Прогрев пустого кеша телами ответов, совпадающими с ответами API."""
+    menu_id = (await client.post(
+        reverse(post_new_menu), json=menu_post,
+    )).json()['id']
+    submenu_id = (await client.post(
+        reverse(post_new_submenu, menu_id=menu_id), json=submenu_post,
+    )).json()['id']
+    await client.post(
+        reverse(post_new_dish, menu_id=menu_id, submenu_id=submenu_id),
+        json=dish_post,
+    )
+    cacher = Redis.from_url(REDIS_URL)
+    cache_repo, warmer = СacheRepository(cacher=cacher), CacheWarmerRepo()
+    try:
+        await cache_repo.delete_all_cache()
+        await client.get(reverse(get_menu, menu_id=menu_id))
+        written, _ = await warmer.warm()
+        async with TestAsyncSessionLocal() as db:
+            keys = list(await warmer.get_keys(db, cache_repo))
+        assert written == len(keys) - 1, \
+            'Прогрев записал не только отсутствующие записи'
+        assert (await warmer.warm())[0] == 0, 'Повторный прогрев записал ключи'
+        warmed = await get_bodies(client, keys)
+        await cache_repo.delete_all_cache()
+        assert warmed == await get_bodies(client, keys), \
+            'Тела ответов из прогретого кеша отличаются от ответов API'
+    finally:
+        await cacher.connection_pool.disconnect()
+    await client.delete(reverse(destroy_menu, menu_id=menu_id))
+
+
+async def test_warm_error_logged(caplog: LogCaptureFixture) -> None:
+    """Ошибка фонового прогрева попадает в лог."""
+    async def fail() -> None:
+        raise RuntimeError('Redis недоступен')
+
+    task = asyncio.create_task(fail(), name='cache_warmer')
+    task.add_done_callback(log_task_error)
+    await asyncio.wait([task])
+    await asyncio.sleep(0)
+    assert 'Redis недоступен' in caplog.text, 'Ошибка прогрева не записана'